@@ -2,6 +2,7 @@
 Activation functions with sector-bound information.
 """
 
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -13,8 +14,17 @@ class LeakyReLU(nn.LeakyReLU):
         self.A_phi = torch.tensor(0.2)
         self.B_phi = torch.tensor(1.0)
 
+    def np_forward(self, v, out):
+        """Evaluates the activation of a numpy array into out, for frozen controllers."""
+        np.multiply(v, self.negative_slope, out = out)
+        return np.maximum(v, out, out = out)
+
 class Tanh(nn.Tanh):
     def __init__(self):
         super().__init__()
         self.A_phi = torch.tensor(0.0)
         self.B_phi = torch.tensor(1.0)
+
+    def np_forward(self, v, out):
+        """Evaluates the activation of a numpy array into out, for frozen controllers."""
+        return np.tanh(v, out = out)
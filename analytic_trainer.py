@@ -0,0 +1,132 @@
+"""
+Training controllers with analytic policy gradients: backpropagation through time of the cost of batched
+closed loop rollouts on the torch model of the plant (envs.torch_plant), instead of PPO through RLlib.
+The controller is projected onto the stabilizing set after each update, as in the RLlib trainers.
+"""
+
+import numpy as np
+import torch
+
+from envs import InvertedPendulumEnv
+from envs.torch_plant import TorchLurePlant
+from models import ProjRENModel
+from activations import Tanh
+from closed_loop import simulate
+from deq_lib.solvers import broyden
+
+class AnalyticTrainer:
+    """
+    env_cstor, env_config: the plant env.
+    model_cstor, model_config: the controller model (e.g. ProjRENModel) and its custom_model_config.
+    batch_size: number of initial states, drawn by the env's batch_reset, per update.
+    horizon: rollout length (default: the env's episode length time_max + 1).
+    Q, R: weights of the quadratic stage cost x' Q x + u' R u of the scaled and clipped input u
+        (default: identity and 0.01 identity).
+    fail_cost: cost of each step after a trajectory has left the state space
+        (default: the largest stage cost in the state space).
+    """
+
+    def __init__(
+        self, env_cstor, env_config, model_cstor, model_config,
+        batch_size = 64, horizon = None, lr = 1e-3, Q = None, R = None, fail_cost = None
+    ):
+        self.env = env_cstor(env_config)
+        self.plant = TorchLurePlant.from_env(self.env)
+        nx, nu = self.plant.nx, self.plant.nu
+
+        self.model = model_cstor(
+            self.env.observation_space, self.env.action_space, 2*nu, {}, 'analytic', **model_config
+        )
+        self.optimizer = torch.optim.Adam(self.model.theta_h_parameters().values(), lr = lr)
+
+        self.batch_size = batch_size
+        self.horizon = horizon if horizon is not None else self.env.time_max + 1
+        self.Q = torch.eye(nx) if Q is None else torch.as_tensor(Q, dtype = torch.float32)
+        self.R = 0.01 * torch.eye(nu) if R is None else torch.as_tensor(R, dtype = torch.float32)
+        if fail_cost is None:
+            x_max = self.plant.state_max
+            u_max = self.plant.max_input * self.plant.action_scale
+            fail_cost = float(x_max @ self.Q.abs() @ x_max + u_max**2 * self.R.abs().sum())
+        self.fail_cost = fail_cost
+        self.plant_samples = 0
+
+    def rollout(self, x0):
+        """
+        Closed loop rollout from the (B, nx) initial states x0, differentiable with respect to the controller.
+        Returns the mean stage cost of each trajectory (B,) and whether each trajectory reached its last step (B,).
+        """
+        states, actions, mask, _ = simulate(self.model, self.env, x0, horizon = self.horizon, plant = self.plant)
+        inputs = self.plant.clip(actions)
+        stage = torch.sum((states @ self.Q) * states, dim = 2) + torch.sum((inputs @ self.R) * inputs, dim = 2)
+        cost = torch.where(mask, stage, torch.full_like(stage, self.fail_cost))
+        return cost.mean(dim = 1), mask[:, -1]
+
+    def train(self):
+        """One update of the controller from a batch of rollouts, followed by the projection step."""
+        x0 = torch.as_tensor(self.env.batch_reset(self.batch_size))
+        cost, alive = self.rollout(x0)
+        loss = cost.mean()
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        self.model.project()
+
+        self.plant_samples += self.batch_size * self.horizon
+        return {
+            'loss': loss.item(),
+            'survival_rate': alive.float().mean().item(),
+            'plant_samples': self.plant_samples,
+            **self.model.projection_stats()
+        }
+
+    def evaluate(self, n_episodes = 100):
+        """
+        Mean episode reward of the controller on the env (its rewards and terminations), as reported by RLlib
+        for deterministic actions, from n_episodes initial states drawn by the env's batch_reset.
+        """
+        states = self.env.batch_reset(n_episodes)
+        xi = self.model.get_initial_state()[0].expand(n_episodes, -1)
+        alive = np.ones(n_episodes, dtype = bool)
+        episode_rewards = np.zeros(n_episodes)
+
+        self.model.eval()
+        with torch.no_grad():
+            for _ in range(self.env.time_max + 1):
+                y = torch.as_tensor(self.env.batch_obs(states), dtype = torch.float32)
+                outputs, [xi] = self.model.forward_rnn(y.unsqueeze(1), [xi], None)
+                u = outputs[:, 0, :self.plant.nu].numpy()
+                states, rewards = self.env.batch_step(states, u)
+                episode_rewards += np.where(alive, rewards, 0)
+                alive &= self.env.plant.batch_in_bounds(states)
+        self.model.train()
+
+        return episode_rewards.mean()
+
+if __name__ == '__main__':
+    env = InvertedPendulumEnv
+    env_config = {
+        "observation": "partial",
+        "normed": True,
+        "factor": 1,
+    }
+    model_config = {
+        "state_size": 2,
+        "hidden_size": 4,
+        "phi_cstor": Tanh,
+        "log_std_init": np.log(0.2),
+        "lmi_eps": 1e-5,
+        "exp_stability_rate": 0.9,
+        "plant_cstor": env,
+        "plant_config": env_config,
+        "solver": broyden,
+        "f_thresh": 30,
+        "b_thresh": 30
+    }
+
+    trainer = AnalyticTrainer(env, env_config, ProjRENModel, model_config, batch_size = 64, lr = 1e-3)
+    for i in range(200):
+        result = trainer.train()
+        if i % 10 == 0:
+            print(f'Iteration {i}: loss {result["loss"]:.4f}, survival rate {result["survival_rate"]:.2f}, '
+                f'plant samples {result["plant_samples"]}, episode reward {trainer.evaluate():.2f}')
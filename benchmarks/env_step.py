@@ -0,0 +1,76 @@
+"""
+Steps per second of the inverted pendulum envs, with the previous list-buffer step as reference, and of the
+batched plant step.
+Run from the repository root: python -m benchmarks.env_step
+"""
+
+import time
+import numpy as np
+from envs import InvertedPendulumEnv, OtherInvertedPendulumEnv
+
+env_config = {'factor': 1.0, 'observation': 'partial', 'normed': True}
+n_steps = 20000
+batch_size = 256
+
+class ListBufferMixin:
+    """The step and reset of the pendulum envs before the ring buffer and preallocated arrays (with the Ju reward)."""
+
+    def step(self, u, fail_on_state_space = True, fail_on_time_limit = True):
+        th, thdot = self.state
+        prev_th, prev_thdot = np.mean(self.states, axis = 0)
+
+        u = np.clip(u, -self.max_torque, self.max_torque)
+        u *= self.factor
+        costs = u[0]**2 - self.max_torque**2
+
+        self.states.append(self.state)
+        if len(self.states) > self.max_buff_size:
+            del self.states[0]
+        self.state = self.plant.step(self.state, u)
+
+        terminated = False
+        if (fail_on_time_limit and self.time >= self.time_max) or (fail_on_state_space and self.state not in self.state_space):
+            terminated = True
+
+        self.time += 1
+
+        return self.plant.obs(self.state), -costs, terminated, {}
+
+    def reset(self, state = None):
+        self.state = np.zeros(self.nx, dtype=np.float32) if state is None else state
+        self.states = [self.state]
+        self.time = 0
+        return self.plant.obs(self.state)
+
+class ListBufferInvertedPendulumEnv(ListBufferMixin, InvertedPendulumEnv):
+    pass
+
+class ListBufferOtherInvertedPendulumEnv(ListBufferMixin, OtherInvertedPendulumEnv):
+    pass
+
+def steps_per_second(env):
+    actions = np.random.uniform(-1, 1, size=(n_steps, 1)).astype(np.float32)
+    env.reset(np.zeros(env.nx, dtype=np.float32))
+    t0 = time.perf_counter()
+    for u in actions:
+        # Stay near the origin, so that no step terminates
+        env.step(0.01 * u, fail_on_time_limit = False)
+    return n_steps / (time.perf_counter() - t0)
+
+for before_cls, after_cls in [
+    (ListBufferInvertedPendulumEnv, InvertedPendulumEnv),
+    (ListBufferOtherInvertedPendulumEnv, OtherInvertedPendulumEnv)
+]:
+    before = steps_per_second(before_cls(env_config))
+    after = steps_per_second(after_cls(env_config))
+    print(f'{after_cls.__name__}: {before:.0f} steps/s before, {after:.0f} steps/s after ({after/before:.1f}x)')
+
+    env = after_cls(env_config)
+    states = env.batch_reset(batch_size)
+    u = np.zeros((batch_size, env.nu), dtype=np.float32)
+    n_batches = n_steps // 10
+    t0 = time.perf_counter()
+    for _ in range(n_batches):
+        states, _ = env.batch_step(states, u)
+    batched = n_batches * batch_size / (time.perf_counter() - t0)
+    print(f'    batch_step with {batch_size} plants: {batched:.0f} plant steps/s')
@@ -0,0 +1,66 @@
+"""
+Latency of one controller step of the frozen controller (models.frozen) against the RecurrentController with the
+Broyden solver, and throughput of their batched steps, for a random REN controller with a contractive DK3_t.
+Run from the repository root: python -m benchmarks.frozen_controller
+"""
+
+import time
+import numpy as np
+import torch
+
+from activations import Tanh
+from models.controller import RecurrentController
+from models.frozen import FrozenController
+
+state_size, hidden_size, ob_dim, ac_dim = 2, 16, 2, 1
+n_steps = 2000
+batch_size = 1024
+
+def random_theta_t(rng):
+    shapes = [(state_size, state_size), (state_size, hidden_size), (state_size, ob_dim), (ac_dim, state_size),
+        (ac_dim, hidden_size), (ac_dim, ob_dim), (hidden_size, state_size), (hidden_size, hidden_size),
+        (hidden_size, ob_dim)]
+    theta_t = [rng.standard_normal(shape) / np.sqrt(shape[1]) for shape in shapes]
+    theta_t[0] *= 0.9 / np.max(np.abs(np.linalg.eigvals(theta_t[0])))
+    DK3_t = theta_t[7]
+    theta_t[7] = 0.5 * DK3_t / np.max(np.sum(np.abs(DK3_t), axis = 1))
+    return [M.astype(np.float32) for M in theta_t]
+
+def time_per_call(f, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        f()
+    return (time.perf_counter() - start) / n
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    theta_t = random_theta_t(rng)
+    phi = Tanh()
+    controller = RecurrentController([torch.as_tensor(M) for M in theta_t], phi)
+    frozen = FrozenController(theta_t, phi)
+    print(f'Contraction factor {frozen.contraction:.3f}, {frozen.n_iters} fixed point iterations')
+
+    y = rng.standard_normal(ob_dim)
+    xi = torch.zeros(1, state_size)
+    y_t = torch.as_tensor(y, dtype = torch.float32).unsqueeze(0)
+    u_ref, _ = controller(y_t, xi)
+    u = frozen.step(y)
+    print(f'Max input difference {np.max(np.abs(u - u_ref.numpy()[0])):.2e}')
+
+    frozen.reset()
+    t_ref = time_per_call(lambda: controller(y_t, xi), n_steps // 10)
+    t_frozen = time_per_call(lambda: frozen.step(y), n_steps)
+    print(f'Single step: RecurrentController {1e6*t_ref:.1f} us, FrozenController {1e6*t_frozen:.1f} us '
+        f'({t_ref/t_frozen:.1f}x)')
+
+    Y = rng.standard_normal((batch_size, ob_dim))
+    Xi = torch.zeros(batch_size, state_size)
+    Y_t = torch.as_tensor(Y, dtype = torch.float32)
+    frozen.reset(batch_size)
+    torch_frozen = frozen.to_torch()
+    t_ref = time_per_call(lambda: controller(Y_t, Xi), n_steps // 100)
+    t_frozen = time_per_call(lambda: frozen.batch_step(Y), n_steps // 10)
+    with torch.no_grad():
+        t_torch = time_per_call(lambda: torch_frozen(Y_t, Xi), n_steps // 10)
+    print(f'Batch of {batch_size}: RecurrentController {batch_size/t_ref:.0f} steps/s, '
+        f'FrozenController {batch_size/t_frozen:.0f} steps/s, FrozenTorchController {batch_size/t_torch:.0f} steps/s')
@@ -0,0 +1,54 @@
+"""
+Import time of the inference and analysis entry points, each measured in a fresh interpreter, against a budget,
+and whether they import heavy dependencies (ray, cvxpy, scipy, matplotlib, termcolor) which they do not need.
+The exit status is nonzero if a budget is exceeded or a heavy dependency is imported.
+Run from the repository root: python -m benchmarks.import_time
+"""
+
+import json
+import subprocess
+import sys
+
+heavy_modules = ['ray', 'cvxpy', 'scipy', 'matplotlib', 'termcolor']
+
+# Budgets in seconds (warm file system cache), dominated by torch (about 1 s).
+budgets = {
+    'models': 2.0,
+    'models.frozen': 0.5,
+    'models.controller': 2.0,
+    'models.checkpoint': 2.0,
+    'deq_lib.solvers': 2.0,
+    'closed_loop': 2.0,
+    'region_of_attraction': 2.5,
+}
+
+n_repeats = 3
+
+_probe = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'heavy': [m for m in {heavy} if m in sys.modules]}}))
+'''
+
+def measure(module):
+    """Smallest import time of module over n_repeats fresh interpreters, and the heavy modules it imports."""
+    results = []
+    for _ in range(n_repeats):
+        out = subprocess.run(
+            [sys.executable, '-c', _probe.format(module = module, heavy = heavy_modules)],
+            capture_output = True, text = True, check = True
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return min(result['time'] for result in results), results[0]['heavy']
+
+if __name__ == '__main__':
+    failed = False
+    for (module, budget) in budgets.items():
+        elapsed, heavy = measure(module)
+        ok = elapsed <= budget and len(heavy) == 0
+        failed |= not ok
+        heavy_str = f', imports {", ".join(heavy)}' if heavy else ''
+        print(f'{module:24s} {elapsed:6.3f} s (budget {budget:.1f} s){heavy_str} {"ok" if ok else "FAIL"}')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,52 @@
+"""
+Interior-point iterations of the projection with and without balancing of the plant data.
+Run from the repository root: python -m benchmarks.plant_balancing
+"""
+
+import numpy as np
+from envs import VehicleLateralEnv, PowergridEnv, InvertedPendulumEnv
+from models.ren_projection import LinProjector, NonlinProjector
+from models.theta_recovery import loop_transformed_plant
+
+np.random.seed(0)
+env_config = {'factor': 1.0, 'observation': 'partial', 'normed': True}
+state_size = 2
+hidden_size = 8
+eps = 1e-5
+decay_factor = 0.98
+
+def random_theta_h(n, ob_dim, ac_dim):
+    X = np.random.randn(n, n)
+    Y = np.random.randn(n, n)
+    return [
+        X @ X.T + np.eye(n), Y @ Y.T + np.eye(n),
+        np.random.randn(n, n), np.random.randn(n, ob_dim), np.random.randn(ac_dim, n), np.random.randn(ac_dim, ob_dim),
+        np.eye(hidden_size),
+        np.random.randn(n, hidden_size), np.random.randn(hidden_size, n), np.random.randn(ac_dim, hidden_size),
+        np.random.randn(hidden_size, hidden_size), np.random.randn(hidden_size, ob_dim)
+    ]
+
+for env_cls in [VehicleLateralEnv, PowergridEnv, InvertedPendulumEnv]:
+    plant = env_cls(env_config)
+    if plant.is_nonlin():
+        plant_args = loop_transformed_plant(*plant.get_params())
+        projector_cls = NonlinProjector
+        ob_dim, ac_dim = plant_args[3].shape[0], plant_args[2].shape[1]
+    else:
+        plant_args = (plant.AG, plant.BG, plant.CG)
+        projector_cls = LinProjector
+        ob_dim, ac_dim = plant.CG.shape[0], plant.BG.shape[1]
+    n = plant_args[0].shape[0]
+    theta_h = random_theta_h(n, ob_dim, ac_dim)
+
+    results = {}
+    for balance in [False, True]:
+        projector = projector_cls(*plant_args, eps, decay_factor, state_size, hidden_size, ob_dim, ac_dim, balance = balance)
+        projector.project(*theta_h)
+        results[balance] = projector.iterations.stats()
+        if balance:
+            d = projector.d
+
+    print(f'{env_cls.__name__}: scaling range {d.min():g} to {d.max():g}')
+    for balance in [False, True]:
+        print(f'    balance = {balance}: {results[balance]}')
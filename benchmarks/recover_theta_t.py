@@ -0,0 +1,53 @@
+"""
+Compares the structured theta tilde recovery to the pseudo-inverse based one on random stabilizing-set-like
+theta hat parameters: checks that the outputs match and reports the speedup.
+Run from the repository root: python -m benchmarks.recover_theta_t
+"""
+
+import timeit
+import torch
+from models.theta_recovery import recover_theta_t_pinv, recover_theta_t_structured
+
+torch.manual_seed(0)
+torch.set_default_dtype(torch.float64)
+
+plant_state_size = 20 # Same sizes as the powergrid plant
+ob_dim = 10
+ac_dim = 10
+hidden_size = 16
+repeats = 200
+
+def random_spd(n):
+    A = torch.randn(n, n) / n**0.5
+    return A @ A.t() + torch.eye(n)
+
+def random_theta_h(n, state_size):
+    X = random_spd(n)
+    Y = X.inverse() + random_spd(n) # Y - X^-1 positive definite, as implied by the LMI
+    return [
+        X, Y,
+        torch.randn(n, n), torch.randn(n, ob_dim), torch.randn(ac_dim, n), torch.randn(ac_dim, ob_dim),
+        torch.diag(torch.rand(hidden_size) + 1),
+        torch.randn(n, hidden_size), torch.randn(hidden_size, n), torch.randn(ac_dim, hidden_size),
+        torch.randn(hidden_size, hidden_size), torch.randn(hidden_size, ob_dim)
+    ]
+
+AG_t = torch.randn(plant_state_size, plant_state_size) / plant_state_size**0.5
+BG2 = torch.randn(plant_state_size, ac_dim)
+CG1 = torch.randn(ob_dim, plant_state_size)
+
+names = ['AK_t', 'BK1_t', 'BK2_t', 'CK1_t', 'DK1_t', 'DK2_t', 'CK2_t', 'DK3_t', 'DK4_t']
+for state_size in [plant_state_size, plant_state_size // 2]:
+    theta_h = random_theta_h(plant_state_size, state_size)
+    args = (theta_h, AG_t, BG2, CG1, state_size)
+
+    reference = recover_theta_t_pinv(*args)
+    structured = recover_theta_t_structured(*args)
+    for (name, ref, out) in zip(names, reference, structured):
+        error = (ref - out).abs().max().item() / max(ref.abs().max().item(), 1)
+        assert error < 1e-6, f'{name} differs by {error}'
+
+    t_pinv = timeit.timeit(lambda: recover_theta_t_pinv(*args), number = repeats) / repeats
+    t_structured = timeit.timeit(lambda: recover_theta_t_structured(*args), number = repeats) / repeats
+    print(f'state size {state_size}/{plant_state_size}: pinv {1e3*t_pinv:.3f} ms, '
+          f'structured {1e3*t_structured:.3f} ms, speedup {t_pinv/t_structured:.1f}x')
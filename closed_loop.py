@@ -0,0 +1,54 @@
+"""
+Batched closed loop simulation of a controller model with a plant env, stepping B initial states in lockstep
+as tensors instead of one env through the RLlib trainer per step.
+"""
+
+import torch
+
+from envs.torch_plant import TorchLurePlant
+
+def simulate(model, env, x0, horizon = None, fail_on_state_space = True, success_tol = 1e-2, plant = None):
+    """
+    Closed loop rollouts of the controller model (e.g. agent.get_policy().model) with deterministic actions,
+    from the (B, nx) initial states x0, as env.step would produce them.
+    horizon: number of steps (default: the env's episode length time_max + 1).
+    fail_on_state_space: whether leaving the state space terminates a trajectory.
+    success_tol: a trajectory succeeds if it did not terminate and its final state has norm at most success_tol.
+    plant: TorchLurePlant of the env (default: built from the env).
+    Returns
+        states:  (B, T, nx) state before each step,
+        actions: (B, T, nu) controller output at each step (before the env clips it),
+        mask:    (B, T) whether each step is part of the episode, i.e. no earlier step terminated,
+        success: (B,) success flags.
+    Gradients flow through the rollout if grad mode is enabled.
+    """
+    plant = TorchLurePlant.from_env(env) if plant is None else plant
+    horizon = env.time_max + 1 if horizon is None else horizon
+    x = torch.as_tensor(x0, dtype = plant.dtype)
+    batch_size = x.shape[0]
+
+    # The implicit layer registers backward hooks in training mode, which fails without grad
+    training = model.training
+    if not torch.is_grad_enabled():
+        model.eval()
+
+    xi = model.get_initial_state()[0].expand(batch_size, -1)
+    alive = torch.ones(batch_size, dtype = torch.bool)
+    states = []
+    actions = []
+    mask = []
+    try:
+        for _ in range(horizon):
+            states.append(x)
+            mask.append(alive)
+            outputs, [xi] = model.forward_rnn(plant.obs(x).unsqueeze(1), [xi], None)
+            action = outputs[:, 0, :plant.nu]
+            actions.append(action)
+            x = plant.step(x, plant.clip(action))
+            if fail_on_state_space:
+                alive = alive & plant.in_bounds(x)
+    finally:
+        model.train(training)
+
+    success = alive & (torch.linalg.norm(x.detach(), dim = 1) <= success_tol)
+    return torch.stack(states, dim = 1), torch.stack(actions, dim = 1), torch.stack(mask, dim = 1), success
@@ -0,0 +1,107 @@
+"""
+Datasets of plant transitions (x, u) -> x+ for system identification with implicit models: states and inputs are
+drawn uniformly from a box (default: the env's state and action spaces) and stepped at once with the env's
+batch_step. Large datasets are generated in fixed-size shards, optionally fanned out over a process pool, and
+datasets with a seed are cached to disk (see models.cache), keyed by the env, the source of its dynamics, its config
+and the sampling box.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+
+from models.cache import cache_dir, hash_key, source_hash
+
+# Env owned by each worker process, built once by _init_worker
+_env = None
+
+def _init_worker(env_cstor, env_config):
+    global _env
+    _env = env_cstor(env_config)
+
+def sample_transitions(env, n, state_high, action_high, rng):
+    """
+    n transitions of env from states and inputs drawn uniformly from [-state_high, state_high] and
+    [-action_high, action_high]. Inputs are clipped and scaled by the env's batch_step, as by its step.
+    Returns (n, nx) states, (n, nu) inputs and (n, nx) next states.
+    """
+    states = (rng.uniform(-1, 1, size = (n, state_high.shape[0])) * state_high).astype(np.float32)
+    actions = (rng.uniform(-1, 1, size = (n, action_high.shape[0])) * action_high).astype(np.float32)
+    next_states, _ = env.batch_step(states, actions)
+    return states, actions, np.asarray(next_states, dtype = np.float32)
+
+def _generate_shard(n, state_high, action_high, seed_seq):
+    return sample_transitions(_env, n, state_high, action_high, np.random.default_rng(seed_seq))
+
+def dynamics_hash(env):
+    """
+    Hash of the source of the classes defining env's transitions: the env's class and its bases, and the class of
+    its plant (which batch_step calls), so that changing their code invalidates cached datasets.
+    """
+    classes = list(type(env).__mro__)
+    if hasattr(env, 'plant'):
+        classes += list(type(env.plant).__mro__)
+    return hash_key(*[source_hash(cls) for cls in classes])
+
+def _cache_path(env, env_cstor, env_config, n, seed, state_high, action_high, shard_size, version):
+    directory = cache_dir()
+    if directory is None or seed is None:
+        return None
+    key = hash_key(
+        'transitions', f'{env_cstor.__module__}.{env_cstor.__qualname__}', dynamics_hash(env), version,
+        [(name, value) for (name, value) in sorted(env_config.items())],
+        'uniform', state_high, action_high, n, seed, shard_size
+    )
+    return os.path.join(directory, 'transitions', f'{key}.npz')
+
+def generate_transitions(
+    env_cstor, env_config, n, seed = None, state_high = None, action_high = None,
+    shard_size = 65536, num_workers = 1, start_method = 'spawn', version = 1
+):
+    """
+    n transitions (states, inputs, next states) of env_cstor(env_config), see sample_transitions.
+    state_high, action_high: half-widths of the sampling box (default: the highs of the state and action spaces).
+    The transitions are generated in shards of shard_size, each with its own child of the seed, so the dataset
+    does not depend on num_workers. num_workers > 1 generates the shards on a process pool.
+    Datasets with a seed are loaded from the disk cache if present, and saved to it otherwise. The cache key
+    includes the source of the env's and plant's classes (see dynamics_hash). version should be bumped when the
+    transitions change in a way the source does not show (e.g. loaded model weights).
+    """
+    env = env_cstor(env_config)
+    state_high = np.asarray(env.state_space.high if state_high is None else state_high, dtype = np.float32)
+    action_high = np.asarray(env.action_space.high if action_high is None else action_high, dtype = np.float32)
+
+    path = _cache_path(env, env_cstor, env_config, n, seed, state_high, action_high, shard_size, version)
+    if path is not None and os.path.exists(path):
+        with np.load(path) as data:
+            return data['states'], data['actions'], data['next_states']
+
+    t0 = time.perf_counter()
+    sizes = [min(shard_size, n - start) for start in range(0, n, shard_size)]
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(sizes))
+    if num_workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(
+            max_workers = num_workers, mp_context = multiprocessing.get_context(start_method),
+            initializer = _init_worker, initargs = (env_cstor, env_config)
+        ) as pool:
+            shards = list(pool.map(
+                _generate_shard, sizes, [state_high]*len(sizes), [action_high]*len(sizes), seed_seqs
+            ))
+    else:
+        shards = [sample_transitions(env, size, state_high, action_high, np.random.default_rng(seed_seq))
+            for (size, seed_seq) in zip(sizes, seed_seqs)]
+    states, actions, next_states = [np.concatenate(arrays) for arrays in zip(*shards)]
+    print(f'Dataset: generated {n} transitions in {time.perf_counter() - t0:.2f} s')
+
+    if path is not None:
+        try:
+            # Write then rename, so that concurrent runs never read a partial file
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+            np.savez(tmp_path, states = states, actions = actions, next_states = next_states)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f'Dataset: could not save transitions to {path}: {e}')
+    return states, actions, next_states
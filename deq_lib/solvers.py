@@ -8,9 +8,7 @@ import numpy as np
 import pickle
 import sys
 import os
-from scipy.optimize import root
 import time
-from termcolor import colored
 
 
 def _safe_norm(v):
@@ -276,6 +274,7 @@ def analyze_broyden(res_info, err=None, judge=True, name='forward', training=Tru
         return nstep >= threshold or (nstep == 0 and (diff != diff or diff > eps)) or prot_break or torch.isnan(res_est).any()
     
     assert (err is not None), "Must provide err information when not in judgment mode"
+    from termcolor import colored
     prefix, color = ('', 'red') if name == 'forward' else ('back_', 'blue')
     eval_prefix = '' if training else 'eval_'
     
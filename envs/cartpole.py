@@ -1,6 +1,7 @@
 import gym
 from gym import spaces
 import numpy as np
+from envs.lure_plant import LurePlant
 
 class CartpoleEnv(gym.Env):
     def __init__(self, env_config):
@@ -65,17 +66,19 @@ class CartpoleEnv(gym.Env):
             self.CG = self.CG / self.observation_space.high[:, np.newaxis]
 
         self.state_size = self.nx
+
+        self.plant = LurePlant(self.AG, self.BG, self.CG, self.max_control, x_max)
     
     def step(self, u):
         x1, x2, x3, x4 = self.state
-        u = np.clip(u, -self.max_control, self.max_control)
+        u = self.plant.clip(u)
         # costs = 1/self.factor**2 * (1.0 * x1**2 + 1.0 * x2**2 + 0.04 * x3**2 + 0.1 * x4**2 + 0.2 * (u * self.factor)**2) - 5.0
         costs = 10*(np.max([0, np.abs(u[0]*self.factor)-self.soft_max_control]) - self.max_control*self.factor)
 
-        self.state = self.AG @ self.state + self.BG @ u
+        self.state = self.plant.step(self.state, u)
 
         terminated = False
-        if self.time >= self.time_max or self.state not in self.state_space:
+        if self.time >= self.time_max or not self.plant.in_bounds(self.state):
             terminated = True
 
         self.time += 1
@@ -90,7 +93,27 @@ class CartpoleEnv(gym.Env):
         return self.get_obs()
     
     def get_obs(self):
-        return self.CG @ self.state
+        return self.plant.obs(self.state)
+
+    def batch_step(self, states, u):
+        """
+        Steps an (N, nx) array of states under an (N, nu) array of inputs at once, as N calls to step would.
+        Returns the next states and the rewards.
+        """
+        u = self.plant.clip(u)
+        costs = 10*(np.maximum(0, np.abs(u[:, 0]*self.factor)-self.soft_max_control) - self.max_control*self.factor)
+        return self.plant.batch_step(states, u), -costs
+
+    def batch_reset(self, n):
+        """n initial states, drawn as in reset."""
+        high = np.array([0.05, 0.05, 0.25, 0.15], dtype=np.float32)
+        return self.np_random.uniform(low=-high, high=high, size=(n, self.nx)).astype(np.float32)
+
+    def batch_obs(self, states):
+        return self.plant.batch_obs(states)
 
     def is_nonlin(self):
-        return False
\ No newline at end of file
+        return self.plant.is_nonlin()
+
+    def get_params(self):
+        return self.plant.get_params()
@@ -1,6 +1,7 @@
 import gym
 from gym import spaces
 import numpy as np
+from envs.lure_plant import LurePlant
 
 class LinearizedInvertedPendulumEnv(gym.Env):
 
@@ -54,10 +55,12 @@ class LinearizedInvertedPendulumEnv(gym.Env):
 
         self.state_size = self.nx
 
+        self.plant = LurePlant(self.AG, self.BG, self.CG, self.max_torque, x_max)
+
     def step(self, u):
         th, thdot = self.state
 
-        u = np.clip(u, -self.max_torque, self.max_torque)
+        u = self.plant.clip(u)
         # costs = 1/self.factor**2*(th**2 + .1*thdot**2 + 1*((u*self.factor)**2)) - 5
         # costs = 10*(np.max([0, np.abs(u[0]*self.factor)-self.soft_max_torque]) - self.max_torque*self.factor)
 
@@ -67,10 +70,10 @@ class LinearizedInvertedPendulumEnv(gym.Env):
         max_Js = 1*self.max_pos**2 + 0.1*self.max_speed**2 + 0.01*self.max_torque**2
         costs = Ju + Js - max_Ju - max_Js
 
-        self.state = self.AG @ self.state + self.BG @ u
+        self.state = self.plant.step(self.state, u)
 
         terminated = False
-        if self.time >= self.time_max or self.state not in self.state_space:
+        if self.time >= self.time_max or not self.plant.in_bounds(self.state):
             terminated = True
 
         self.time += 1
@@ -86,7 +89,31 @@ class LinearizedInvertedPendulumEnv(gym.Env):
         return self.get_obs()
 
     def get_obs(self):
-        return  self.CG @ self.state
+        return self.plant.obs(self.state)
+
+    def batch_step(self, states, u):
+        """
+        Steps an (N, nx) array of states under an (N, nu) array of inputs at once, as N calls to step would.
+        Returns the next states and the rewards.
+        """
+        u = self.plant.clip(u)
+        Ju = 5*np.maximum(0, np.abs(u[:, 0]*self.factor)-self.soft_max_torque)
+        max_Ju = 5*(self.max_torque-self.soft_max_torque)
+        Js = 1*states[:, 0]**2 + 0.1*states[:, 1]**2 + 0.01*(u[:, 0]*self.factor)**2
+        max_Js = 1*self.max_pos**2 + 0.1*self.max_speed**2 + 0.01*self.max_torque**2
+        costs = Ju + Js - max_Ju - max_Js
+        return self.plant.batch_step(states, u), -costs
+
+    def batch_reset(self, n):
+        """n initial states, drawn as in reset."""
+        high = np.array([np.pi/30, np.pi/20], dtype=np.float32) * self.factor
+        return self.np_random.uniform(low=-high, high=high, size=(n, self.nx)).astype(np.float32)
+
+    def batch_obs(self, states):
+        return self.plant.batch_obs(states)
 
     def is_nonlin(self):
-        return False
+        return self.plant.is_nonlin()
+
+    def get_params(self):
+        return self.plant.get_params()
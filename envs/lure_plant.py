@@ -0,0 +1,107 @@
+import numpy as np
+
+def sin(v):
+    """sin of numpy arrays and torch tensors, so that Delta can also be used by the torch plants (envs.torch_plant)."""
+    return v.sin() if hasattr(v, 'sin') else np.sin(v)
+
+class LurePlant:
+    """
+    Discrete time plant in feedback with a static nonlinearity Delta, sector bounded in [C_Delta, D_Delta]:
+        x(k+1) = AG x(k) + BG1 w(k) + BG2 (input_scale * u(k))
+        y(k)   = CG1 x(k)
+        v(k)   = CG2 x(k) + DG3 w(k),  w(k) = Delta(v(k))
+    Linear plants are given without BG1, CG2, DG3 and Delta.
+
+    Inputs are clipped to [-max_input, max_input] and states are in bounds if -state_max <= x <= state_max.
+    The single step methods act on (nx,) states, the batch methods on (N, nx) states.
+    """
+
+    def __init__(
+        self, AG, BG2, CG1, max_input, state_max,
+        BG1 = None, CG2 = None, DG3 = None, Delta = None, C_Delta = 0, D_Delta = 1, input_scale = 1
+    ):
+        self.AG = AG
+        self.BG2 = BG2
+        self.CG1 = CG1
+        self.BG1 = BG1
+        self.CG2 = CG2
+        self.DG3 = DG3
+        self.Delta = Delta
+        self.C_Delta = C_Delta
+        self.D_Delta = D_Delta
+        self.input_scale = input_scale
+        self.max_input = max_input
+
+        self.nonlin = Delta is not None
+        if self.nonlin:
+            # With DG3 != 0, w would be the solution of an implicit equation
+            assert DG3 is None or not np.any(DG3), 'Only plants with DG3 = 0 can be stepped'
+
+        # Precomputed transposes for the batched (row-major) products, and the scaled input matrix
+        self.BG2_s = BG2 * input_scale
+        self.AG_T = np.ascontiguousarray(AG.T)
+        self.BG2_sT = np.ascontiguousarray(self.BG2_s.T)
+        self.CG1_T = np.ascontiguousarray(CG1.T)
+        if self.nonlin:
+            self.BG1_T = np.ascontiguousarray(BG1.T)
+            self.CG2_T = np.ascontiguousarray(CG2.T)
+
+        self.state_max = np.asarray(state_max, dtype=np.float32)
+        self.state_min = -self.state_max
+
+        # Scratch buffers of step_into
+        self.dtype = np.result_type(AG, self.BG2_s)
+        self._x_scratch = np.zeros(AG.shape[0], dtype=self.dtype)
+        if self.nonlin:
+            self._v_scratch = np.zeros(CG2.shape[0], dtype=self.dtype)
+
+    def clip(self, u):
+        return np.clip(u, -self.max_input, self.max_input)
+
+    def step(self, x, u):
+        """Next state from state x and (clipped) input u."""
+        x_next = self.AG @ x + self.BG2_s @ u
+        if self.nonlin:
+            x_next += self.BG1 @ self.Delta(self.CG2 @ x)
+        return x_next
+
+    def step_into(self, x, u, out):
+        """
+        step writing the next state into out (which must not be x), without allocating for linear plants.
+        x, u and out must have the plant's dtype.
+        """
+        np.dot(self.AG, x, out=out)
+        np.dot(self.BG2_s, u, out=self._x_scratch)
+        out += self._x_scratch
+        if self.nonlin:
+            np.dot(self.CG2, x, out=self._v_scratch)
+            out += self.BG1 @ self.Delta(self._v_scratch)
+        return out
+
+    def batch_step(self, X, U):
+        """Next states from (N, nx) states X and (N, nu) (clipped) inputs U."""
+        X_next = X @ self.AG_T + U @ self.BG2_sT
+        if self.nonlin:
+            X_next += self.Delta(X @ self.CG2_T) @ self.BG1_T
+        return X_next
+
+    def obs(self, x):
+        return self.CG1 @ x
+
+    def batch_obs(self, X):
+        return X @ self.CG1_T
+
+    def in_bounds(self, x):
+        return bool(np.all(x >= self.state_min) and np.all(x <= self.state_max))
+
+    def batch_in_bounds(self, X):
+        return np.all((X >= self.state_min) & (X <= self.state_max), axis=1)
+
+    def is_nonlin(self):
+        return self.nonlin
+
+    def get_params(self):
+        """[AG, BG1, BG2, CG1, CG2, DG3, C_Delta, D_Delta] for nonlinear plants, [AG, BG2, CG1] for linear ones."""
+        if self.nonlin:
+            return [self.AG, self.BG1, self.BG2, self.CG1, self.CG2, self.DG3, self.C_Delta, self.D_Delta]
+        return [self.AG, self.BG2, self.CG1]
@@ -1,6 +1,7 @@
 import gym
 from gym import spaces
 import numpy as np
+from envs.lure_plant import LurePlant, sin
 
 class OtherInvertedPendulumEnv(gym.Env):
     """
@@ -69,13 +70,34 @@ class OtherInvertedPendulumEnv(gym.Env):
         self.nonlin_size = 1
 
         # Sector bounds on Delta (in this case Delta = theta - sin(theta))
-        self.Delta = lambda v: v - np.sin(v)
+        self.Delta = lambda v: v - sin(v)
         # Delta is sector-bounded [0, 1] from [-pi, pi], [0, 1.2173] in general
         self.C_Delta = 0
         # self.D_Delta = 1
         # self.D_Delta = 1.2173
         self.D_Delta = 0.41 # -1.684 to 1.684 rad
 
+        # Inputs are scaled by action_scale before being passed to the plant
+        self.action_scale = self.factor
+        self.plant = LurePlant(
+            self.AG, self.BG2, self.CG1, self.max_torque, x_max,
+            BG1 = self.BG1, CG2 = self.CG2, DG3 = self.DG3, Delta = self.Delta,
+            C_Delta = self.C_Delta, D_Delta = self.D_Delta
+        )
+
+        # Preallocated input and observation arrays. step and reset bind env.state to a new array, so callers
+        # may keep it; the ring buffer below is internal.
+        self.state = np.zeros(self.nx, dtype=self.plant.dtype)
+        self.u = np.zeros(self.nu, dtype=self.plant.dtype)
+        self.obs = np.zeros(self.CG1.shape[0], dtype=np.result_type(self.CG1, self.state))
+        # Ring buffer of the last max_buff_size states, with states[buff_idx] the next slot to write
+        self.states = np.zeros((self.max_buff_size, self.nx), dtype=self.plant.dtype)
+        self.buff_idx = 0
+        self.buff_len = 0
+        # Termination bounds as floats, compared to the state's entries without going through Box.contains
+        self.pos_bound = float(x_max[0])
+        self.speed_bound = float(x_max[1])
+
         # self.max_reward = 3
         self.max_reward = self.max_torque**2 
         # self.max_reward = 5# 1*self.max_pos**2 + 0.1*self.max_speed**2 + 0.01*self.max_torque**2
@@ -102,11 +124,10 @@ class OtherInvertedPendulumEnv(gym.Env):
         self.nq = self.BG1.shape[1]
 
     def step(self, u, fail_on_state_space = True, fail_on_time_limit = True):
-        th, thdot = self.state
-        prev_th, prev_thdot = np.mean(self.states, axis = 0)
+        th, thdot = self.state.tolist()
 
-        u = np.clip(u, -self.max_torque, self.max_torque)
-        u *= self.factor
+        u = np.clip(u, -self.max_torque, self.max_torque, out = self.u)
+        u *= self.action_scale
 
         # Js = 1*th**2 + 0.1*thdot**2 + 0.01*(u[0])**2
         # max_Js = 5
@@ -116,14 +137,17 @@ class OtherInvertedPendulumEnv(gym.Env):
         max_Ju = self.max_torque**2
         costs = Ju - max_Ju
         
-        self.states.append(self.state)
-        if len(self.states) > self.max_buff_size:
-            del self.states[0]
-        self.state = self.AG @ self.state + self.BG1 @ self.Delta(self.CG2 @ self.state) + self.BG2 @ u
+        self.states[self.buff_idx] = self.state
+        self.buff_idx = (self.buff_idx + 1) % self.max_buff_size
+        self.buff_len = min(self.buff_len + 1, self.max_buff_size)
+        self.state = self.plant.step_into(self.state, u, np.empty_like(self.state))
         
         terminated = False
-        if (fail_on_time_limit and self.time >= self.time_max) or (fail_on_state_space and self.state not in self.state_space):
+        if fail_on_time_limit and self.time >= self.time_max:
             terminated = True
+        elif fail_on_state_space:
+            th, thdot = self.state.tolist()
+            terminated = not (-self.pos_bound <= th <= self.pos_bound and -self.speed_bound <= thdot <= self.speed_bound)
 
         self.time += 1
 
@@ -133,19 +157,44 @@ class OtherInvertedPendulumEnv(gym.Env):
         if state is None:
             high = np.array([0.3 * self.max_pos, 0.1 * self.max_speed], dtype=np.float32) * self.factor
             # high = np.array([0.6 * self.max_pos, 0.25 * self.max_speed], dtype=np.float32) * self.factor
-            self.state = self.np_random.uniform(low=-high, high=high).astype(np.float32)
+            self.state = self.np_random.uniform(low=-high, high=high).astype(self.plant.dtype)
         else:
-            self.state = state
-        self.states = [self.state]
+            self.state = np.array(state, dtype=self.plant.dtype)
+        self.states[0] = self.state
+        self.buff_idx = 1
+        self.buff_len = 1
         self.time = 0
 
         return self.get_obs()
 
     def get_obs(self):
-        return self.CG1 @ self.state
+        np.dot(self.CG1, self.state, out = self.obs)
+        return self.obs.copy()
+
+    def recent_states(self):
+        """The last (up to max_buff_size) states before each step, oldest first."""
+        idx = (self.buff_idx - self.buff_len + np.arange(self.buff_len)) % self.max_buff_size
+        return self.states[idx]
+
+    def batch_step(self, states, u):
+        """
+        Steps an (N, nx) array of states under an (N, nu) array of inputs at once, as N calls to step would.
+        Returns the next states and the rewards.
+        """
+        u = self.plant.clip(u) * self.action_scale
+        costs = u[:, 0]**2 - self.max_torque**2
+        return self.plant.batch_step(states, u), -costs
+
+    def batch_reset(self, n):
+        """n initial states, drawn as in reset."""
+        high = np.array([0.3 * self.max_pos, 0.1 * self.max_speed], dtype=np.float32) * self.factor
+        return self.np_random.uniform(low=-high, high=high, size=(n, self.nx)).astype(np.float32)
+
+    def batch_obs(self, states):
+        return self.plant.batch_obs(states)
 
     def is_nonlin(self):
-        return True
+        return self.plant.is_nonlin()
 
     def get_params(self):
-        return [self.AG, self.BG1, self.BG2, self.CG1, self.CG2, self.DG3, self.C_Delta, self.D_Delta]
\ No newline at end of file
+        return self.plant.get_params()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import gym
 from gym import spaces
 import numpy as np
+from envs.lure_plant import LurePlant
 
 class PowergridEnv(gym.Env):
 
@@ -76,17 +77,19 @@ class PowergridEnv(gym.Env):
             self.CG = self.CG / self.observation_space.high[:, np.newaxis]
 
         self.state_size = self.nx
+
+        self.plant = LurePlant(self.AG, self.BG, self.CG, self.max_control, x_max)
         
 
     def step(self,u):
-        u = np.clip(u, -self.max_control, self.max_control)
+        u = self.plant.clip(u)
         # costs = 1/self.factor**2 * (np.linalg.norm(self.state, 2)**2 + 0.2 * np.linalg.norm(u / self.control_scale * self.factor, 2)**2) - 5.0
         costs = 10*(np.max([0, np.linalg.norm(u*self.factor, 2)-self.soft_max_control]) - self.max_control*self.factor)
         
-        self.state = self.AG @ self.state + self.BG @ u
+        self.state = self.plant.step(self.state, u)
 
         terminated = False
-        if self.time >= self.time_max or self.state not in self.state_space:
+        if self.time >= self.time_max or not self.plant.in_bounds(self.state):
             terminated = True
 
         self.time += 1
@@ -101,7 +104,27 @@ class PowergridEnv(gym.Env):
         return self.get_obs()
 
     def get_obs(self):
-        return self.CG @ self.state
+        return self.plant.obs(self.state)
+
+    def batch_step(self, states, u):
+        """
+        Steps an (N, nx) array of states under an (N, nu) array of inputs at once, as N calls to step would.
+        Returns the next states and the rewards.
+        """
+        u = self.plant.clip(u)
+        costs = 10*(np.maximum(0, np.linalg.norm(u*self.factor, 2, axis=1)-self.soft_max_control) - self.max_control*self.factor)
+        return self.plant.batch_step(states, u), -costs
+
+    def batch_reset(self, n):
+        """n initial states, drawn as in reset."""
+        high = np.block([self.thetalim / 10, self.omegalim / 10]).astype(np.float32) * self.factor
+        return self.np_random.uniform(low=-high, high=high, size=(n, self.nx)).astype(np.float32)
+
+    def batch_obs(self, states):
+        return self.plant.batch_obs(states)
 
     def is_nonlin(self):
-        return False
+        return self.plant.is_nonlin()
+
+    def get_params(self):
+        return self.plant.get_params()
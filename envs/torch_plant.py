@@ -0,0 +1,51 @@
+import numpy as np
+import torch
+
+class TorchLurePlant:
+    """
+    Torch counterpart of LurePlant, stepping (B, nx) state tensors so that closed loop rollouts can be
+    differentiated with respect to the controller parameters.
+    action_scale: scaling applied to the (clipped) inputs by the env before they are passed to the plant.
+    """
+
+    def __init__(self, plant, action_scale = 1, dtype = torch.float32):
+        def tensor(a):
+            return torch.as_tensor(np.asarray(a), dtype = dtype)
+
+        self.nonlin = plant.is_nonlin()
+        self.Delta = plant.Delta
+        self.max_input = plant.max_input
+        self.action_scale = action_scale
+        self.dtype = dtype
+
+        self.AG_T = tensor(plant.AG.T)
+        self.BG2_sT = tensor(plant.BG2_s.T)
+        self.CG1_T = tensor(plant.CG1.T)
+        if self.nonlin:
+            self.BG1_T = tensor(plant.BG1.T)
+            self.CG2_T = tensor(plant.CG2.T)
+        self.state_max = tensor(plant.state_max)
+
+        self.nx = self.AG_T.shape[0]
+        self.nu = self.BG2_sT.shape[0]
+
+    @classmethod
+    def from_env(cls, env, dtype = torch.float32):
+        return cls(env.plant, action_scale = getattr(env, 'action_scale', 1), dtype = dtype)
+
+    def clip(self, U):
+        """Clipped and scaled inputs, as the env passes them to the plant."""
+        return torch.clamp(U, -self.max_input, self.max_input) * self.action_scale
+
+    def step(self, X, U):
+        """Next states from (B, nx) states X and (B, nu) inputs U, which have been passed through clip."""
+        X_next = X @ self.AG_T + U @ self.BG2_sT
+        if self.nonlin:
+            X_next = X_next + self.Delta(X @ self.CG2_T) @ self.BG1_T
+        return X_next
+
+    def obs(self, X):
+        return X @ self.CG1_T
+
+    def in_bounds(self, X):
+        return torch.all(torch.abs(X) <= self.state_max, dim = 1)
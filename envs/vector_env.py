@@ -0,0 +1,113 @@
+"""
+Batched counterparts of the plant envs, stepping an (N, nx) array of states at once through the plants'
+batch_step, batch_reset and batch_obs, for use as RLlib VectorEnvs.
+
+RLlib steps a VectorEnv as given (it does not stack copies of it for num_envs_per_worker), so the number of
+plants per worker is set by "num_envs" in the env_config, e.g.
+    config["env"] = InvertedPendulumVectorEnv
+    config["env_config"] = {..., "num_envs": 16}
+The policy then computes the actions of all N plants in one batched forward pass.
+"""
+
+import numpy as np
+from ray.rllib.env.vector_env import VectorEnv
+
+from envs.cartpole import CartpoleEnv
+from envs.inverted_pendulum import InvertedPendulumEnv
+from envs.learned_inverted_pendulum import LearnedInvertedPendulumEnv
+from envs.linearized_inverted_pendulum import LinearizedInvertedPendulumEnv
+from envs.other_inverted_pendulum import OtherInvertedPendulumEnv
+from envs.pendubot import PendubotEnv
+from envs.powergrid import PowergridEnv
+from envs.vehicle import VehicleLateralEnv
+
+class PlantVectorEnv(VectorEnv):
+    """
+    N copies of the plant `plant_cls` with independent states, episode times and terminations.
+    env_config: config of the plant, plus
+        num_envs:   number of plants N (default 1).
+        auto_reset: reset terminated plants within vector_step, returning the reset observation and the final one in
+                    the info under 'terminal_obs' (default False, as RLlib calls reset_at on terminated plants itself).
+    Attributes of the plant (get_params, is_nonlin, state_size, time_max, ...) are available on the vector env, so it
+    can also be used as the plant_cstor of the models.
+    """
+
+    plant_cls = None
+
+    def __init__(self, env_config):
+        env_config = dict(env_config)
+        num_envs = env_config.pop('num_envs', 1)
+        self.auto_reset = env_config.pop('auto_reset', False)
+
+        self.env = self.plant_cls(env_config)
+        super().__init__(self.env.observation_space, self.env.action_space, num_envs)
+
+        self.states = np.zeros((num_envs, self.env.nx), dtype=np.float32)
+        self.times = np.zeros(num_envs, dtype=np.int64)
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the vector env itself
+        if name == 'env':
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def vector_reset(self):
+        self.states[:] = self.env.batch_reset(self.num_envs)
+        self.times[:] = 0
+        return list(self.env.batch_obs(self.states))
+
+    def reset_at(self, index = None):
+        index = 0 if index is None else index
+        self.states[index] = self.env.batch_reset(1)[0]
+        self.times[index] = 0
+        return self.env.batch_obs(self.states[index:index+1])[0]
+
+    def vector_step(self, actions):
+        u = np.asarray(actions, dtype=np.float32).reshape(self.num_envs, -1)
+        states, rewards = self.env.batch_step(self.states, u)
+        self.states[:] = states
+
+        dones = (self.times >= self.env.time_max) | ~self.env.plant.batch_in_bounds(self.states)
+        self.times += 1
+
+        obs = self.env.batch_obs(self.states)
+        infos = [{} for _ in range(self.num_envs)]
+        if self.auto_reset and np.any(dones):
+            done_idx = np.flatnonzero(dones)
+            for i in done_idx:
+                infos[i]['terminal_obs'] = obs[i].copy()
+            self.states[done_idx] = self.env.batch_reset(len(done_idx))
+            self.times[done_idx] = 0
+            obs[done_idx] = self.env.batch_obs(self.states[done_idx])
+
+        return list(obs), list(np.asarray(rewards, dtype=np.float32)), list(dones), infos
+
+    def get_sub_environments(self):
+        return []
+
+    def get_unwrapped(self):
+        return self.get_sub_environments()
+
+class CartpoleVectorEnv(PlantVectorEnv):
+    plant_cls = CartpoleEnv
+
+class InvertedPendulumVectorEnv(PlantVectorEnv):
+    plant_cls = InvertedPendulumEnv
+
+class LearnedInvertedPendulumVectorEnv(PlantVectorEnv):
+    plant_cls = LearnedInvertedPendulumEnv
+
+class LinearizedInvertedPendulumVectorEnv(PlantVectorEnv):
+    plant_cls = LinearizedInvertedPendulumEnv
+
+class OtherInvertedPendulumVectorEnv(PlantVectorEnv):
+    plant_cls = OtherInvertedPendulumEnv
+
+class PendubotVectorEnv(PlantVectorEnv):
+    plant_cls = PendubotEnv
+
+class PowergridVectorEnv(PlantVectorEnv):
+    plant_cls = PowergridEnv
+
+class VehicleLateralVectorEnv(PlantVectorEnv):
+    plant_cls = VehicleLateralEnv
@@ -2,6 +2,7 @@ import gym
 from gym import spaces
 from gym.utils import seeding
 import numpy as np
+from envs.lure_plant import LurePlant
 
 class VehicleLateralEnv(gym.Env):
 
@@ -94,13 +95,15 @@ class VehicleLateralEnv(gym.Env):
 
         self.state_size = self.nx
 
+        self.plant = LurePlant(self.AG, self.BG, self.CG, self.max_steering, x_max)
+
         self.max_Js = 1*self.x1lim**2 + 0.1*self.x2lim**2 + 1*self.x3lim**2 + 0.1*self.x4lim**2 + 0.01*self.max_steering**2
         self.max_reward = self.max_Js
 
     def step(self, u):
         e, edot, etheta, ethetadot = self.state
 
-        u = np.clip(u, -self.max_steering, self.max_steering)
+        u = self.plant.clip(u)
         # costs = 0.01 * e**2 + 1/25.0 * edot**2 + etheta**2 + 1/25.0 * ethetadot**2 + 2.0/(np.pi/6.0)**2 * (u*self.factor)**2 - 5.0
         # costs = 10*(np.max([0, np.abs(u[0]*self.factor)-self.soft_max_steering]) - self.max_steering*self.factor)
 
@@ -111,10 +114,10 @@ class VehicleLateralEnv(gym.Env):
         # costs = Ju + Js - (max_Ju + max_Js)/10
         costs = Js - self.max_Js
 
-        self.state = self.AG @ self.state + self.BG @ u
+        self.state = self.plant.step(self.state, u)
 
         terminated = False
-        if self.time >= self.time_max or self.state not in self.state_space:
+        if self.time >= self.time_max or not self.plant.in_bounds(self.state):
             terminated = True
 
         self.time += 1
@@ -131,7 +134,28 @@ class VehicleLateralEnv(gym.Env):
         return self.get_obs()
     
     def get_obs(self):
-        return self.CG @ self.state
+        return self.plant.obs(self.state)
+
+    def batch_step(self, states, u):
+        """
+        Steps an (N, nx) array of states under an (N, nu) array of inputs at once, as N calls to step would.
+        Returns the next states and the rewards.
+        """
+        u = self.plant.clip(u)
+        Js = 1*states[:, 0]**2 + 0.1*states[:, 1]**2 + 1*states[:, 2]**2 + 0.1*states[:, 3]**2 + 0.01*(u[:, 0]*self.factor)**2
+        costs = Js - self.max_Js
+        return self.plant.batch_step(states, u), -costs
+
+    def batch_reset(self, n):
+        """n initial states, drawn as in reset."""
+        high = 0.5*self.state_space.high
+        return self.np_random.uniform(low=-high, high=high, size=(n, self.nx)).astype(np.float32)
+
+    def batch_obs(self, states):
+        return self.plant.batch_obs(states)
 
     def is_nonlin(self):
-        return False
\ No newline at end of file
+        return self.plant.is_nonlin()
+
+    def get_params(self):
+        return self.plant.get_params()
@@ -14,6 +14,13 @@ class ProjRNNModel(BaseRNN, RNNThetaHatParameterization):
         exp_stability_rate = 0.98,
         plant_cstor = None,
         plant_config = None,
+        projector_config = None,
+        projection_service = None,
+        projection_schedule = None,
+        barrier_weight = 0.0,
+        feasible_step = None,
+        profile = None,
+        plant_reduction = None,
         **custom_args
     ):
         assert plant_cstor is not None, "plant_cstor parameter is None"
@@ -22,7 +29,14 @@ class ProjRNNModel(BaseRNN, RNNThetaHatParameterization):
 
         RNNThetaHatParameterization.__init__(
             self, lmi_eps, exp_stability_rate, plant_cstor, plant_config,
-            self.ac_dim, self.ob_dim, self.state_size, self.hidden_size
+            self.ac_dim, self.ob_dim, self.state_size, self.hidden_size,
+            projector_config = projector_config,
+            projection_service = projection_service,
+            projection_schedule = projection_schedule,
+            barrier_weight = barrier_weight,
+            feasible_step = feasible_step,
+            profile = profile,
+            plant_reduction = plant_reduction
         )
 
     @override(BaseRNN)
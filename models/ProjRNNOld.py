@@ -1,7 +1,8 @@
 from models.RNN import RNNModel
 import numpy as np
-from models.rnn_projection import rnn_project, rnn_project_nonlin
-from models.utils import to_numpy, from_numpy    
+from models.rnn_projection import RNNProjector, RNNNonlinProjector
+from models.utils import to_numpy, from_numpy
+from models.profiler import ProjectionProfiler
 
 class ProjRNNOldModel(RNNModel):
     def __init__(
@@ -15,12 +16,14 @@ class ProjRNNOldModel(RNNModel):
         exp_stability_rate = 0.98,
         plant_cstor = None,
         plant_config = None,
+        profile = None,
         **custom_args
     ):
         super().__init__(obs_space, action_space, num_outputs, model_config, name, **custom_args)
 
         self.lmi_eps = lmi_eps
         self.exp_stability_rate = exp_stability_rate
+        self.profiler = ProjectionProfiler(enabled = True, **profile) if profile is not None else ProjectionProfiler()
         
         plant = plant_cstor(plant_config)
         self.plant_is_nonlin = plant.is_nonlin()
@@ -39,6 +42,30 @@ class ProjRNNOldModel(RNNModel):
 
         self.Q1_bar = None
         self.Q2_bar = np.eye(self.hidden_size)
+        self.projector = None # Built at the first projection, then reused
+
+    def build_projector(self):
+        if self.plant_is_nonlin:
+            return RNNNonlinProjector(
+                self.Ae, self.Be1, self.Be2, self.Ce1, self.De1, self.Ce2, self.M,
+                self.state_size, self.hidden_size,
+                eps = self.lmi_eps,
+                decay_factor = self.exp_stability_rate,
+                profiler = self.profiler
+            )
+        return RNNProjector(
+            self.AG, self.BG, self.CG,
+            self.state_size, self.hidden_size,
+            eps = self.lmi_eps,
+            decay_factor = self.exp_stability_rate,
+            profiler = self.profiler
+        )
+
+    def projection_stats(self):
+        stats = self.profiler.metrics()
+        if self.projector is not None:
+            stats.update({f'projection_{path}': count for (path, count) in self.projector.counts.items()})
+        return stats
 
     def project(self):
         AK_t  = to_numpy(self.AK_tT).T
@@ -50,21 +77,12 @@ class ProjRNNOldModel(RNNModel):
         CK2_t = to_numpy(self.CK2_tT).T
         DK4_t = to_numpy(self.DK4_tT).T
 
-        if self.plant_is_nonlin:
-            AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, self.Q1_bar, self.Q2_bar = rnn_project_nonlin(
-                AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t,
-                self.Q1_bar, self.Q2_bar,
-                self.Ae, self.Be1, self.Be2, self.Ce1, self.De1, self.Ce2, self.M,
-                eps = self.lmi_eps,
-                decay_factor = self.exp_stability_rate
-            )
-        else:
-            AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, self.Q1_bar, self.Q2_bar = rnn_project(
-                AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, self.Q1_bar, self.Q2_bar,
-                self.AG, self.BG, self.CG,
-                eps = self.lmi_eps,
-                decay_factor = self.exp_stability_rate
-            )
+        if self.projector is None:
+            self.projector = self.build_projector()
+
+        AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, self.Q1_bar, self.Q2_bar = self.projector.project(
+            AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, self.Q1_bar, self.Q2_bar
+        )
 
         missing, unexpected = self.load_state_dict({
             'AK_tT' : from_numpy(AK_t.T), 
@@ -1,9 +1,28 @@
 """
 This folder contains controller models and an implicit model for system identification.
+
+The models are imported on first access (PEP 562), so that importing a submodule such as models.frozen or
+models.controller does not import ray, cvxpy and scipy, which only the RLlib models and projectors need.
 """
 
-from models.RNN import RNNModel
-from models.ProjRNNOld import ProjRNNOldModel
-from models.ProjRNN import ProjRNNModel
-from models.ProjREN import ProjRENModel
-from models.implicit_model import ImplicitModel
+import importlib
+
+_lazy_models = {
+    'RNNModel': 'models.RNN',
+    'ProjRNNOldModel': 'models.ProjRNNOld',
+    'ProjRNNModel': 'models.ProjRNN',
+    'ProjRENModel': 'models.ProjREN',
+    'ImplicitModel': 'models.implicit_model',
+}
+
+__all__ = list(_lazy_models)
+
+def __getattr__(name):
+    if name in _lazy_models:
+        value = getattr(importlib.import_module(_lazy_models[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'models' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,73 @@
+"""
+Projection of many independent theta hat candidates against the same plant, e.g. for population based
+training or sweeps, fanned out over a process pool.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Projector owned by each worker process, built once by _init_worker
+_projector = None
+_initial_Lambda_p = None
+
+def _init_worker(projector_cls, args, kwargs):
+    global _projector, _initial_Lambda_p
+    _projector = projector_cls(*args, **kwargs)
+    if hasattr(_projector, 'pLambda_p'):
+        _initial_Lambda_p = _projector.pLambda_p.value.copy()
+
+def _project(theta_h, Lambda_p):
+    # Candidates are independent, so none inherits the Lambda_p left by a previous candidate on this worker.
+    nonlin = _initial_Lambda_p is not None
+    if nonlin:
+        _projector.pLambda_p.value = _initial_Lambda_p if Lambda_p is None else Lambda_p
+    t0 = time.perf_counter()
+    result = _projector.project(*theta_h)
+    seconds = time.perf_counter() - t0
+    Lambda_p = _projector.pLambda_p.value if nonlin else None
+    return result, Lambda_p, seconds
+
+class BatchProjector:
+    """
+    Pool of worker processes, each holding a projector built (and its problems compiled) once from
+    (projector_cls, args, kwargs), e.g. ThetaHatParameterization.projector_spec.
+    num_workers: number of processes (default: number of CPUs).
+    mosek_threads: number of threads each MOSEK solve may use. One thread per worker avoids oversubscribing cores.
+    start_method: multiprocessing start method. 'spawn' avoids forking a process with solver or torch threads.
+    """
+
+    def __init__(self, projector_cls, args, kwargs, num_workers = None, mosek_threads = 1, start_method = 'spawn'):
+        kwargs = dict(kwargs)
+        if mosek_threads is not None:
+            solver_args = dict(kwargs.get('solver_args') or {})
+            solver_args['mosek_params'] = {'MSK_IPAR_NUM_THREADS': mosek_threads}
+            kwargs['solver_args'] = solver_args
+
+        self.executor = ProcessPoolExecutor(
+            max_workers = num_workers,
+            mp_context = multiprocessing.get_context(start_method),
+            initializer = _init_worker,
+            initargs = (projector_cls, args, kwargs)
+        )
+
+    def project(self, theta_hs, Lambda_ps = None):
+        """
+        Projects each theta hat in `theta_hs`, a list of [X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h].
+        Lambda_ps: for nonlinear plants, optional Lambda_p of each candidate (default: the projector's initial Lambda_p).
+        Returns, in the order of `theta_hs`, tuples (result, Lambda_p, seconds) where result is what the projector's
+        `project` returns, Lambda_p is the candidate's Lambda_p after projecting (None for linear plants)
+        and seconds is the time spent projecting in the worker.
+        """
+        if Lambda_ps is None:
+            Lambda_ps = [None for _ in theta_hs]
+        return list(self.executor.map(_project, theta_hs, Lambda_ps))
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
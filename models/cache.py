@@ -0,0 +1,97 @@
+"""
+In-process and on-disk memoization of numpy results which depend only on their (array) arguments,
+such as the initial certificates of the RNN projection.
+
+Entries are keyed by the function's source and version as well as its arguments, so that changing the function
+invalidates them. Results returned wrapped in Uncached (e.g. from inaccurate solves) are not cached.
+
+Results are stored under $REN_CACHE_DIR (default ~/.cache/stabilizing-ren). Setting REN_CACHE_DIR to an
+empty string keeps the in-process cache but disables the disk cache.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import numpy as np
+
+_memory = {}
+
+def cache_dir():
+    """Directory of the disk cache, or None if it is disabled."""
+    path = os.environ.get('REN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'stabilizing-ren'))
+    return path or None
+
+def hash_key(*items):
+    """Hash of arrays (dtype, shape and contents) and other values (repr)."""
+    h = hashlib.sha256()
+    for item in items:
+        if isinstance(item, np.ndarray):
+            item = np.ascontiguousarray(item)
+            h.update(str((item.dtype, item.shape)).encode())
+            h.update(item.tobytes())
+        elif isinstance(item, (list, tuple)):
+            h.update(hash_key(*item).encode())
+        else:
+            h.update(repr(item).encode())
+        h.update(b'|')
+    return h.hexdigest()[:32]
+
+def _save(path, array):
+    # Write then rename, so that concurrent workers never read a partial file
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+class Uncached:
+    """Return value of a memoized function whose result must not be cached, e.g. that of an inaccurate solve."""
+    def __init__(self, value):
+        self.value = value
+
+def source_hash(f):
+    """Hash of the source of a function or class (of its qualified name if the source is unavailable)."""
+    try:
+        source = inspect.getsource(f)
+    except (OSError, TypeError):
+        source = f.__qualname__
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+def memoize_array(name, version = 1):
+    """
+    Decorator memoizing a function returning a numpy array, keyed by `name`, `version`, a hash of the function's
+    source and a hash of its arguments (with defaults applied, so positional and keyword calls share entries).
+    """
+    def decorator(f):
+        signature = inspect.signature(f)
+        f_hash = source_hash(f)
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = hash_key(name, version, f_hash, *[bound.arguments[param] for param in signature.parameters])
+
+            if key not in _memory:
+                directory = cache_dir()
+                path = os.path.join(directory, name, f'{key}.npy') if directory is not None else None
+                if path is not None and os.path.exists(path):
+                    _memory[key] = np.load(path)
+                else:
+                    result = f(*args, **kwargs)
+                    if isinstance(result, Uncached):
+                        return np.asarray(result.value)
+                    _memory[key] = np.asarray(result)
+                    if path is not None:
+                        try:
+                            _save(path, _memory[key])
+                        except OSError as e:
+                            print(f'Cache: could not save {name} to {path}: {e}')
+            return _memory[key].copy()
+
+        wrapper.uncached = f
+        return wrapper
+    return decorator
+
+def clear_memory_cache():
+    _memory.clear()
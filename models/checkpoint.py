@@ -0,0 +1,141 @@
+"""
+Loading trained controllers from RLlib checkpoints without a trainer, Ray workers or projectors.
+
+The trial's params.json gives the env, model and activation classes (stored by Tune as "<class '...'>" strings,
+which are imported by name), and the checkpoint file holds the model weights. The theta tilde parameters are
+recovered from the theta hat weights and the plant, and frozen into a RecurrentController.
+"""
+
+import glob
+import importlib
+import io
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+import torch
+
+from models.controller import RecurrentController
+from models.theta_recovery import loop_transformed_plant, recover_theta_t_structured
+
+class _Missing:
+    """Stand-in for classes of a checkpoint which can not be imported (e.g. RLlib filters without Ray)."""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        self.state = state
+
+class _LenientUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        try:
+            return super().find_class(module, name)
+        except (ImportError, AttributeError):
+            return type(name, (_Missing,), {'__module__': module})
+
+def _load_pickle(data):
+    return _LenientUnpickler(io.BytesIO(data)).load()
+
+def resolve_class(description):
+    """The class or function described by a "<class 'module.Name'>" or "<function name at 0x...>" string."""
+    match = re.fullmatch(r"<class '([\w\.]+)\.(\w+)'>", description)
+    if match is not None:
+        return getattr(importlib.import_module(match.group(1)), match.group(2))
+    match = re.fullmatch(r"<function (\w+) at 0x[0-9a-f]+>", description)
+    if match is not None:
+        return getattr(importlib.import_module('deq_lib.solvers'), match.group(1))
+    raise ValueError(f'Can not resolve {description}')
+
+def latest_checkpoint(directory):
+    """Path of the checkpoint file with the largest iteration in a trial directory."""
+    paths = glob.glob(os.path.join(directory, 'checkpoint_*', 'checkpoint-*'))
+    paths = [path for path in paths if re.fullmatch(r'checkpoint-\d+', os.path.basename(path))]
+    assert len(paths) > 0, f'No checkpoints in {directory}'
+    return max(paths, key = lambda path: int(path.rsplit('-', 1)[1]))
+
+def read_weights(checkpoint_path, policy_id = 'default_policy'):
+    """The policy's model weights (by parameter name, as numpy arrays) from an RLlib checkpoint file."""
+    with open(checkpoint_path, 'rb') as f:
+        checkpoint = _load_pickle(f.read())
+    worker = checkpoint['worker']
+    if isinstance(worker, bytes):
+        worker = _load_pickle(worker)
+    policy_state = worker['state'][policy_id]
+    weights = policy_state.get('weights', policy_state)
+    return {name: np.asarray(value) for (name, value) in weights.items()}
+
+def recover_theta_t(weights, model_config, plant_cstor, plant_config):
+    """
+    Theta tilde parameters (AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t) from the weights of a
+    ProjRENModel/ProjRNNModel (theta hat) or ProjRNNOldModel (theta tilde), with DK3_t None for RNN controllers.
+    """
+    def tensor(name):
+        return torch.as_tensor(weights[name], dtype = torch.float32)
+
+    if 'AK_tT' in weights:
+        names = ['AK_tT', 'BK1_tT', 'BK2_tT', 'CK1_tT', 'DK1_tT', 'DK2_tT', 'CK2_tT']
+        AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t = [tensor(name).t() for name in names]
+        return AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, None, tensor('DK4_tT').t()
+
+    plant = plant_cstor(plant_config)
+    nonlin = plant.is_nonlin()
+    plant_params = plant.get_params() if nonlin else [plant.AG, plant.BG, plant.CG]
+    plant_reduction = model_config.get('plant_reduction')
+    if plant_reduction is not None:
+        from models.plant_reduction import reduce_plant
+        plant_params, _ = reduce_plant(
+            plant_params, nonlin, model_config.get('exp_stability_rate', 0.98), **plant_reduction
+        )
+    if nonlin:
+        AG_t, _, BG2, CG1, _, _ = loop_transformed_plant(*plant_params)
+    else:
+        AG_t, BG2, CG1 = plant_params
+    AG_t, BG2, CG1 = [torch.as_tensor(np.asarray(M), dtype = torch.float32) for M in (AG_t, BG2, CG1)]
+
+    X = tensor('X_cstor') + tensor('X_cstor').t()
+    Y = tensor('Y_cstor') + tensor('Y_cstor').t()
+    Lambda_c = torch.diag(tensor('Lambda_c_vec'))
+    rnn = 'DK3_h' not in weights
+    hidden_size = Lambda_c.shape[0]
+    DK3_h = torch.zeros(hidden_size, hidden_size) if rnn else tensor('DK3_h')
+    theta_h = [X, Y, tensor('N11'), tensor('N12'), tensor('N21'), tensor('N22'), Lambda_c,
+        tensor('N12_h'), tensor('N21_h'), tensor('DK1_t'), DK3_h, tensor('DK4_h')]
+
+    with torch.no_grad():
+        theta_t = recover_theta_t_structured(theta_h, AG_t, BG2, CG1, model_config['state_size'])
+    if rnn:
+        theta_t = theta_t[:7] + (None,) + theta_t[8:]
+    return theta_t
+
+def load_controller(
+    directory, checkpoint_path = None, plant_cstor = None, plant_config = None, env_cstor = None, env_config = None
+):
+    """
+    RecurrentController of a trial directory's checkpoint (default: the latest one) and the env it was trained on.
+    plant_cstor, plant_config: override the plant the controller was designed for, and
+    env_cstor, env_config: override the env, e.g. for envs whose config can not be stored in params.json
+    (LearnedInvertedPendulumEnv).
+    """
+    if checkpoint_path is None:
+        checkpoint_path = latest_checkpoint(directory)
+    with open(os.path.join(directory, 'params.json'), 'r') as f:
+        config = json.load(f)
+
+    model_config = config['model']['custom_model_config']
+    if env_cstor is None:
+        env_cstor = resolve_class(config['env'])
+    if env_config is None:
+        env_config = config['env_config']
+    if plant_cstor is None:
+        plant_cstor = resolve_class(model_config.get('plant_cstor', config['env']))
+    if plant_config is None:
+        plant_config = model_config.get('plant_config', env_config)
+
+    theta_t = recover_theta_t(read_weights(checkpoint_path), model_config, plant_cstor, plant_config)
+    phi = resolve_class(model_config['phi_cstor'])()
+    solver = resolve_class(model_config['solver']) if 'solver' in model_config else None
+    kwargs = {'solver': solver, 'f_thresh': model_config.get('f_thresh', 30)} if solver is not None else {}
+    controller = RecurrentController(theta_t, phi, **kwargs)
+    return controller, env_cstor(env_config)
@@ -0,0 +1,99 @@
+"""
+Chordal decomposition of sparse LMI constraints.
+
+By Agler's theorem, if the aggregate sparsity pattern of a matrix M is chordal with maximal cliques C_1, ..., C_p,
+then M >> 0 if and only if M = sum_k E_k^T Z_k E_k for some Z_k >> 0, where E_k selects the rows in C_k.
+The one large PSD cone is replaced by p cones of the clique sizes, coupled through linear equalities
+(the approach of CDCS). Non-chordal patterns are first made chordal by adding fill-in.
+
+The gain depends on the pattern. In the projection LMI, X, Y and N11 are dense, so the state blocks always form
+one clique. The decomposition pays off when the plant is large relative to the controller, e.g. when
+Lambda and the blocks built from sparse plant matrices (such as the powergrid Laplacian) leave many zero
+couplings.
+"""
+
+import numpy as np
+import scipy.sparse
+import cvxpy as cp
+
+def aggregate_sparsity(expr, n_samples = 3, seed = 0):
+    """
+    Sparsity pattern of a square affine cvxpy expression over all values of its variables and parameters.
+    The pattern is found by evaluating the expression at random values, which recovers the structural
+    pattern with probability one. Values held by the leaves beforehand are restored.
+    """
+    rng = np.random.default_rng(seed)
+    leaves = expr.variables() + expr.parameters()
+    saved = [leaf.value for leaf in leaves]
+
+    pattern = np.eye(expr.shape[0], dtype = bool)
+    try:
+        for _ in range(n_samples):
+            for leaf in leaves:
+                leaf.value = leaf.project(rng.standard_normal(leaf.shape))
+            value = expr.value
+            value = value.toarray() if scipy.sparse.issparse(value) else np.asarray(value)
+            pattern |= value != 0
+    finally:
+        for (leaf, value) in zip(leaves, saved):
+            leaf.value = value
+
+    return pattern | pattern.T
+
+def chordal_cliques(pattern):
+    """
+    Maximal cliques of a chordal extension of the graph with adjacency `pattern`.
+    The extension eliminates vertices in greedy minimum degree order.
+    Returns a list of sorted index arrays.
+    """
+    n = pattern.shape[0]
+    adjacent = [set(np.flatnonzero(pattern[i])) - {i} for i in range(n)]
+    remaining = set(range(n))
+    cliques = []
+    while remaining:
+        v = min(remaining, key = lambda u: (len(adjacent[u]), u))
+        neighbours = adjacent[v]
+        # Connect the neighbours of v (fill-in), then remove v
+        for u in neighbours:
+            adjacent[u] |= neighbours - {u}
+            adjacent[u].discard(v)
+        remaining.remove(v)
+        cliques.append(frozenset(neighbours | {v}))
+
+    maximal = [c for c in cliques if not any(c < d for d in cliques)]
+    return [np.array(sorted(c)) for c in maximal]
+
+def decomposed_psd_constraints(expr, cliques):
+    """Constraints equivalent to expr >> 0 when `cliques` are the maximal cliques of a chordal extension of its pattern."""
+    n = expr.shape[0]
+    total = 0
+    covered = np.zeros((n, n), dtype = bool)
+    for clique in cliques:
+        k = len(clique)
+        Z = cp.Variable((k, k), PSD = True)
+        E = scipy.sparse.csc_matrix((np.ones(k), (np.arange(k), clique)), shape = (k, n))
+        total = total + E.T @ Z @ E
+        covered[np.ix_(clique, clique)] = True
+
+    # Entries outside the cliques are zero on both sides, and the lower triangle follows by symmetry.
+    rows, cols = np.nonzero(np.triu(covered))
+    idx = rows + cols * n # cp.vec stacks columns
+    return [cp.vec(expr)[idx] == cp.vec(total)[idx]]
+
+def psd_constraints(expr, chordal = False):
+    """
+    Constraints for expr >> 0, decomposed over the cliques of its sparsity pattern if `chordal`.
+    Returns the constraints and the cliques (None if not decomposed).
+    """
+    if not chordal:
+        return [expr >> 0], None
+    cliques = chordal_cliques(aggregate_sparsity(expr))
+    if len(cliques) == 1:
+        return [expr >> 0], cliques
+    return decomposed_psd_constraints(expr, cliques), cliques
+
+def clique_stats(cliques, size):
+    """Summary of a decomposition, e.g. to decide whether it is worth it for a plant."""
+    if cliques is None:
+        return {'lmi_size': size, 'num_cliques': 1, 'max_clique': size}
+    return {'lmi_size': size, 'num_cliques': len(cliques), 'max_clique': max(len(c) for c in cliques)}
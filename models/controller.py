@@ -0,0 +1,76 @@
+"""
+Standalone controller with fixed theta tilde parameters, for evaluating trained controllers without RLlib,
+the value function or the projectors.
+"""
+
+import torch
+import torch.nn as nn
+from deq_lib.solvers import broyden
+
+class RecurrentController(nn.Module):
+    """
+    xi(k+1) = AK_t  xi(k) + BK1_t z(k) + BK2_t y(k)
+    u(k)    = CK1_t xi(k) + DK1_t z(k) + DK2_t y(k)
+    z(k)    = phi_t(CK2_t xi(k) + DK3_t z(k) + DK4_t y(k))
+    with phi_t the loop transformed activation phi. With DK3_t = 0 (RNN controllers) z(k) is explicit,
+    otherwise (REN controllers) it is solved for with `solver`.
+    theta_t: (AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t), with DK3_t None for RNN controllers.
+    Provides get_initial_state and forward_rnn like the RLlib models, so that it can be used with closed_loop.simulate.
+    """
+
+    def __init__(self, theta_t, phi, solver = broyden, f_thresh = 30):
+        super().__init__()
+        AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t = theta_t
+        for (name, value) in [('AK_tT', AK_t), ('BK1_tT', BK1_t), ('BK2_tT', BK2_t), ('CK1_tT', CK1_t),
+            ('DK1_tT', DK1_t), ('DK2_tT', DK2_t), ('CK2_tT', CK2_t), ('DK4_tT', DK4_t)]:
+            self.register_buffer(name, torch.as_tensor(value, dtype = torch.float32).t().contiguous())
+        self.implicit = DK3_t is not None and bool(torch.any(torch.as_tensor(DK3_t) != 0))
+        if self.implicit:
+            self.register_buffer('DK3_tT', torch.as_tensor(DK3_t, dtype = torch.float32).t().contiguous())
+
+        self.state_size = self.AK_tT.shape[0]
+        self.hidden_size = self.CK2_tT.shape[1]
+        self.ac_dim = self.CK1_tT.shape[1]
+        self.ob_dim = self.BK2_tT.shape[0]
+
+        self.phi = phi
+        A_phi, B_phi = phi.A_phi, phi.B_phi
+        self.S_phi = (A_phi + B_phi)/2
+        self._scalar_bounds = A_phi.ndim == 0
+        self.L_phi_inv = 2 / (B_phi - A_phi) if self._scalar_bounds else torch.inverse((B_phi - A_phi)/2)
+        self.solver = solver
+        self.f_thresh = f_thresh
+
+    def phi_t(self, v):
+        if self._scalar_bounds:
+            return self.L_phi_inv * (self.phi(v) - self.S_phi * v)
+        return self.L_phi_inv @ (self.phi(v) - self.S_phi @ v)
+
+    def hidden(self, xi, y):
+        v0 = xi @ self.CK2_tT + y @ self.DK4_tT
+        if not self.implicit:
+            return self.phi_t(v0)
+        z0 = torch.zeros(xi.shape[0], 1, self.hidden_size)
+        v0 = v0.unsqueeze(1)
+        z = self.solver(lambda z: self.phi_t(v0 + z @ self.DK3_tT), z0, threshold = self.f_thresh)['result']
+        return z.squeeze(1)
+
+    def forward(self, y, xi):
+        """Input u(k) and next state xi(k+1) from the (B, ob_dim) outputs y(k) and (B, state_size) states xi(k)."""
+        with torch.no_grad():
+            z = self.hidden(xi, y)
+            u = xi @ self.CK1_tT + z @ self.DK1_tT + y @ self.DK2_tT
+            xi_next = xi @ self.AK_tT + z @ self.BK1_tT + y @ self.BK2_tT
+        return u, xi_next
+
+    def get_initial_state(self):
+        return [torch.zeros(self.state_size)]
+
+    def forward_rnn(self, obs, state, seq_lens):
+        """Actions of a (B, T, ob_dim) sequence of outputs, as BaseRNN.forward_rnn without the log stds."""
+        xi = state[0]
+        actions = []
+        for k in range(obs.shape[1]):
+            u, xi = self(obs[:, k], xi)
+            actions.append(u)
+        return torch.stack(actions, dim = 1), [xi]
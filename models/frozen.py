@@ -0,0 +1,175 @@
+"""
+Frozen controllers for deployment: numpy evaluation of u(k) = f(xi(k), y(k)) with fixed theta tilde parameters,
+preallocated buffers and a fixed number of equilibrium iterations which is certified to converge.
+"""
+
+import math
+import numpy as np
+
+THETA_T_NAMES = ['AK_tT', 'BK1_tT', 'BK2_tT', 'CK1_tT', 'DK1_tT', 'DK2_tT', 'CK2_tT', 'DK3_tT', 'DK4_tT']
+
+def contraction_factor(DK3):
+    """
+    Contraction factor c of z -> phi_t(v + DK3 z) for an elementwise phi_t with slopes in [-1, 1], in the weighted
+    infinity norm max_i |z_i| / p_i with p the Perron vector of |DK3| (made positive with a small perturbation).
+    Such norms are preserved by elementwise 1-Lipschitz maps, and |DK3| p <= c p, so c certifies the contraction.
+    Returns c and p.
+    """
+    n = DK3.shape[0]
+    abs_DK3 = np.abs(DK3)
+    eigvals, eigvecs = np.linalg.eig(abs_DK3 + 1e-9 * np.ones((n, n)))
+    p = np.abs(np.real(eigvecs[:, np.argmax(np.real(eigvals))]))
+    p = np.maximum(p, 1e-12 * p.max())
+    return float(np.max(abs_DK3 @ p / p)), p
+
+def fixed_iterations(c, tol):
+    """
+    Number of iterations from z = 0 after which the error to the equilibrium is at most tol times the norm of the
+    first iterate: c^k / (1 - c) <= tol.
+    """
+    if c == 0:
+        return 1
+    return max(1, int(math.ceil(math.log(tol * (1 - c)) / math.log(c))))
+
+class FrozenController:
+    """
+    xi(k+1) = AK_t  xi(k) + BK1_t z(k) + BK2_t y(k)
+    u(k)    = CK1_t xi(k) + DK1_t z(k) + DK2_t y(k)
+    z(k)    = phi_t(CK2_t xi(k) + DK3_t z(k) + DK4_t y(k))
+    with phi_t(v) = L_phi^-1 (phi(v) - S_phi v) the loop transformed activation, evaluated elementwise
+    as phi_scale * phi(v) - phi_shift * v. The equilibrium z(k) is computed with n_iters fixed point iterations,
+    certified by contraction_factor to be within tol (relative) of the solution.
+
+    The stacked vector w = [xi; y; z] is kept in a preallocated buffer, so that v(k) and [u(k); xi(k+1)] are each
+    one product with a precomputed matrix. step(y) evaluates one controller, batch_step(Y) a batch of them
+    (with their own states), after reset(batch_size).
+    theta_t: (AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t), with DK3_t None for RNN controllers.
+    phi: activation from activations.py (scalar sector bounds, with np_forward).
+    """
+
+    def __init__(self, theta_t, phi, tol = 1e-6, dtype = np.float64):
+        AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t = [
+            None if M is None else np.asarray(M, dtype = dtype) for M in theta_t
+        ]
+        self.state_size = AK_t.shape[0]
+        self.hidden_size = CK2_t.shape[0]
+        self.ob_dim = BK2_t.shape[1]
+        self.ac_dim = CK1_t.shape[0]
+        self.dtype = dtype
+
+        A_phi, B_phi = float(phi.A_phi), float(phi.B_phi)
+        L_phi_inv = 2 / (B_phi - A_phi)
+        self.phi_scale = L_phi_inv
+        self.phi_shift = L_phi_inv * (A_phi + B_phi) / 2
+        self.phi = phi
+        self.np_phi = phi.np_forward
+
+        # w = [xi; y; z]: v0 = G w[:ns+ob], [u; xi_next] = M w
+        self.G = np.ascontiguousarray(np.hstack((CK2_t, DK4_t)))
+        self.M = np.ascontiguousarray(np.block([[CK1_t, DK2_t, DK1_t], [AK_t, BK2_t, BK1_t]]))
+        self.G_T = np.ascontiguousarray(self.G.T)
+        self.M_T = np.ascontiguousarray(self.M.T)
+
+        self.implicit = DK3_t is not None and bool(np.any(DK3_t != 0))
+        if self.implicit:
+            self.DK3 = np.ascontiguousarray(DK3_t)
+            self.DK3_T = np.ascontiguousarray(DK3_t.T)
+            self.contraction, self.weights = contraction_factor(DK3_t)
+            if self.contraction >= 1:
+                raise ValueError(f'Fixed point iteration is not certified to converge (contraction factor '
+                    f'{self.contraction:.3f}), use the RecurrentController instead')
+            self.n_iters = fixed_iterations(self.contraction, tol)
+        else:
+            self.contraction = 0.0
+            self.n_iters = 1
+
+        ns, ob, nh = self.state_size, self.ob_dim, self.hidden_size
+        self._y_slice = slice(ns, ns + ob)
+        self._z_slice = slice(ns + ob, ns + ob + nh)
+        self.w = np.zeros(ns + ob + nh, dtype = dtype)
+        self.v0 = np.zeros(nh, dtype = dtype)
+        self.v = np.zeros(nh, dtype = dtype)
+        self.tmp = np.zeros(nh, dtype = dtype)
+        self.out = np.zeros(self.ac_dim + ns, dtype = dtype)
+        self.reset(1)
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        """Frozen copy of the current theta tilde of a ProjRENModel, ProjRNNModel or RecurrentController."""
+        theta_t = []
+        for name in THETA_T_NAMES:
+            M = getattr(model, name, None)
+            theta_t.append(None if M is None else M.detach().cpu().numpy().T)
+        return cls(theta_t, model.phi, **kwargs)
+
+    def _phi_t(self, v, out, tmp):
+        self.np_phi(v, out)
+        out *= self.phi_scale
+        np.multiply(v, self.phi_shift, out = tmp)
+        out -= tmp
+
+    def reset(self, batch_size = None):
+        """Zeros the state of step, and allocates and zeros the states of batch_step for batch_size controllers."""
+        self.w[:self.state_size] = 0
+        if batch_size is not None:
+            nh = self.hidden_size
+            self.W = np.zeros((batch_size, self.w.shape[0]), dtype = self.dtype)
+            self.V0 = np.zeros((batch_size, nh), dtype = self.dtype)
+            self.V = np.zeros((batch_size, nh), dtype = self.dtype)
+            self.Z = np.zeros((batch_size, nh), dtype = self.dtype)
+            self.TMP = np.zeros((batch_size, nh), dtype = self.dtype)
+            self.OUT = np.zeros((batch_size, self.ac_dim + self.state_size), dtype = self.dtype)
+        else:
+            self.W[:, :self.state_size] = 0
+
+    @property
+    def state(self):
+        return self.w[:self.state_size]
+
+    def step(self, y):
+        """Input u(k) of the (ob_dim,) output y(k), advancing the controller state."""
+        w = self.w
+        ns = self.state_size
+        w[self._y_slice] = y
+        np.dot(self.G, w[:self._z_slice.start], out = self.v0)
+
+        z = w[self._z_slice]
+        if self.implicit:
+            z[:] = 0
+            for _ in range(self.n_iters):
+                np.dot(self.DK3, z, out = self.v)
+                self.v += self.v0
+                self._phi_t(self.v, z, self.tmp)
+        else:
+            self._phi_t(self.v0, z, self.tmp)
+
+        np.dot(self.M, w, out = self.out)
+        w[:ns] = self.out[self.ac_dim:]
+        return self.out[:self.ac_dim].copy()
+
+    def batch_step(self, Y):
+        """Inputs (B, ac_dim) of the (B, ob_dim) outputs Y of the batch_size controllers, advancing their states."""
+        W = self.W
+        ns = self.state_size
+        W[:, self._y_slice] = Y
+        np.dot(W[:, :self._z_slice.start], self.G_T, out = self.V0)
+
+        Z = self.Z
+        if self.implicit:
+            Z[:] = 0
+            for _ in range(self.n_iters):
+                np.dot(Z, self.DK3_T, out = self.V)
+                self.V += self.V0
+                self._phi_t(self.V, Z, self.TMP)
+        else:
+            self._phi_t(self.V0, Z, self.TMP)
+        W[:, self._z_slice] = Z
+
+        np.dot(W, self.M_T, out = self.OUT)
+        W[:, :ns] = self.OUT[:, self.ac_dim:]
+        return self.OUT[:, :self.ac_dim].copy()
+
+    def to_torch(self):
+        """Torch module computing the same as batch_step (see models.frozen_torch)."""
+        from models.frozen_torch import FrozenTorchController
+        return FrozenTorchController(self)
@@ -0,0 +1,60 @@
+"""
+Torch version of the frozen controller (models.frozen), for batched closed loop simulation on GPU and export
+with torch.jit, with the same precomputed matrices and fixed number of equilibrium iterations.
+"""
+
+import torch
+import torch.nn as nn
+
+class FrozenTorchController(nn.Module):
+    """
+    Computes the same as FrozenController.batch_step, with get_initial_state and forward_rnn like the RLlib models
+    so that it can be used with closed_loop.simulate.
+    frozen: a models.frozen.FrozenController.
+    """
+
+    def __init__(self, frozen, dtype = torch.float32):
+        super().__init__()
+        self.register_buffer('G_T', torch.as_tensor(frozen.G_T, dtype = dtype))
+        self.register_buffer('M_T', torch.as_tensor(frozen.M_T, dtype = dtype))
+        self.implicit = frozen.implicit
+        if self.implicit:
+            self.register_buffer('DK3_T', torch.as_tensor(frozen.DK3_T, dtype = dtype))
+        self.n_iters = frozen.n_iters
+        self.phi_scale = frozen.phi_scale
+        self.phi_shift = frozen.phi_shift
+
+        self.state_size = frozen.state_size
+        self.hidden_size = frozen.hidden_size
+        self.ob_dim = frozen.ob_dim
+        self.ac_dim = frozen.ac_dim
+        self.phi = frozen.phi
+
+    def phi_t(self, v):
+        return self.phi_scale * self.phi(v) - self.phi_shift * v
+
+    def forward(self, y, xi):
+        """Input u(k) and next state xi(k+1) from the (B, ob_dim) outputs y(k) and (B, state_size) states xi(k)."""
+        w = torch.cat((xi, y), dim = 1)
+        v0 = w @ self.G_T
+        if self.implicit:
+            z = torch.zeros_like(v0)
+            for _ in range(self.n_iters):
+                z = self.phi_t(v0 + z @ self.DK3_T)
+        else:
+            z = self.phi_t(v0)
+        out = torch.cat((w, z), dim = 1) @ self.M_T
+        return out[:, :self.ac_dim], out[:, self.ac_dim:]
+
+    def get_initial_state(self):
+        return [torch.zeros(self.state_size, dtype = self.G_T.dtype, device = self.G_T.device)]
+
+    def forward_rnn(self, obs, state, seq_lens):
+        """Actions of a (B, T, ob_dim) sequence of outputs, as BaseRNN.forward_rnn without the log stds."""
+        xi = state[0]
+        actions = []
+        with torch.no_grad():
+            for k in range(obs.shape[1]):
+                u, xi = self(obs[:, k], xi)
+                actions.append(u)
+        return torch.stack(actions, dim = 1), [xi]
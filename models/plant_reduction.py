@@ -0,0 +1,87 @@
+"""
+Plant-side model reduction before building the projector.
+
+The projection LMI is sized by the plant state dimension, so removing plant states the controller cannot affect
+or see makes every projection cheaper. Only the minimal realization is supported: it removes uncontrollable and
+unobservable modes (Kalman decomposition with orthonormal bases), so the input-output map is unchanged and the
+controller is used unchanged on the original plant. The stability certificate carries over to the original plant
+if the removed modes decay faster than the certified rate, which is checked.
+
+Approximate reductions (e.g. balanced truncation) change the input-output map, so the projection would only
+certify the reduced plant. They are deliberately not offered.
+"""
+
+import numpy as np
+import scipy.linalg
+
+def _invariant_basis(A, B, tol):
+    """Orthonormal basis of the controllable subspace of (A, B), grown one Krylov step at a time."""
+    n = A.shape[0]
+    Q = scipy.linalg.orth(B, rcond = tol)
+    while Q.shape[1] < n:
+        Q_next = scipy.linalg.orth(np.hstack((Q, A @ Q)), rcond = tol)
+        if Q_next.shape[1] == Q.shape[1]:
+            break
+        Q = Q_next
+    return Q
+
+def _reduce_to_subspace(A, B, C, tol):
+    """
+    Restriction to the controllable subspace of (A, B).
+    Returns the reduced (A, B, C) and the eigenvalues of the removed (uncontrollable) modes.
+    """
+    V = _invariant_basis(A, B, tol)
+    if V.shape[1] == A.shape[0]:
+        return A, B, C, np.zeros(0)
+    V_perp = scipy.linalg.null_space(V.T)
+    # In the coordinates [V, V_perp], A is block upper triangular since range(V) is A-invariant.
+    dropped = np.linalg.eigvals(V_perp.T @ A @ V_perp)
+    return V.T @ A @ V, V.T @ B, C @ V, dropped
+
+def minimal_realization(A, B, C, tol = 1e-9):
+    """
+    Minimal realization of (A, B, C). Returns the reduced (A, B, C) and the eigenvalues of the removed modes.
+    """
+    A, B, C, uncontrollable = _reduce_to_subspace(A, B, C, tol)
+    # Observable subspace = controllable subspace of the dual system
+    AT, CT, BT, unobservable = _reduce_to_subspace(A.T, C.T, B.T, tol)
+    return AT.T, BT.T, CT.T, np.concatenate((uncontrollable, unobservable))
+
+def reduce_plant(params, nonlin, decay_factor, method = 'minimal', tol = 1e-9):
+    """
+    Reduces the plant data from `plant.get_params()` (nonlinear plants) or [AG, BG, CG] (linear plants).
+    For nonlinear plants the nonlinearity's channels (BG1, CG2) count as inputs and outputs, so they are kept.
+    decay_factor: exponential stability rate of the certificate. Removed modes must decay faster.
+    method: 'minimal' (the only method, see module docstring).
+    tol: rank tolerance of the minimal realization.
+    Returns the reduced parameters, in the same format, and a dict describing the reduction.
+    """
+    if method != 'minimal':
+        raise ValueError(f'Unknown plant reduction method {method}, only \'minimal\' preserves the stability '
+            'certificate on the original plant')
+    if nonlin:
+        AG, BG1, BG2, CG1, CG2, DG3, C_Delta, D_Delta = params
+        B = np.hstack((BG1, BG2))
+        C = np.vstack((CG1, CG2))
+    else:
+        AG, B, C = params
+    n = AG.shape[0]
+
+    A_r, B_r, C_r, dropped = minimal_realization(np.asarray(AG, dtype = np.float64),
+        np.asarray(B, dtype = np.float64), np.asarray(C, dtype = np.float64), tol = tol)
+    if dropped.size > 0 and np.max(np.abs(dropped)) >= decay_factor:
+        raise ValueError(f'Plant has uncontrollable or unobservable modes {dropped[np.abs(dropped) >= decay_factor]} '
+            f'which do not decay at rate {decay_factor}')
+    info = {
+        'original_size': n,
+        'max_dropped_mode': float(np.max(np.abs(dropped))) if dropped.size > 0 else 0.0,
+        'reduced_size': A_r.shape[0],
+    }
+
+    dtype = np.asarray(AG).dtype
+    A_r, B_r, C_r = A_r.astype(dtype), B_r.astype(dtype), C_r.astype(dtype)
+    if nonlin:
+        nu1 = BG1.shape[1]
+        ny1 = CG1.shape[0]
+        return [A_r, B_r[:, :nu1], B_r[:, nu1:], C_r[:ny1], C_r[ny1:], DG3, C_Delta, D_Delta], info
+    return [A_r, B_r, C_r], info
@@ -0,0 +1,85 @@
+"""
+Phase-level timing of the projection pipeline.
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+class ProjectionProfiler:
+    """
+    Accumulates wall-clock time per named phase of the projection pipeline.
+    enabled: if False, `phase` and `record` do nothing, so profiling is free to leave in place.
+    trace_path: if not None, every timed phase is also appended to this file as a JSON line
+        {"phase", "start", "seconds", "pid"}. Giving a trace path enables the profiler.
+    """
+
+    def __init__(self, enabled = False, trace_path = None):
+        self.enabled = enabled or trace_path is not None
+        self.trace_path = trace_path
+        self._trace_file = None
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.last = {}
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, start = t0)
+
+    def record(self, name, seconds, start = None):
+        """Records a phase timed elsewhere, e.g. the solver time reported by the solver."""
+        if not self.enabled:
+            return
+        self.totals[name] += seconds
+        self.counts[name] += 1
+        self.last[name] = seconds
+        if self.trace_path is not None:
+            if self._trace_file is None:
+                self._trace_file = open(self.trace_path, 'a')
+            event = {'phase': name, 'start': start, 'seconds': seconds, 'pid': os.getpid()}
+            self._trace_file.write(json.dumps(event) + '\n')
+            self._trace_file.flush()
+
+    def metrics(self):
+        """Total, mean and last time in seconds of each phase, flattened for the learner stats."""
+        metrics = {}
+        for (name, total) in self.totals.items():
+            metrics[f'time_{name}_total'] = total
+            metrics[f'time_{name}_mean'] = total / self.counts[name]
+            metrics[f'time_{name}_last'] = self.last[name]
+        return metrics
+
+    def __getstate__(self):
+        # Open files do not pickle (e.g. when the model is checkpointed)
+        state = self.__dict__.copy()
+        state['_trace_file'] = None
+        return state
+
+def timed_solve(prob, profiler, phase = 'solve', canonicalize_phase = 'canonicalize', **solve_args):
+    """
+    Solves a cvxpy problem and records the time spent in the solver under `phase`, and the rest of the
+    call (canonicalization, DPP parameter updates, unpacking the solution) under `canonicalize_phase`.
+    """
+    t0 = time.perf_counter()
+    try:
+        prob.solve(**solve_args)
+    finally:
+        wall = time.perf_counter() - t0
+        solver_stats = prob.solver_stats
+        solve_time = solver_stats.solve_time if solver_stats is not None else None
+        if solve_time is None:
+            solve_time = wall
+        profiler.record(canonicalize_phase, max(wall - solve_time, 0.0), start = t0)
+        profiler.record(phase, solve_time, start = t0)
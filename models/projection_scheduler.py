@@ -0,0 +1,77 @@
+"""
+Scheduler deciding, after each gradient step, whether theta hat must be checked against the LMI or projected.
+"""
+
+import numpy as np
+
+class ProjectionScheduler:
+    """
+    Wraps a projector (LinProjector, NonlinProjector or RemoteProjector) with the same `project` interface.
+
+    The LMI condition is affine in theta hat, so if the condition had smallest eigenvalue `margin` at the last
+    checked theta hat, the condition at a new theta hat has smallest eigenvalue at least
+        margin - sum_i k_i ||theta_hat_i - last_theta_hat_i||_F
+    with constants k_i from `condition_sensitivity`. Each call takes one of three paths:
+        skipped:   the bound certifies that the LMI still holds, nothing is computed.
+        checked:   the bound is inconclusive, the margin is recomputed and is positive.
+        projected: the margin is not positive and the full projection is solved.
+    check_every: if not None, the margin is recomputed at least every `check_every` calls.
+    """
+
+    def __init__(self, projector, check_every = None):
+        self.projector = projector
+        self.check_every = check_every
+
+        self.last_theta_h = None
+        self.margin = None
+        self.sensitivity = None
+        self.calls_since_check = 0
+
+        self.counts = {'skipped': 0, 'checked': 0, 'projected': 0}
+
+    def __getattr__(self, name):
+        # Anything else (e.g. satisfy_orig_stability_cond) is served by the wrapped projector.
+        if name == 'projector':
+            raise AttributeError(name)
+        return getattr(self.projector, name)
+
+    def margin_bound(self, theta_h):
+        """Lower bound on the smallest eigenvalue of the LMI condition at theta_h."""
+        if self.last_theta_h is None:
+            return -np.inf
+        change = sum([k * np.linalg.norm(new - old) for (k, new, old) in zip(self.sensitivity, theta_h, self.last_theta_h)])
+        return self.margin - change
+
+    def _recenter(self, theta_h, margin):
+        self.last_theta_h = [np.array(var, copy = True) for var in theta_h]
+        self.margin = margin
+        self.sensitivity = self.projector.condition_sensitivity()
+        self.calls_since_check = 0
+
+    def project(self, X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h):
+        theta_h = [X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h]
+        self.calls_since_check += 1
+
+        force_check = self.check_every is not None and self.calls_since_check >= self.check_every
+        if not force_check and self.margin_bound(theta_h) > 0:
+            self.counts['skipped'] += 1
+            return [None for _ in theta_h]
+
+        margin = self.projector.lmi_margin(theta_h)
+        if margin > 0:
+            self.counts['checked'] += 1
+            self._recenter(theta_h, margin)
+            return [None for _ in theta_h]
+
+        self.counts['projected'] += 1
+        projected = self.projector.project(*theta_h)
+        if projected[0] is not None:
+            theta_h = list(projected)
+        self._recenter(theta_h, self.projector.lmi_margin(theta_h))
+        return projected
+
+    def stats(self):
+        total = max(sum(self.counts.values()), 1)
+        stats = {f'projection_{path}': count for (path, count) in self.counts.items()}
+        stats.update({f'projection_{path}_frac': count / total for (path, count) in self.counts.items()})
+        return stats
@@ -0,0 +1,178 @@
+"""
+Ray actor pool that serves projection requests for trials which share a plant and projector configuration.
+
+When `tune.run` runs several trials (e.g. seeds) of the same configuration, each trial would otherwise build
+its own projector and compiled cvxpy problems. Instead, the projector is built once per actor, and actors are
+looked up by name from a key that hashes the projector class and its constructor arguments
+(plant matrices, sizes, rho, eps, ...). Each actor solves one request at a time with one MOSEK thread and reserves
+one CPU in the Ray scheduler (by default), so solves are counted against the cluster's CPUs along with the RLlib
+workers, including when several keys each have their own pool.
+
+The actors are detached, so that they outlive the trial which created them while other trials use them.
+shutdown_projection_services must be called once `tune.run` returns.
+
+The projector's mutable state (Lambda_p, the incremental LMI checker's base factorization, the recentering
+counters, the solver iteration counts and the profiler) belongs to the trial, not to the shared actor: each
+trial holds its state and sends it with each request, and the actor swaps it into the projector for the request.
+"""
+
+import copy
+import hashlib
+import pickle
+import random
+from types import SimpleNamespace
+import numpy as np
+import ray
+
+_ACTOR_PREFIX = 'projection_service'
+
+# Projector attributes which are per trial state
+TRIAL_STATE_ATTRS = [
+    'lmi_checker', 'profiler', 'iterations', 'recenter_counts', 'projections_since_recenter',
+    'recenter_gain_count', 'recenter_gain_sum', 'recenter_gain_last'
+]
+
+class ProjectionServer:
+    """Owns one projector and serves projection requests sequentially, each with the requesting trial's state."""
+
+    def __init__(self, projector_cls, args, kwargs):
+        self.projector = projector_cls(*args, **kwargs)
+        self.nonlin = hasattr(self.projector, 'pLambda_p')
+        self.initial_state = copy.deepcopy(self._get_state())
+        self.num_requests = 0
+
+    def _get_state(self):
+        state = {name: getattr(self.projector, name) for name in TRIAL_STATE_ATTRS if hasattr(self.projector, name)}
+        if self.nonlin:
+            state['Lambda_p'] = self.projector.pLambda_p.value
+        return state
+
+    def _set_state(self, state):
+        for (name, value) in state.items():
+            if name == 'Lambda_p':
+                self.projector.pLambda_p.value = value
+            else:
+                setattr(self.projector, name, value)
+
+    def get_initial_state(self):
+        """State of a new trial, as the projector was built."""
+        return copy.deepcopy(self.initial_state)
+
+    def project(self, state, *theta_h):
+        self._set_state(state)
+        result = self.projector.project(*theta_h)
+        self.num_requests += 1
+        return result, self._get_state()
+
+    def satisfy_orig_stability_cond(self, theta_t):
+        return self.projector.satisfy_orig_stability_cond(theta_t)
+
+    def lmi_margin(self, state, variables):
+        self._set_state(state)
+        return self.projector.lmi_margin(variables)
+
+    def condition_sensitivity(self, state):
+        self._set_state(state)
+        return self.projector.condition_sensitivity()
+
+    def stats(self):
+        return {'num_requests': self.num_requests}
+
+ProjectionActor = ray.remote(ProjectionServer)
+
+def projector_key(projector_cls, args, kwargs):
+    """Hash of the projector class and constructor arguments, used to share actors between trials."""
+    h = hashlib.sha256()
+    h.update(f'{projector_cls.__module__}.{projector_cls.__qualname__}'.encode())
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            arg = np.ascontiguousarray(arg)
+            h.update(str((arg.dtype, arg.shape)).encode())
+            h.update(arg.tobytes())
+        else:
+            h.update(repr(arg).encode())
+    h.update(pickle.dumps(sorted(kwargs.items())))
+    return h.hexdigest()[:16]
+
+def _get_or_create_actor(name, projector_cls, args, kwargs, num_cpus):
+    try:
+        return ray.get_actor(name)
+    except ValueError:
+        pass
+    try:
+        return ProjectionActor.options(
+            name = name, lifetime = 'detached', num_cpus = num_cpus, max_concurrency = 1
+        ).remote(projector_cls, args, kwargs)
+    except ValueError:
+        # Another trial created the actor between the lookup and the creation.
+        return ray.get_actor(name)
+
+class RemoteProjector:
+    """
+    Drop-in replacement for LinProjector/NonlinProjector which forwards requests to shared projection actors.
+    num_solvers: number of actors (and so concurrent solves) for this projector configuration.
+    num_cpus: CPUs reserved in the Ray scheduler by each actor.
+    mosek_threads: number of threads each MOSEK solve may use (None: MOSEK's default, all cores).
+    The defaults of one CPU and one thread per actor avoid oversubscribing cores.
+    """
+
+    def __init__(self, projector_cls, args, kwargs, num_solvers = 1, num_cpus = 1, mosek_threads = 1):
+        kwargs = dict(kwargs)
+        if mosek_threads is not None:
+            solver_args = dict(kwargs.get('solver_args') or {})
+            solver_args['mosek_params'] = {'MSK_IPAR_NUM_THREADS': mosek_threads}
+            kwargs['solver_args'] = solver_args
+
+        key = projector_key(projector_cls, args, kwargs)
+        self.actors = [
+            _get_or_create_actor(f'{_ACTOR_PREFIX}_{key}_{i}', projector_cls, args, kwargs, num_cpus)
+            for i in range(num_solvers)
+        ]
+        # Trials start at random actors so that they spread over the pool.
+        self._next_actor = random.randrange(num_solvers)
+
+        self.projector_cls = projector_cls
+        self.trial_state = ray.get(self.actors[0].get_initial_state.remote())
+
+    @property
+    def Lambda_p(self):
+        return self.trial_state.get('Lambda_p')
+
+    @property
+    def lmi_checker(self):
+        return self.trial_state.get('lmi_checker')
+
+    @property
+    def iterations(self):
+        return self.trial_state.get('iterations')
+
+    def recenter_stats(self):
+        if 'recenter_counts' not in self.trial_state:
+            return {}
+        return self.projector_cls.recenter_stats(SimpleNamespace(**self.trial_state))
+
+    def _actor(self):
+        actor = self.actors[self._next_actor]
+        self._next_actor = (self._next_actor + 1) % len(self.actors)
+        return actor
+
+    def project(self, X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h):
+        result, self.trial_state = ray.get(self._actor().project.remote(
+            self.trial_state, X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h
+        ))
+        return result
+
+    def satisfy_orig_stability_cond(self, theta_t):
+        return ray.get(self._actor().satisfy_orig_stability_cond.remote(theta_t))
+
+    def lmi_margin(self, variables):
+        return ray.get(self._actor().lmi_margin.remote(self.trial_state, variables))
+
+    def condition_sensitivity(self):
+        return ray.get(self._actor().condition_sensitivity.remote(self.trial_state))
+
+def shutdown_projection_services():
+    """Kills all projection actors. They are detached, so they outlive the trials that created them."""
+    for name in ray.util.list_named_actors():
+        if name.startswith(_ACTOR_PREFIX):
+            ray.kill(ray.get_actor(name))
@@ -1,10 +1,13 @@
 import numpy as np
+import scipy.linalg
 import cvxpy as cp
-import time
+import torch
+from models.chordal import psd_constraints, clique_stats
+from models.profiler import ProjectionProfiler, timed_solve
 
 def satisfy_lmi(
     variables, AG_t, BG2, CG1, eps, decay_factor,
-    nonlin = False, Lambda_p = None, BG1_t = None, CG2_t = None, DG3_t = None
+    nonlin = False, Lambda_p = None, BG1_t = None, CG2_t = None, DG3_t = None, checker = None
 ):
     
     X,   Y,  N11,  N12,  N21,  N22,  Lambda_c,  N12_h,  N21_h,  DK1_t,  DK3_h,  DK4_h = variables
@@ -35,6 +38,8 @@ def satisfy_lmi(
     if not np.allclose(condition, condition.T):
         print('REN proj: satisfy lmi: condition not symmetric')
         return False
+    if checker is not None:
+        return checker.check(condition)
     try:
         np.linalg.cholesky(condition)
     except:
@@ -44,6 +49,123 @@ def satisfy_lmi(
     # print('REN proj: satisfy lmi: curr params satisfy lmi')
     return True
 
+def lmi_margin(
+    variables, AG_t, BG2, CG1, decay_factor,
+    nonlin = False, Lambda_p = None, BG1_t = None, CG2_t = None, DG3_t = None
+):
+    """Smallest eigenvalue of the LMI condition. The LMI holds iff this is positive."""
+    condition = construct_condition(variables, AG_t, BG2, CG1, decay_factor, stacker = 'numpy',
+        nonlin = nonlin, Lambda_p = Lambda_p, BG1_t = BG1_t, CG2_t = CG2_t, DG3_t = DG3_t)
+    condition = (condition + condition.T) / 2
+    return np.linalg.eigvalsh(condition)[0]
+
+def condition_sensitivity(
+    AG_t, BG2, CG1, decay_factor,
+    nonlin = False, Lambda_p = None, BG1_t = None, CG2_t = None
+):
+    """
+    Per-variable constants k_i such that, for a change d_i of each theta hat variable,
+    the LMI condition changes by at most sum_i k_i ||d_i||_F in spectral norm.
+    The condition is affine in theta hat, so by Weyl's inequality its smallest eigenvalue
+    decreases by at most the same amount.
+    Ordered as X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h.
+    """
+    norm = lambda M: np.linalg.norm(M, 2)
+    diag_scale = max(decay_factor**2, 1) # X, Y and Lambda appear in both diagonal blocks
+    sens_X = diag_scale + norm(AG_t)
+    sens_Y = diag_scale + norm(AG_t)
+    if nonlin:
+        sens_X += norm(BG1_t)
+        sens_Y += norm(Lambda_p @ CG2_t)
+    return [
+        sens_X, sens_Y, 1.0, norm(CG1), norm(BG2), norm(BG2) * norm(CG1),
+        diag_scale, 1.0, 1.0, norm(BG2), 1.0, norm(CG1)
+    ]
+
+class IncrementalLMIChecker:
+    """
+    Checks positive definiteness of a sequence of LMI conditions without refactoring each one from scratch.
+    Keeps the Cholesky factor L of a positive definite base condition C0, and the lower bound
+    lambda_0 = 1 / ||L^-1||_F^2 <= lambda_min(C0), computed from L when first needed. A new condition
+    C = C0 + Delta is
+        1. accepted if ||Delta||_F < lambda_0 (Weyl's inequality), with no factorization.
+        2. if Delta is concentrated on few rows/columns (those whose largest entry is above row_tol times the
+           largest entry of Delta), split as Delta = U D U^T + E with U of rank k on these rows and E the small
+           remainder. C0 + U D U^T = L (I + W D W^T) L^T with W = L^-1 U, whose smallest eigenvalue is at least
+           (1 + min(mu, 0)) lambda_0 with mu the smallest eigenvalue of the k x k matrix G^1/2 D G^1/2, G = W^T W.
+           C is accepted if this exceeds ||E||_F, and decided exactly by mu > -1 if E = 0.
+        3. otherwise factored in full, and made the new base if it is PD.
+    max_rank_ratio: largest fraction of rows Delta may touch for the low-rank test.
+    row_tol: relative size below which a row of Delta counts as untouched.
+    """
+    def __init__(self, max_rank_ratio = 0.25, rank_tol = 1e-12, row_tol = 1e-3):
+        self.max_rank_ratio = max_rank_ratio
+        self.rank_tol = rank_tol
+        self.row_tol = row_tol
+        self.base = None
+        self.L = None
+        self._base_min_eig = None
+        self.counts = {'bound': 0, 'low_rank': 0, 'refactor': 0}
+
+    def _rebase(self, condition):
+        self.counts['refactor'] += 1
+        try:
+            L = np.linalg.cholesky(condition)
+        except np.linalg.LinAlgError:
+            return False
+        self.base = condition
+        self.L = L
+        self._base_min_eig = None
+        return True
+
+    @property
+    def base_min_eig(self):
+        """Lower bound 1 / trace(C0^-1) on the smallest eigenvalue of the base, from its Cholesky factor."""
+        if self._base_min_eig is None:
+            L_inv = scipy.linalg.solve_triangular(self.L, np.eye(self.L.shape[0]), lower = True)
+            self._base_min_eig = 1 / np.sum(L_inv**2)
+        return self._base_min_eig
+
+    def check(self, condition):
+        condition = np.asarray(condition)
+        if self.base is None or condition.shape != self.base.shape:
+            return self._rebase(condition)
+
+        delta = condition - self.base
+        delta_norm = np.linalg.norm(delta)
+        # lambda_min(C0) <= min(diag(C0)), so the bound cannot hold for larger changes
+        if delta_norm < np.min(np.diag(self.base)) and delta_norm < self.base_min_eig:
+            self.counts['bound'] += 1
+            return True
+
+        row_max = np.abs(delta).max(axis = 1)
+        rows = np.flatnonzero(row_max > self.row_tol * row_max.max())
+        if len(rows) > self.max_rank_ratio * condition.shape[0]:
+            return self._rebase(condition)
+
+        block = delta[np.ix_(rows, rows)]
+        remainder = delta.copy()
+        remainder[np.ix_(rows, rows)] = 0
+        remainder_norm = np.linalg.norm(remainder)
+
+        eigvals, eigvecs = np.linalg.eigh(block)
+        keep = np.abs(eigvals) > self.rank_tol * np.abs(eigvals).max()
+        U = np.zeros((condition.shape[0], keep.sum()))
+        U[rows] = eigvecs[:, keep]
+        D = eigvals[keep]
+
+        W = scipy.linalg.solve_triangular(self.L, U, lower = True)
+        G_eigvals, G_eigvecs = np.linalg.eigh(W.T @ W)
+        G_half = (G_eigvecs * np.sqrt(np.clip(G_eigvals, 0, None))) @ G_eigvecs.T
+        mu = np.linalg.eigvalsh(G_half @ (D[:, None] * G_half))[0]
+        if remainder_norm == 0:
+            self.counts['low_rank'] += 1
+            return mu > -1
+        if mu > -1 and (1 + min(mu, 0)) * self.base_min_eig > remainder_norm:
+            self.counts['low_rank'] += 1
+            return True
+        return self._rebase(condition)
+
 def satisfy_orig_stability_cond(
     A, B, C, D, 
     state_size, plant_state_size, plant_nonlin_size, hidden_size, 
@@ -114,6 +236,9 @@ def satisfy_orig_stability_cond(
     return True
 
 
+def _torch_bmat(blocks):
+    return torch.cat([torch.cat(row, dim = 1) for row in blocks], dim = 0)
+
 def construct_condition(
     variables, AG_t, BG2, CG1, decay_factor, stacker = 'cvxpy',
     nonlin = False, Lambda_p = None, BG1_t = None, CG2_t = None, DG3_t = None
@@ -121,24 +246,29 @@ def construct_condition(
     
     if stacker == 'cvxpy':
         stacker = cp.bmat
+        eye, zeros = np.eye, np.zeros
+    elif stacker == 'torch':
+        stacker = _torch_bmat
+        eye, zeros = torch.eye, torch.zeros
     else:
         stacker = np.bmat
+        eye, zeros = np.eye, np.zeros
     
     X,   Y,  N11,  N12,  N21,  N22,  Lambda_c,  N12_h,  N21_h,  DK1_t,  DK3_h,  DK4_h = variables
 
-    ytpy = stacker([[Y, np.eye(Y.shape[0])], [np.eye(Y.shape[0]), X]])
+    ytpy = stacker([[Y, eye(Y.shape[0])], [eye(Y.shape[0]), X]])
 
     if nonlin:
-        Lambda = stacker([[Lambda_p, np.zeros((Lambda_p.shape[0], Lambda_c.shape[1]))],
-                          [np.zeros((Lambda_c.shape[0], Lambda_p.shape[1])), Lambda_c]])
+        Lambda = stacker([[Lambda_p, zeros((Lambda_p.shape[0], Lambda_c.shape[1]))],
+                          [zeros((Lambda_c.shape[0], Lambda_p.shape[1])), Lambda_c]])
     else:
         Lambda = Lambda_c
 
-    block_11 = stacker([[decay_factor**2 * ytpy, np.zeros((ytpy.shape[1], Lambda.shape[0]))],
-        [np.zeros((Lambda.shape[1], ytpy.shape[0])), Lambda]])
+    block_11 = stacker([[decay_factor**2 * ytpy, zeros((ytpy.shape[1], Lambda.shape[0]))],
+        [zeros((Lambda.shape[1], ytpy.shape[0])), Lambda]])
 
-    block_22 = stacker([[ytpy, np.zeros((ytpy.shape[1], Lambda.shape[0]))],
-        [np.zeros((Lambda.shape[1], ytpy.shape[0])), Lambda]])
+    block_22 = stacker([[ytpy, zeros((ytpy.shape[1], Lambda.shape[0]))],
+        [zeros((Lambda.shape[1], ytpy.shape[0])), Lambda]])
 
     ytpay = stacker([[AG_t @ Y + BG2 @ N21, AG_t + BG2 @ N22 @ CG1],
         [N11, X @ AG_t + N12 @ CG1]])
@@ -157,8 +287,8 @@ def construct_condition(
         lcy = stacker([[N21_h, DK4_h @ CG1]])
 
     if nonlin:
-        ld = stacker([[Lambda_p @ DG3_t, np.zeros((Lambda_p.shape[0], DK3_h.shape[1]))],
-                      [np.zeros((DK3_h.shape[0], DG3_t.shape[1])), DK3_h]])
+        ld = stacker([[Lambda_p @ DG3_t, zeros((Lambda_p.shape[0], DK3_h.shape[1]))],
+                      [zeros((DK3_h.shape[0], DG3_t.shape[1])), DK3_h]])
     else:
         ld = DK3_h
 
@@ -170,9 +300,98 @@ def construct_condition(
 
     return condition
 
+def projection_objective(params, variables, merged = False):
+    """
+    Squared distance between the theta hat parameters and the projection variables.
+    merged: one sum of squares over the stacked differences instead of one per variable.
+    """
+    if not merged:
+        return sum([cp.sum_squares(param - var) for (param, var) in zip(params, variables)])
+    # One second-order cone for the whole distance instead of one per variable.
+    # Pairs of constants (DK3_h for RNNs) contribute nothing.
+    diffs = [cp.vec(param - var) for (param, var) in zip(params, variables) if isinstance(var, cp.Expression)]
+    return cp.sum_squares(cp.hstack(diffs))
+
+def balancing_scaling(A, B, C, max_iters = 100):
+    """
+    Diagonal state scaling d which balances the plant data (Osborne's iteration, as in LAPACK's gebal).
+    The entries of d are powers of 2, so that scaling is exact in floating point. In the coordinates
+    x = diag(d) x_s the plant is (diag(d)^-1 A diag(d), diag(d)^-1 B, C diag(d)), and for each state the
+    norms of its row in [A, B] and of its column in [A; C] (without the diagonal of A) are close.
+    """
+    A = np.abs(np.asarray(A, dtype = np.float64))
+    B = np.abs(np.asarray(B, dtype = np.float64))
+    C = np.abs(np.asarray(C, dtype = np.float64))
+    n = A.shape[0]
+    d = np.ones(n)
+    for _ in range(max_iters):
+        converged = True
+        for i in range(n):
+            # 1-norms of row i of [A, B] and column i of [A; C] in the current coordinates
+            row = np.sum(np.delete(A[i] * d / d[i], i)) + np.sum(B[i]) / d[i]
+            col = np.sum(np.delete(A[:, i] * d[i] / d, i)) + np.sum(C[:, i]) * d[i]
+            if row == 0 or col == 0:
+                continue
+            f = 2.0 ** np.round(0.5 * np.log2(row / col))
+            if f != 1 and (col * f + row / f) < 0.95 * (col + row):
+                d[i] *= f
+                converged = False
+        if converged:
+            break
+    return d
+
+def scale_theta_h(theta_h, d):
+    """
+    Theta hat in the plant state coordinates x = diag(d) x_s. The LMI condition in the new coordinates is a
+    congruence transformation of the original one, so feasibility is preserved. The inverse map uses 1/d.
+    """
+    X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = theta_h
+    col = d[:, None]
+    row = d[None, :]
+    return [X * col * row, Y / (col * row), N11 * col / row, N12 * col, N21 / row, N22,
+        Lambda_c, N12_h * col, N21_h / row, DK1_t, DK3_h, DK4_h]
+
+class SolverIterations:
+    """Interior-point iteration counts and inaccurate solutions of a projector's solves."""
+    def __init__(self):
+        self.solves = 0
+        self.iters = 0
+        self.inaccurate = 0
+        self.last_num_iters = None
+
+    def record(self, prob):
+        solver_stats = prob.solver_stats
+        if solver_stats is not None and solver_stats.num_iters is not None:
+            self.last_num_iters = solver_stats.num_iters
+            self.iters += solver_stats.num_iters
+        self.solves += 1
+        if prob.status in [cp.OPTIMAL_INACCURATE, cp.UNBOUNDED_INACCURATE]:
+            self.inaccurate += 1
+
+    def stats(self):
+        stats = {'solver_solves': self.solves, 'solver_inaccurate': self.inaccurate}
+        if self.last_num_iters is not None:
+            stats['solver_iters_last'] = self.last_num_iters
+            stats['solver_iters_mean'] = self.iters / self.solves
+        return stats
+
 # Uses Disciplined Parameterized Programming for a negligible speed up, but at least the code is cleaner.
 class LinProjector:
-    def __init__(self, AG, BG, CG, eps, decay_factor, state_size, hidden_size, ob_dim, ac_dim, rnn = False):
+    def __init__(
+        self, AG, BG, CG, eps, decay_factor, state_size, hidden_size, ob_dim, ac_dim,
+        rnn = False, solver_args = None, incremental_check = False, drop_redundant_cones = False, chordal = False,
+        profiler = None, balance = False
+    ):
+        """
+        drop_redundant_cones: drop the PSD cones of X, Y and Lambda_c, which are principal submatrices of the
+            LMI condition and so are positive definite whenever the LMI holds, and merge the per-block
+            distance cones of the objective into one. The feasible set, the decision variables and the
+            main LMI cone are unchanged, so this only removes small cones.
+        chordal: split the LMI into smaller PSD cones over the cliques of its sparsity pattern (see models.chordal).
+        profiler: ProjectionProfiler timing the phases of `project`. Defaults to a disabled profiler.
+        balance: solve the projection problem in plant state coordinates scaled by balancing_scaling.
+            Inputs and outputs of `project` stay in the original coordinates.
+        """
         self.ac_dim = ac_dim
         self.ob_dim = ob_dim
         self.state_size = state_size
@@ -182,11 +401,22 @@ class LinProjector:
         self.decay_factor = decay_factor
 
         self.rnn = rnn
+        self.solver_args = {} if solver_args is None else solver_args
+        self.lmi_checker = IncrementalLMIChecker() if incremental_check else None
+        self.drop_redundant_cones = drop_redundant_cones
+        self.chordal = chordal
+        self.profiler = ProjectionProfiler() if profiler is None else profiler
 
         self.AG = AG
         self.BG = BG
         self.CG = CG
 
+        # Plant data of the projection problem
+        self.d = balancing_scaling(AG, BG, CG) if balance else None
+        if self.d is not None:
+            AG, BG, CG = AG * self.d[None, :] / self.d[:, None], BG / self.d[:, None], CG * self.d[None, :]
+        self.iterations = SolverIterations()
+
         self.pX   = cp.Parameter((self.plant_state_size, self.plant_state_size), PSD = True)
         self.pY   = cp.Parameter((self.plant_state_size, self.plant_state_size), PSD = True)
         self.pN11 = cp.Parameter((self.plant_state_size, self.plant_state_size))
@@ -206,8 +436,9 @@ class LinProjector:
         obj_params = [self.pX, self.pY, self.pN11, self.pN12, self.pN21, self.pN22, 
             self.pLambda_c, self.pN12_h, self.pN21_h, self.pDK1_t, self.pDK3_h, self.pDK4_h]
 
-        self.vX = cp.Variable(self.pX.shape, PSD = True)
-        self.vY = cp.Variable(self.pY.shape, PSD = True)
+        sym_kwargs = {'symmetric': True} if self.drop_redundant_cones else {'PSD': True}
+        self.vX = cp.Variable(self.pX.shape, **sym_kwargs)
+        self.vY = cp.Variable(self.pY.shape, **sym_kwargs)
         self.vN11 = cp.Variable(self.pN11.shape)
         self.vN12 = cp.Variable(self.pN12.shape)
         self.vN21 = cp.Variable(self.pN21.shape)
@@ -225,14 +456,15 @@ class LinProjector:
         variables = [self.vX, self.vY, self.vN11, self.vN12, self.vN21, self.vN22, 
             self.vLambda_c, self.vN12_h, self.vN21_h, self.vDK1_t, self.vDK3_h, self.vDK4_h]
         
-        condition = construct_condition(variables, self.AG, self.BG, self.CG, self.decay_factor)
+        condition = construct_condition(variables, AG, BG, CG, self.decay_factor)
 
-        constraints = [
-            self.vLambda_c >> 0,
-            condition - self.eps*np.eye(condition.shape[0]) >> 0 # LMI condition holds
-        ]
+        # LMI condition holds
+        constraints, self.cliques = psd_constraints(condition - self.eps*np.eye(condition.shape[0]), chordal = self.chordal)
+        self.chordal_stats = clique_stats(self.cliques, condition.shape[0])
+        if not self.drop_redundant_cones:
+            constraints.insert(0, self.vLambda_c >> 0)
 
-        obj = sum([cp.sum_squares(pVar - vVar) for (pVar, vVar) in zip(obj_params, variables)])
+        obj = projection_objective(obj_params, variables, merged = self.drop_redundant_cones)
 
         self.prob = cp.Problem(cp.Minimize(obj), constraints)
 
@@ -241,29 +473,31 @@ class LinProjector:
             DK3_h = self.pDK3_h # Zero DK3_h out
 
         originals = [X,   Y,  N11,  N12,  N21,  N22,  Lambda_c,  N12_h,  N21_h,  DK1_t,  DK3_h,  DK4_h]
-        if satisfy_lmi(originals, self.AG, self.BG, self.CG, self.eps, self.decay_factor):
+        with self.profiler.phase('precheck'):
+            satisfied = satisfy_lmi(originals, self.AG, self.BG, self.CG, self.eps, self.decay_factor, checker = self.lmi_checker)
+        if satisfied:
             print(f'REN Lin Projection: DK3_t max sing val (sat cond): {np.linalg.norm(np.linalg.inv(Lambda_c) @ DK3_h, 2)}')
             return [None for _ in originals]
 
-        self.pX.value = X
-        self.pY.value = Y
-        self.pN11.value = N11
-        self.pN12.value = N12
-        self.pN21.value = N21
-        self.pN22.value = N22
-        self.pLambda_c.value = Lambda_c
-        self.pN12_h.value = N12_h
-        self.pN21_h.value = N21_h
-        self.pDK1_t.value = DK1_t
-        if not self.rnn:
-            self.pDK3_h.value = DK3_h
-        self.pDK4_h.value = DK4_h
-
-        # t0 = time.time()
-        self.prob.solve(solver = cp.MOSEK)
-        # tf = time.time()
-        # print('Lin Projection: Objective value: ', self.prob.value)
-        # print('Lin Projection: Computed in: ', tf - t0, 'seconds')
+        with self.profiler.phase('assign'):
+            if self.d is not None:
+                X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = scale_theta_h(originals, self.d)
+            self.pX.value = X
+            self.pY.value = Y
+            self.pN11.value = N11
+            self.pN12.value = N12
+            self.pN21.value = N21
+            self.pN22.value = N22
+            self.pLambda_c.value = Lambda_c
+            self.pN12_h.value = N12_h
+            self.pN21_h.value = N21_h
+            self.pDK1_t.value = DK1_t
+            if not self.rnn:
+                self.pDK3_h.value = DK3_h
+            self.pDK4_h.value = DK4_h
+
+        timed_solve(self.prob, self.profiler, solver = cp.MOSEK, **self.solver_args)
+        self.iterations.record(self.prob)
 
         oX   = self.vX.value
         oY   = self.vY.value
@@ -281,6 +515,11 @@ class LinProjector:
             oDK3_h  = self.vDK3_h.value
         oDK4_h  = self.vDK4_h.value
 
+        if self.d is not None:
+            oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h = scale_theta_h(
+                [oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h], 1 / self.d
+            )
+
         if self.rnn:
             assert np.allclose(oDK3_h, np.zeros_like(oDK3_h)), "RNN Lin Projection: Output DK3_h is nonzero"
         else:
@@ -288,6 +527,15 @@ class LinProjector:
 
         return oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h
 
+    def lmi_margin(self, variables):
+        variables = list(variables)
+        if self.rnn:
+            variables[10] = self.pDK3_h # Zero DK3_h out
+        return lmi_margin(variables, self.AG, self.BG, self.CG, self.decay_factor)
+
+    def condition_sensitivity(self):
+        return condition_sensitivity(self.AG, self.BG, self.CG, self.decay_factor)
+
     def satisfy_orig_stability_cond(self, theta_t):
         # Check if a particular theta_t stabilizes the feedback loop
         AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t = theta_t
@@ -313,8 +561,21 @@ class NonlinProjector:
         self, AG_t, BG1_t, BG2, CG1, CG2_t, DG3_t,
         eps, decay_factor,
         state_size, hidden_size, ob_dim, ac_dim,
-        rnn = False, recenter_lambda_p = True
+        rnn = False, recenter_lambda_p = True, solver_args = None, incremental_check = False,
+        drop_redundant_cones = False, chordal = False, profiler = None, recenter_threshold = None, recenter_every = None,
+        balance = False
     ):
+        """
+        recenter_threshold, recenter_every: when to solve the second problem, which recenters Lambda_p after
+            a projection. If both are None, it is solved after every projection. Otherwise it is solved only when
+            the LMI margin (smallest eigenvalue of the condition) of the projected theta hat is below
+            recenter_threshold, or when recenter_every projections have passed without recentering.
+            With balance, the margin is measured in the scaled coordinates of the projection problems.
+        drop_redundant_cones: see LinProjector. Also drops the PSD cone of Lambda_p in the recentering problem.
+        chordal: split the LMIs into smaller PSD cones over the cliques of their sparsity patterns (see models.chordal).
+        profiler: ProjectionProfiler timing the phases of `project`. Defaults to a disabled profiler.
+        balance: solve the projection problems in scaled plant state coordinates (see LinProjector).
+        """
         self.ac_dim = ac_dim
         self.ob_dim = ob_dim
         self.state_size = state_size
@@ -327,6 +588,19 @@ class NonlinProjector:
         self.rnn = rnn
         self.name_str = 'RNN' if self.rnn else 'REN'
         self.recenter_lambda_p = recenter_lambda_p
+        self.recenter_threshold = recenter_threshold
+        self.recenter_every = recenter_every
+        self.projections_since_recenter = 0
+        self.recenter_counts = {'recentered': 0, 'skipped': 0}
+        # Running statistics of the margin gained by recentering (measured only with recenter_threshold)
+        self.recenter_gain_count = 0
+        self.recenter_gain_sum = 0.0
+        self.recenter_gain_last = None
+        self.solver_args = {} if solver_args is None else solver_args
+        self.lmi_checker = IncrementalLMIChecker() if incremental_check else None
+        self.drop_redundant_cones = drop_redundant_cones
+        self.chordal = chordal
+        self.profiler = ProjectionProfiler() if profiler is None else profiler
 
         self.AG_t = AG_t
         self.BG1_t = BG1_t
@@ -335,6 +609,15 @@ class NonlinProjector:
         self.CG2_t = CG2_t
         self.DG3_t = DG3_t
 
+        # Plant data of the projection problems
+        self.d = balancing_scaling(AG_t, np.hstack((BG1_t, BG2)), np.vstack((CG1, CG2_t))) if balance else None
+        if self.d is not None:
+            col, row = self.d[:, None], self.d[None, :]
+            AG_t, BG1_t, BG2 = AG_t * row / col, BG1_t / col, BG2 / col
+            CG1, CG2_t = CG1 * row, CG2_t * row
+        self.problem_plant = (AG_t, BG1_t, BG2, CG1, CG2_t, DG3_t)
+        self.iterations = SolverIterations()
+
         # Setting up problem 1 to project theta hat
 
         self.pX   = cp.Parameter((self.plant_state_size, self.plant_state_size), PSD = True)
@@ -357,8 +640,9 @@ class NonlinProjector:
         obj_params = [self.pX, self.pY, self.pN11, self.pN12, self.pN21, self.pN22, 
             self.pLambda_c, self.pN12_h, self.pN21_h, self.pDK1_t, self.pDK3_h, self.pDK4_h]
 
-        self.vX = cp.Variable(self.pX.shape, PSD = True)
-        self.vY = cp.Variable(self.pY.shape, PSD = True)
+        sym_kwargs = {'symmetric': True} if self.drop_redundant_cones else {'PSD': True}
+        self.vX = cp.Variable(self.pX.shape, **sym_kwargs)
+        self.vY = cp.Variable(self.pY.shape, **sym_kwargs)
         self.vN11 = cp.Variable(self.pN11.shape)
         self.vN12 = cp.Variable(self.pN12.shape)
         self.vN21 = cp.Variable(self.pN21.shape)
@@ -377,17 +661,17 @@ class NonlinProjector:
             self.vLambda_c, self.vN12_h, self.vN21_h, self.vDK1_t, self.vDK3_h, self.vDK4_h]
 
         condition = construct_condition(
-            variables, self.AG_t, self.BG2, self.CG1, self.decay_factor,
+            variables, AG_t, BG2, CG1, self.decay_factor,
             nonlin = True, Lambda_p = self.pLambda_p,
-            BG1_t = self.BG1_t, CG2_t = self.CG2_t, DG3_t = self.DG3_t
+            BG1_t = BG1_t, CG2_t = CG2_t, DG3_t = DG3_t
         )
 
-        constraints = [
-            self.vLambda_c >> 0,
-            condition - self.eps * np.eye(condition.shape[0]) >> 0
-        ]
+        constraints, self.cliques = psd_constraints(condition - self.eps * np.eye(condition.shape[0]), chordal = self.chordal)
+        self.chordal_stats = clique_stats(self.cliques, condition.shape[0])
+        if not self.drop_redundant_cones:
+            constraints.insert(0, self.vLambda_c >> 0)
 
-        obj = sum([cp.sum_squares(var - vVar) for (var, vVar) in zip(obj_params, variables)])
+        obj = projection_objective(obj_params, variables, merged = self.drop_redundant_cones)
         self.prob1 = cp.Problem(cp.Minimize(obj), constraints)
 
         # Setting up the second problem to recenter Lambda_p
@@ -396,56 +680,61 @@ class NonlinProjector:
             self.vEps = cp.Variable(nonneg = True)
 
             condition2 = construct_condition(
-                obj_params, self.AG_t, self.BG2, self.CG1, self.decay_factor,
+                obj_params, AG_t, BG2, CG1, self.decay_factor,
                 nonlin = True, Lambda_p = self.vLambda_p,
-                BG1_t = self.BG1_t, CG2_t = self.CG2_t, DG3_t = self.DG3_t
+                BG1_t = BG1_t, CG2_t = CG2_t, DG3_t = DG3_t
             )
-            constraints2 = [
-                self.vEps >= 0.9*self.eps,
-                self.vLambda_p >> 0,
-                condition2 - self.vEps * np.eye(condition2.shape[0]) >> 0
-            ]
+            lmi_constraints2, _ = psd_constraints(condition2 - self.vEps * np.eye(condition2.shape[0]), chordal = self.chordal)
+            constraints2 = [self.vEps >= 0.9*self.eps] + lmi_constraints2
+            if not self.drop_redundant_cones:
+                constraints2.insert(1, self.vLambda_p >> 0)
             self.prob2 = cp.Problem(cp.Maximize(self.vEps), constraints2)
 
         # Initial Lambda_p value
         
         self.pLambda_p.value = np.eye(self.pLambda_p.shape[0])
 
+    @property
+    def Lambda_p(self):
+        return self.pLambda_p.value
+
     def project(self, X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h):
         if self.rnn:
             DK3_h = self.pDK3_h # Zero DK3_h out
         
         # Check if input theta hat parameters are already within stabilizing set
         originals = [X,   Y,  N11,  N12,  N21,  N22,  Lambda_c,  N12_h,  N21_h,  DK1_t,  DK3_h,  DK4_h]
-        if satisfy_lmi(originals, self.AG_t, self.BG2, self.CG1, self.eps, self.decay_factor,
-            nonlin = True, Lambda_p = self.pLambda_p.value,
-            BG1_t=self.BG1_t, CG2_t=self.CG2_t, DG3_t=self.DG3_t
-        ):
+        with self.profiler.phase('precheck'):
+            satisfied = satisfy_lmi(originals, self.AG_t, self.BG2, self.CG1, self.eps, self.decay_factor,
+                nonlin = True, Lambda_p = self.pLambda_p.value,
+                BG1_t=self.BG1_t, CG2_t=self.CG2_t, DG3_t=self.DG3_t, checker = self.lmi_checker
+            )
+        if satisfied:
             print(f'{self.name_str} Nonlin Projection: DK3_t max sing val (sat cond): {np.linalg.norm(np.linalg.inv(Lambda_c) @ DK3_h, 2)}')
             return [None for _ in originals]
 
         # Project theta hat to stabilizing set.
-        self.pX.value = X
-        self.pY.value = Y
-        self.pN11.value = N11
-        self.pN12.value = N12
-        self.pN21.value = N21
-        self.pN22.value = N22
-        self.pLambda_c.value = Lambda_c
-        self.pN12_h.value = N12_h
-        self.pN21_h.value = N21_h
-        self.pDK1_t.value = DK1_t
-        if not self.rnn:
-            self.pDK3_h.value = DK3_h
-        self.pDK4_h.value = DK4_h
+        with self.profiler.phase('assign'):
+            if self.d is not None:
+                X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = scale_theta_h(originals, self.d)
+            self.pX.value = X
+            self.pY.value = Y
+            self.pN11.value = N11
+            self.pN12.value = N12
+            self.pN21.value = N21
+            self.pN22.value = N22
+            self.pLambda_c.value = Lambda_c
+            self.pN12_h.value = N12_h
+            self.pN21_h.value = N21_h
+            self.pDK1_t.value = DK1_t
+            if not self.rnn:
+                self.pDK3_h.value = DK3_h
+            self.pDK4_h.value = DK4_h
 
         try:
-            # t0 = time.time()
             print(f"{self.name_str} Projection Nonlin Prob 1: Starting solve")
-            self.prob1.solve(solver = cp.MOSEK)
-            # tf = time.time()
-            # print('Nonlin Projection: Objective value: ', self.prob1.value)
-            # print('Nonlin Projection: Computed in: ', tf - t0, 'seconds')
+            timed_solve(self.prob1, self.profiler, solver = cp.MOSEK, **self.solver_args)
+            self.iterations.record(self.prob1)
         except:
             assert f"{self.name_str} Projection Nonlin Prob 1: Failed to solve"
         
@@ -469,7 +758,19 @@ class NonlinProjector:
         oDK4_h  = self.vDK4_h.value
 
         # Re-center Lambda p
+        recenter = False
         if self.recenter_lambda_p:
+            self.projections_since_recenter += 1
+            prior_margin = None
+            if self.recenter_threshold is not None:
+                # Margin in the coordinates of the projection problems, like vEps
+                pAG_t, pBG1_t, pBG2, pCG1, pCG2_t, pDG3_t = self.problem_plant
+                prior_margin = lmi_margin([oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h],
+                    pAG_t, pBG2, pCG1, self.decay_factor, nonlin = True, Lambda_p = self.pLambda_p.value,
+                    BG1_t = pBG1_t, CG2_t = pCG2_t, DG3_t = pDG3_t)
+            recenter = self.should_recenter(prior_margin)
+            self.recenter_counts['recentered' if recenter else 'skipped'] += 1
+        if recenter:
             self.pX.value   = self.vX.value
             self.pY.value   = self.vY.value
             self.pN11.value = self.vN11.value
@@ -485,28 +786,69 @@ class NonlinProjector:
             self.pDK4_h.value  = self.vDK4_h.value
 
             try:
-                # t0 = time.time()
-                self.prob2.solve(solver = cp.MOSEK)
-                # tf = time.time()
-                # print('RNN Nonlin Update LambdaP Projection: Objective value: ', self.prob2.value)
-                # print('RNN Nonlin Update LambdaP Projection: Computed in: ', tf - t0, 'seconds')
+                timed_solve(self.prob2, self.profiler, 'recenter', 'recenter_canonicalize',
+                    solver = cp.MOSEK, **self.solver_args)
+                self.iterations.record(self.prob2)
             except:
                 assert f"{self.name_str} Projection Nonlin LambdaP Prob: Failed to solve"
 
             self.pLambda_p.value = self.vLambda_p.value.toarray()
+            self.projections_since_recenter = 0
+            if prior_margin is not None:
+                self.recenter_gain_last = float(self.vEps.value - prior_margin)
+                self.recenter_gain_sum += self.recenter_gain_last
+                self.recenter_gain_count += 1
             print(f'{self.name_str} Nonlin Update LambdaP Projection: Used eps = {self.vEps.value}')
 
+        if self.d is not None:
+            oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h = scale_theta_h(
+                [oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h], 1 / self.d
+            )
+
         # print('RNN Nonlin Projection: Lambda P', self.pLambda_p.value)
         print(f'{self.name_str} Nonlin Projection: DK3_t max sing val: {np.linalg.norm(np.linalg.inv(Lambda_c) @ DK3_h, 2)} to {np.linalg.norm(np.linalg.inv(oLambda_c) @ oDK3_h, 2)}')
 
-        t0 = time.time()
-        assert satisfy_lmi([oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h], self.AG_t, self.BG2, self.CG1, self.eps, self.decay_factor,
-            nonlin = True, Lambda_p = self.pLambda_p.value,
-            BG1_t=self.BG1_t, CG2_t=self.CG2_t, DG3_t=self.DG3_t), "Output does not satisfy LMI"
-        tf = time.time()
-        # print(f'Checking result took {tf-t0} seconds')
+        with self.profiler.phase('recheck'):
+            satisfied = satisfy_lmi([oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h], self.AG_t, self.BG2, self.CG1, self.eps, self.decay_factor,
+                nonlin = True, Lambda_p = self.pLambda_p.value,
+                BG1_t=self.BG1_t, CG2_t=self.CG2_t, DG3_t=self.DG3_t, checker = self.lmi_checker)
+        assert satisfied, "Output does not satisfy LMI"
         return oX, oY, oN11, oN12, oN21, oN22, oLambda_c, oN12_h, oN21_h, oDK1_t, oDK3_h, oDK4_h
 
+    def should_recenter(self, margin):
+        """
+        Whether to recenter Lambda_p after a projection whose result has LMI margin `margin`
+        (computed only if recenter_threshold is set, None otherwise).
+        """
+        if self.recenter_threshold is None and self.recenter_every is None:
+            return True
+        if self.recenter_threshold is not None and margin < self.recenter_threshold:
+            return True
+        return self.recenter_every is not None and self.projections_since_recenter >= self.recenter_every
+
+    def recenter_stats(self):
+        """
+        Counts of recentered and skipped projections, and the margin gained by recentering
+        (with recenter_threshold, which is when the margin before recentering is computed).
+        """
+        stats = {f'recenter_{path}': count for (path, count) in self.recenter_counts.items()}
+        if self.recenter_gain_count > 0:
+            stats['recenter_gain_mean'] = self.recenter_gain_sum / self.recenter_gain_count
+            stats['recenter_gain_last'] = self.recenter_gain_last
+        return stats
+
+    def lmi_margin(self, variables):
+        variables = list(variables)
+        if self.rnn:
+            variables[10] = self.pDK3_h # Zero DK3_h out
+        return lmi_margin(variables, self.AG_t, self.BG2, self.CG1, self.decay_factor,
+            nonlin = True, Lambda_p = self.pLambda_p.value,
+            BG1_t = self.BG1_t, CG2_t = self.CG2_t, DG3_t = self.DG3_t)
+
+    def condition_sensitivity(self):
+        return condition_sensitivity(self.AG_t, self.BG2, self.CG1, self.decay_factor,
+            nonlin = True, Lambda_p = self.pLambda_p.value, BG1_t = self.BG1_t, CG2_t = self.CG2_t)
+
     def satisfy_orig_stability_cond(self, theta_t):
         # Check if a particular theta_t stabilizes the feedback loop
         AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t = theta_t
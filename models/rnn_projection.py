@@ -1,84 +1,173 @@
 import numpy as np
 import cvxpy as cp
-import time
 import scipy
+from models.profiler import ProjectionProfiler, timed_solve
+from models.cache import memoize_array, Uncached
 
 def rnn_project_nonlin(
     AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t,
     Q1_bar, Q2_bar,
     Ae, Be1, Be2, Ce1, De1, Ce2, M,
-    eps, decay_factor
+    eps, decay_factor, profiler = None
 ):
-    if Q1_bar is None:
-        Q1_bar = init_q1_nonlin(
-            Ae, Be1, Be2, Ce1, De1, Ce2, M,
-            AK_t.shape[0], decay_factor, eps
-        )
-    P_bar = np.linalg.inv(Q1_bar)
-    Lambda_bar = np.linalg.inv(Q2_bar)
-    
-    originals = [AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar]
-
-    vAK_t  = cp.Variable(AK_t.shape)
-    vBK1_t = cp.Variable(BK1_t.shape)
-    vBK2_t = cp.Variable(BK2_t.shape)
-    vCK1_t = cp.Variable(CK1_t.shape)
-    vDK1_t = cp.Variable(DK1_t.shape)
-    vDK2_t = cp.Variable(DK2_t.shape)
-    vCK2_t = cp.Variable(CK2_t.shape)
-    vDK4_t = cp.Variable(DK4_t.shape)
-    vQ1 = cp.Variable(P_bar.shape, PSD = True)
-    vQ2 = cp.Variable(Lambda_bar.shape, diag = True)
-    vLambdaIQC = cp.Variable(nonneg = True)
-
-    variables = [vAK_t, vBK1_t, vBK2_t, vCK1_t, vDK1_t, vDK2_t, vCK2_t, vDK4_t, vQ1, vQ2]
-
-    condition = construct_condition_nonlin(
-        variables,
-        vLambdaIQC,
-        P_bar,
-        Lambda_bar,
+    """One-off projection. Repeated projections should reuse a RNNNonlinProjector instead."""
+    projector = RNNNonlinProjector(
         Ae, Be1, Be2, Ce1, De1, Ce2, M,
-        decay_factor
+        AK_t.shape[0], DK4_t.shape[0],
+        eps, decay_factor, profiler = profiler
     )
-
-    constraints = [
-        vQ1 - eps * np.eye(vQ1.shape[0]) >> 0,
-        vQ2 - eps * np.eye(vQ2.shape[0]) >> 0,
-        condition - eps * np.eye(condition.shape[0]) >> 0,
-    ]
-
-    obj = sum([cp.sum_squares(var - vVar) for (var, vVar) in zip(originals, variables)])
-
-    prob = cp.Problem(cp.Minimize(obj), constraints)
-
-    failed = False
+    return projector.project(AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar)
+
+class RNNNonlinProjector:
+    """
+    Projection of the theta tilde parameters of ProjRNNOldModel for nonlinear plants.
+    The problem is built and compiled once. P_bar and Lambda_bar, which the bilinear terms are linearized around,
+    are parameters, so each projection only updates parameter values.
+    If the targets already satisfy the constraints (with the previous LambdaIQC), they are the solution and the
+    solve is skipped. Otherwise the problem is solved with MOSEK (interior point, which does not warm start),
+    falling back to SCS, which warm starts from its previous solution of the same problem.
+    """
+    def __init__(
+        self, Ae, Be1, Be2, Ce1, De1, Ce2, M,
+        state_size, hidden_size,
+        eps, decay_factor, profiler = None
+    ):
+        self.Ae = Ae
+        self.Be1 = Be1
+        self.Be2 = Be2
+        self.Ce1 = Ce1
+        self.De1 = De1
+        self.Ce2 = Ce2
+        self.M = M
+        self.state_size = state_size
+        self.eps = eps
+        self.decay_factor = decay_factor
+        self.profiler = ProjectionProfiler() if profiler is None else profiler
+
+        ob_dim = Ce2.shape[0]
+        ac_dim = Be2.shape[1]
+        q1_size = Ae.shape[0] + state_size
+
+        with self.profiler.phase('build'):
+            self.params = _theta_t_parameters(state_size, hidden_size, ob_dim, ac_dim, q1_size)
+            self.pP_bar = cp.Parameter((q1_size, q1_size))
+            self.pLambda_bar = cp.Parameter((hidden_size, hidden_size))
+
+            self.variables = _theta_t_variables(self.params, Q1_PSD = True)
+            vQ1, vQ2 = self.variables[-2:]
+            self.vLambdaIQC = cp.Variable(nonneg = True)
+            vLambdaIQC = self.vLambdaIQC
+            # Q1 P_bar and Q2 Lambda_bar, so that P_bar^T Q1 P_bar is a product of a parameter and a parameter-free expression (DPP)
+            self.vW1 = cp.Variable((q1_size, q1_size))
+            self.vW2 = cp.Variable((hidden_size, hidden_size))
+
+            condition = construct_condition_nonlin(
+                self.variables,
+                vLambdaIQC,
+                self.pP_bar,
+                self.pLambda_bar,
+                Ae, Be1, Be2, Ce1, De1, Ce2, M,
+                decay_factor,
+                W1 = self.vW1, W2 = self.vW2
+            )
+
+            constraints = [
+                self.vW1 == vQ1 @ self.pP_bar,
+                self.vW2 == vQ2 @ self.pLambda_bar,
+                vQ1 - eps * np.eye(vQ1.shape[0]) >> 0,
+                vQ2 - eps * np.eye(vQ2.shape[0]) >> 0,
+                condition - eps * np.eye(condition.shape[0]) >> 0,
+            ]
+
+            obj = sum([cp.sum_squares(param - var) for (param, var) in zip(self.params, self.variables)])
+
+            self.prob = cp.Problem(cp.Minimize(obj), constraints)
+        self.LambdaIQC = None
+        self.counts = {'solved': 0, 'skipped': 0}
+
+    def project(self, AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar):
+        if Q1_bar is None:
+            Q1_bar = init_q1_nonlin(
+                self.Ae, self.Be1, self.Be2, self.Ce1, self.De1, self.Ce2, self.M,
+                self.state_size, self.decay_factor, self.eps
+            )
+
+        with self.profiler.phase('assign'):
+            originals = [AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar]
+            for (param, value) in zip(self.params, originals):
+                param.value = value
+            self.pP_bar.value = np.linalg.inv(Q1_bar)
+            self.pLambda_bar.value = np.linalg.inv(Q2_bar)
+
+        if self.LambdaIQC is not None and _targets_feasible(self.prob, self.variables, originals, [
+            (self.vW1, Q1_bar @ self.pP_bar.value), (self.vW2, Q2_bar @ self.pLambda_bar.value),
+            (self.vLambdaIQC, self.LambdaIQC)
+        ]):
+            self.counts['skipped'] += 1
+            return originals
+
+        _solve(self.prob, self.variables, self.profiler, 'RNN Old Projection Nonlin')
+        self.counts['solved'] += 1
+        self.LambdaIQC = self.vLambdaIQC.value
+        return _theta_t_values(self.variables)
+
+_feas_stats = [cp.OPTIMAL, cp.UNBOUNDED, cp.OPTIMAL_INACCURATE, cp.UNBOUNDED_INACCURATE]
+
+def _targets_feasible(prob, variables, targets, extra):
+    """
+    Whether the constraints of prob hold with its theta tilde variables at the targets and the other variables at
+    the given (variable, value) pairs. The objective is then zero, so the targets are the solution.
+    Overwrites the values of the variables.
+    """
     try:
-        prob.solve(solver = cp.MOSEK)
-    except:
-        failed = True
-    feas_stats = [cp.OPTIMAL, cp.UNBOUNDED, cp.OPTIMAL_INACCURATE, cp.UNBOUNDED_INACCURATE]
-    if prob.status not in feas_stats:
-        failed = True
-    if failed:
-        print('Falling back to SCS')
-        prob.solve(solver = cp.SCS)
-        
-    assert prob.status in feas_stats, "RNN Old Projection Nonlin: infeasible"
-
-    oAK_t  = vAK_t.value
-    oBK1_t = vBK1_t.value
-    oBK2_t = vBK2_t.value
-    oCK1_t = vCK1_t.value
-    oDK1_t = vDK1_t.value
-    oDK2_t = vDK2_t.value
-    oCK2_t = vCK2_t.value
-    oDK4_t = vDK4_t.value
-    oQ1_bar = vQ1.value
-    oQ2_bar = vQ2.value.toarray()
-
-    return oAK_t, oBK1_t, oBK2_t, oCK1_t, oDK1_t, oDK2_t, oCK2_t, oDK4_t, oQ1_bar, oQ2_bar
+        for (var, value) in list(zip(variables, targets)) + extra:
+            var.value = value
+    except ValueError: # e.g. a target Q1 which is not PSD
+        return False
+    return all(constraint.value(tolerance = 1e-8) for constraint in prob.constraints)
+
+def _solve(prob, variables, profiler, name):
+    """Solves with MOSEK, falling back to SCS (warm started from its last solution), and checks the status."""
+    try:
+        timed_solve(prob, profiler, solver = cp.MOSEK)
+        if prob.status not in _feas_stats or variables[0].value is None:
+            raise cp.error.SolverError(f'MOSEK status {prob.status}')
+    except cp.error.SolverError as e:
+        print(f'{name}: {e}, solving with SCS')
+        timed_solve(prob, profiler, solver = cp.SCS, warm_start = True)
+    if prob.status not in _feas_stats or variables[0].value is None:
+        raise cp.error.SolverError(f'{name}: infeasible (status {prob.status})')
+
+def _theta_t_parameters(state_size, hidden_size, ob_dim, ac_dim, q1_size):
+    """Parameters for the theta tilde targets of the projection, in the order of rnn_project's arguments."""
+    return [
+        cp.Parameter((state_size, state_size)),   # AK_t
+        cp.Parameter((state_size, hidden_size)),  # BK1_t
+        cp.Parameter((state_size, ob_dim)),       # BK2_t
+        cp.Parameter((ac_dim, state_size)),       # CK1_t
+        cp.Parameter((ac_dim, hidden_size)),      # DK1_t
+        cp.Parameter((ac_dim, ob_dim)),           # DK2_t
+        cp.Parameter((hidden_size, state_size)),  # CK2_t
+        cp.Parameter((hidden_size, ob_dim)),      # DK4_t
+        cp.Parameter((q1_size, q1_size)),         # Q1_bar
+        cp.Parameter((hidden_size, hidden_size)), # Q2_bar
+    ]
 
+def _theta_t_variables(params, Q1_PSD):
+    variables = [cp.Variable(param.shape) for param in params[:-2]]
+    if Q1_PSD:
+        variables.append(cp.Variable(params[-2].shape, PSD = True))
+    else:
+        variables.append(cp.Variable(params[-2].shape, symmetric = True))
+    variables.append(cp.Variable(params[-1].shape, diag = True))
+    return variables
+
+def _theta_t_values(variables):
+    values = [var.value for var in variables]
+    values[-1] = values[-1].toarray() # Q2 is diagonal, so its value is a sparse matrix
+    return values
+
+@memoize_array('init_q1_nonlin')
 def init_q1_nonlin(
     Ae, Be1, Be2, Ce1, De1, Ce2, M,
     xi_dim,
@@ -108,13 +197,14 @@ def init_q1_nonlin(
     prob = cp.Problem(cp.Minimize(obj), cons)
 
     prob.solve(solver = cp.MOSEK)
-    feas_stats = [cp.OPTIMAL, cp.UNBOUNDED, cp.OPTIMAL_INACCURATE, cp.UNBOUNDED_INACCURATE]
-    assert prob.status in feas_stats, "RNN Old Projection Init Q1 Nonlin: infeasible"
+    if prob.status not in _feas_stats or vP.value is None:
+        raise cp.error.SolverError(f'RNN Old Projection Init Q1 Nonlin: infeasible (status {prob.status})')
 
     P = vP.value
     Q1init = np.linalg.inv(P)
     Q1init = scipy.linalg.block_diag(Q1init, np.eye(xi_dim))
-    return Q1init
+    # Only accurate solutions are cached
+    return Q1init if prob.status == cp.OPTIMAL else Uncached(Q1init)
 
 def construct_condition_nonlin(
     variables,
@@ -122,9 +212,14 @@ def construct_condition_nonlin(
     P_bar,
     Lambda_bar,
     Ae, Be1, Be2, Ce1, De1, Ce2, M,
-    decay_factor
+    decay_factor, W1 = None, W2 = None
 ):
+    """W1 and W2, if given, stand for Q1 @ P_bar and Q2 @ Lambda_bar."""
     AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1, Q2 = variables
+    if W1 is None:
+        W1 = Q1 @ P_bar
+    if W2 is None:
+        W2 = Q2 @ Lambda_bar
 
     n_xi = AK_t.shape[0]
     n_q = Be1.shape[1]
@@ -152,8 +247,8 @@ def construct_condition_nonlin(
     Lambda_bar_rows, Lambda_bar_cols = Lambda_bar.shape
     M_rows, M_cols = M.shape
 
-    Gamma = cp.bmat([[decay_factor**2 * (2*P_bar - P_bar.T@Q1 @ P_bar), np.zeros((P_bar_rows, Lambda_bar_cols)),   np.zeros((P_bar_rows, M_cols))],
-                     [np.zeros((Lambda_bar_rows, P_bar_cols)),          2*Lambda_bar - Lambda_bar.T@Q2@Lambda_bar, np.zeros((Lambda_bar_rows, M_cols))],
+    Gamma = cp.bmat([[decay_factor**2 * (2*P_bar - P_bar.T @ W1), np.zeros((P_bar_rows, Lambda_bar_cols)),   np.zeros((P_bar_rows, M_cols))],
+                     [np.zeros((Lambda_bar_rows, P_bar_cols)),     2*Lambda_bar - Lambda_bar.T @ W2,     np.zeros((Lambda_bar_rows, M_cols))],
                      [np.zeros((M_rows, P_bar_cols)),                   np.zeros((M_rows, Lambda_bar_cols)),       -LambdaIQC*M]])
     
     R = cp.bmat([[np.eye(C2.shape[1]), np.zeros((C2.shape[1], D3.shape[1])), np.zeros((C2.shape[1], D4.shape[1]))],
@@ -175,71 +270,88 @@ def construct_condition_nonlin(
 def rnn_project(
     AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar,
     AG, BG, CG,
-    eps, decay_factor
+    eps, decay_factor, profiler = None
 ):
-
-    if Q1_bar is None:
-        Q1_bar = init_q1(AG, BG, CG, AK_t.shape[0], rho = decay_factor, eps = eps)
-    
-    P_bar = np.linalg.inv(Q1_bar)
-    Lambda_bar = np.linalg.inv(Q2_bar)
-
-    originals = [AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar]
-
-    vAK_t  = cp.Variable(AK_t.shape)
-    vBK1_t = cp.Variable(BK1_t.shape)
-    vBK2_t = cp.Variable(BK2_t.shape)
-    vCK1_t = cp.Variable(CK1_t.shape)
-    vDK1_t = cp.Variable(DK1_t.shape)
-    vDK2_t = cp.Variable(DK2_t.shape)
-    vCK2_t = cp.Variable(CK2_t.shape)
-    vDK4_t = cp.Variable(DK4_t.shape)
-    vQ1 = cp.Variable(P_bar.shape, symmetric = True)
-    vQ2 = cp.Variable(Lambda_bar.shape, diag = True)
-
-    variables = [vAK_t, vBK1_t, vBK2_t, vCK1_t, vDK1_t, vDK2_t, vCK2_t, vDK4_t, vQ1, vQ2]
-
-    condition = construct_condition(variables, P_bar, Lambda_bar, AG, BG, CG, decay_factor)
-
-    constraints = [
-        vQ1 - eps * np.eye(vQ1.shape[0]) >> 0,
-        cp.diag(vQ2) >= eps,
-        condition - eps * np.eye(condition.shape[0]) >> 0
-    ]
-
-    obj = sum([cp.sum_squares(var - vVar) for (var, vVar) in zip(originals, variables)])
-
-    prob = cp.Problem(cp.Minimize(obj), constraints)
-
-    t0 = time.process_time()
-    try:
-        prob.solve(solver = cp.MOSEK)
-        if vAK_t.value is None:
-            raise "Error"
-    except Exception as e:
-        print('error: ', str(e))
-        print('solving with SCS')
-        prob.solve(solver = cp.SCS)
-    tf = time.process_time()
-
-    print('Projection: Objective value: ', prob.value)
-    print('Projection: Computed in: ', tf - t0, 'time')
-
-    oAK_t  = vAK_t.value
-    oBK1_t = vBK1_t.value
-    oBK2_t = vBK2_t.value
-    oCK1_t = vCK1_t.value
-    oDK1_t = vDK1_t.value
-    oDK2_t = vDK2_t.value
-    oCK2_t = vCK2_t.value
-    oDK4_t = vDK4_t.value
-    oQ1_bar = vQ1.value
-    oQ2_bar = vQ2.value.toarray()
-
-    return oAK_t, oBK1_t, oBK2_t, oCK1_t, oDK1_t, oDK2_t, oCK2_t, oDK4_t, oQ1_bar, oQ2_bar
-
-def construct_condition(variables, P_bar, Lambda_bar, AG, BG, CG, decay_factor):
+    """One-off projection. Repeated projections should reuse a RNNProjector instead."""
+    projector = RNNProjector(AG, BG, CG, AK_t.shape[0], DK4_t.shape[0], eps, decay_factor, profiler = profiler)
+    return projector.project(AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar)
+
+class RNNProjector:
+    """
+    Projection of the theta tilde parameters of ProjRNNOldModel for linear plants.
+    Built and compiled once, and solved (or skipped for feasible targets) like RNNNonlinProjector.
+    """
+    def __init__(self, AG, BG, CG, state_size, hidden_size, eps, decay_factor, profiler = None):
+        self.AG = AG
+        self.BG = BG
+        self.CG = CG
+        self.state_size = state_size
+        self.eps = eps
+        self.decay_factor = decay_factor
+        self.profiler = ProjectionProfiler() if profiler is None else profiler
+
+        ob_dim = CG.shape[0]
+        ac_dim = BG.shape[1]
+        q1_size = AG.shape[0] + state_size
+
+        with self.profiler.phase('build'):
+            self.params = _theta_t_parameters(state_size, hidden_size, ob_dim, ac_dim, q1_size)
+            self.pP_bar = cp.Parameter((q1_size, q1_size))
+            self.pLambda_bar = cp.Parameter((hidden_size, hidden_size))
+
+            self.variables = _theta_t_variables(self.params, Q1_PSD = False)
+            vQ1, vQ2 = self.variables[-2:]
+            self.vW1 = cp.Variable((q1_size, q1_size))
+            self.vW2 = cp.Variable((hidden_size, hidden_size))
+
+            condition = construct_condition(
+                self.variables, self.pP_bar, self.pLambda_bar, AG, BG, CG, decay_factor,
+                W1 = self.vW1, W2 = self.vW2
+            )
+
+            constraints = [
+                self.vW1 == vQ1 @ self.pP_bar,
+                self.vW2 == vQ2 @ self.pLambda_bar,
+                vQ1 - eps * np.eye(vQ1.shape[0]) >> 0,
+                cp.diag(vQ2) >= eps,
+                condition - eps * np.eye(condition.shape[0]) >> 0
+            ]
+
+            obj = sum([cp.sum_squares(param - var) for (param, var) in zip(self.params, self.variables)])
+
+            self.prob = cp.Problem(cp.Minimize(obj), constraints)
+        self.counts = {'solved': 0, 'skipped': 0}
+
+    def project(self, AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar):
+        if Q1_bar is None:
+            Q1_bar = init_q1(self.AG, self.BG, self.CG, self.state_size, rho = self.decay_factor, eps = self.eps)
+
+        with self.profiler.phase('assign'):
+            originals = [AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1_bar, Q2_bar]
+            for (param, value) in zip(self.params, originals):
+                param.value = value
+            self.pP_bar.value = np.linalg.inv(Q1_bar)
+            self.pLambda_bar.value = np.linalg.inv(Q2_bar)
+
+        if _targets_feasible(self.prob, self.variables, originals, [
+            (self.vW1, Q1_bar @ self.pP_bar.value), (self.vW2, Q2_bar @ self.pLambda_bar.value)
+        ]):
+            self.counts['skipped'] += 1
+            return originals
+
+        _solve(self.prob, self.variables, self.profiler, 'RNN Old Projection')
+        self.counts['solved'] += 1
+        print('Projection: Objective value: ', self.prob.value)
+
+        return _theta_t_values(self.variables)
+
+def construct_condition(variables, P_bar, Lambda_bar, AG, BG, CG, decay_factor, W1 = None, W2 = None):
+    """W1 and W2, if given, stand for Q1 @ P_bar and Q2 @ Lambda_bar."""
     AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK4_t, Q1, Q2 = variables
+    if W1 is None:
+        W1 = Q1 @ P_bar
+    if W2 is None:
+        W2 = Q2 @ Lambda_bar
 
     A = cp.bmat([[AG + BG @ DK2_t @ CG, BG @ CK1_t],
                  [BK2_t @ CG,           AK_t]])
@@ -251,8 +363,8 @@ def construct_condition(variables, P_bar, Lambda_bar, AG, BG, CG, decay_factor):
 
     D = np.zeros((DK4_t.shape[0], DK4_t.shape[0]))
 
-    block11 = cp.bmat([[decay_factor**2 * (2*P_bar - P_bar.T @ Q1 @ P_bar), np.zeros((P_bar.shape[0], Lambda_bar.shape[1]))],
-                       [np.zeros((Lambda_bar.shape[0], P_bar.shape[1])),    2*Lambda_bar - Lambda_bar.T @ Q2 @ Lambda_bar]])
+    block11 = cp.bmat([[decay_factor**2 * (2*P_bar - P_bar.T @ W1), np.zeros((P_bar.shape[0], Lambda_bar.shape[1]))],
+                       [np.zeros((Lambda_bar.shape[0], P_bar.shape[1])), 2*Lambda_bar - Lambda_bar.T @ W2]])
 
     block21 = cp.bmat([[A, B],
                        [C, D]])
@@ -265,6 +377,7 @@ def construct_condition(variables, P_bar, Lambda_bar, AG, BG, CG, decay_factor):
 
     return condition
 
+@memoize_array('init_q1')
 def init_q1(AG, BG, CG, xi_dim, rho = 0.98, eps = 1e-5):
     x_dim = AG.shape[0]
     if xi_dim is None:
@@ -300,6 +413,8 @@ def init_q1(AG, BG, CG, xi_dim, rho = 0.98, eps = 1e-5):
     constraints = [LMI1 >> 0, LMI2 >> 0]
     prob = cp.Problem(cp.Minimize(obj), constraints)
     prob.solve(solver = cp.MOSEK)
+    if prob.status not in _feas_stats or vX.value is None:
+        raise cp.error.SolverError(f'RNN Old Projection Init Q1: infeasible (status {prob.status})')
 
     X = vX.value
     Y = vY.value
@@ -311,4 +426,5 @@ def init_q1(AG, BG, CG, xi_dim, rho = 0.98, eps = 1e-5):
     Q1 = np.linalg.inv(P)
     Q1 = scipy.linalg.block_diag(Q1, np.eye(xi_dim - x_dim))
 
-    return Q1
\ No newline at end of file
+    # Only accurate solutions are cached
+    return Q1 if prob.status == cp.OPTIMAL else Uncached(Q1)
\ No newline at end of file
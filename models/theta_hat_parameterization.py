@@ -1,7 +1,11 @@
 import numpy as np
 import torch
 import torch.nn as nn
-from models.ren_projection import LinProjector, NonlinProjector
+from models.ren_projection import LinProjector, NonlinProjector, construct_condition
+from models.projection_scheduler import ProjectionScheduler
+from models.profiler import ProjectionProfiler
+from models.plant_reduction import reduce_plant
+from models.theta_recovery import loop_transformed_plant, recover_theta_t_structured
 from models.utils import uniform, to_numpy, from_numpy
 
 class ThetaHatParameterization:
@@ -15,33 +19,66 @@ class ThetaHatParameterization:
         ac_dim, 
         ob_dim,
         state_size,
-        hidden_size
+        hidden_size,
+        projector_config = None,
+        projection_service = None,
+        projection_schedule = None,
+        barrier_weight = 0.0,
+        feasible_step = None,
+        profile = None,
+        plant_reduction = None
     ):
+        """
+        projector_config: extra keyword arguments of LinProjector/NonlinProjector (e.g. incremental_check).
+        projection_service: if not None, a dict of RemoteProjector arguments (e.g. num_solvers)
+            to share projectors between trials through Ray actors instead of owning one.
+        projection_schedule: if not None, a dict of ProjectionScheduler arguments (e.g. check_every)
+            to skip LMI checks and projections when the LMI is certified to still hold.
+        barrier_weight: weight of the log-det barrier added to the training loss (0 disables it).
+        feasible_step: if not None, a dict of FeasibleStepOptimizer arguments (e.g. shrink, min_step)
+            to backtrack the optimizer step until the LMI holds, before falling back to projection.
+        profile: if not None, a dict of ProjectionProfiler arguments (e.g. trace_path) to time each phase
+            of the projection step. The timings are reported with the projection stats.
+        plant_reduction: if not None, a dict of reduce_plant arguments (e.g. tol) to build the controller and
+            projector on a minimal realization of the plant (see models.plant_reduction). The input-output map
+            is unchanged, so the controller and its certificate carry over to the original plant.
+        """
         self.rnn = rnn
         self.lmi_eps = lmi_eps
         self.exp_stability_rate = exp_stability_rate
+        self.barrier_weight = barrier_weight
+        self.feasible_step = feasible_step
+        self._last_barrier = None
+        self._barrier_infeasible = 0
+        self.profiler = ProjectionProfiler(enabled = True, **profile) if profile is not None else ProjectionProfiler()
 
         # Get plant parameters
         plant = plant_cstor(plant_config)
         self.plant_is_nonlin = plant.is_nonlin()
-        self.plant_state_size = plant.state_size
+        plant_params = plant.get_params() if self.plant_is_nonlin else [plant.AG, plant.BG, plant.CG]
+        self.plant_reduction_info = None
+        if plant_reduction is not None:
+            plant_params, self.plant_reduction_info = reduce_plant(
+                plant_params, self.plant_is_nonlin, self.exp_stability_rate, **plant_reduction
+            )
+            print(f'Theta Hat: Reduced plant from {self.plant_reduction_info["original_size"]} '
+                f'to {self.plant_reduction_info["reduced_size"]} states')
+        self.plant_state_size = plant_params[0].shape[0]
         assert state_size <= self.plant_state_size, "Controller state size must be <= plant state size"
         if self.plant_is_nonlin:
-            [AG, BG1, BG2, CG1, CG2, DG3, C_Delta, D_Delta] = plant.get_params()
             self.plant_nonlin_size = plant.nonlin_size
-            S_Delta = (C_Delta + D_Delta)/2.0
-            L_Delta = (D_Delta - C_Delta)/2.0
-            MG3 = np.linalg.inv(np.eye(DG3.shape[0]) - S_Delta * DG3)
-            self.AG_t = from_numpy(AG + S_Delta * BG1 @ MG3 @ CG2)
-            self.BG1_t = from_numpy(BG1 @ MG3 * L_Delta)
+            AG_t, BG1_t, BG2, CG1, CG2_t, DG3_t = loop_transformed_plant(*plant_params)
+            self.AG_t = from_numpy(AG_t)
+            self.BG1_t = from_numpy(BG1_t)
             self.BG2 = from_numpy(BG2)
             self.CG1 = from_numpy(CG1)
-            self.CG2_t = from_numpy(CG2 + S_Delta * DG3 @ MG3 @ CG2)
-            self.DG3_t = from_numpy(L_Delta * DG3 @ MG3)        
+            self.CG2_t = from_numpy(CG2_t)
+            self.DG3_t = from_numpy(DG3_t)
         else:
-            self.AG_t = from_numpy(plant.AG)
-            self.BG2  = from_numpy(plant.BG)
-            self.CG1  = from_numpy(plant.CG)
+            AG, BG, CG = plant_params
+            self.AG_t = from_numpy(AG)
+            self.BG2  = from_numpy(BG)
+            self.CG1  = from_numpy(CG)
         
         # _T for transpose, _t for tilde, _h for hat
         X_cstor = uniform(self.plant_state_size, self.plant_state_size)
@@ -65,18 +102,30 @@ class ThetaHatParameterization:
             self.DK3_h = nn.Parameter(DK3_h_cstor)
         self.DK4_h = nn.Parameter(uniform(hidden_size, ob_dim))
 
+        # The projector is described by (class, args, kwargs) so that it can also be built remotely.
         if self.plant_is_nonlin:
-            self.projector = NonlinProjector(
+            self.projector_spec = (NonlinProjector, (
                 to_numpy(self.AG_t), to_numpy(self.BG1_t), to_numpy(self.BG2),
                 to_numpy(self.CG1), to_numpy(self.CG2_t), to_numpy(self.DG3_t),
                 self.lmi_eps, self.exp_stability_rate,
-                state_size, hidden_size, ob_dim, ac_dim,
-                rnn = self.rnn, recenter_lambda_p = True
-            )
+                state_size, hidden_size, ob_dim, ac_dim
+            ), {'rnn': self.rnn, 'recenter_lambda_p': True, **(projector_config or {})})
         else:
-            self.projector = LinProjector(plant.AG, plant.BG, plant.CG, 
+            self.projector_spec = (LinProjector, (
+                AG, BG, CG,
                 self.lmi_eps, self.exp_stability_rate,
-                state_size, hidden_size, ob_dim, ac_dim, rnn = self.rnn)
+                state_size, hidden_size, ob_dim, ac_dim
+            ), {'rnn': self.rnn, **(projector_config or {})})
+
+        if projection_service is not None:
+            from models.projection_service import RemoteProjector
+            self.projector = RemoteProjector(*self.projector_spec, **projection_service)
+        else:
+            projector_cls, projector_args, projector_kwargs = self.projector_spec
+            self.projector = projector_cls(*projector_args, profiler = self.profiler, **projector_kwargs)
+
+        if projection_schedule is not None:
+            self.projector = ProjectionScheduler(self.projector, **projection_schedule)
 
         self.project()
 
@@ -86,27 +135,32 @@ class ThetaHatParameterization:
         self.Lambda_c = torch.diag(self.Lambda_c_vec)
 
     def project(self):
-        self.construct_theta_h()
+        with self.profiler.phase('theta_hat'):
+            self.construct_theta_h()
         self.project_to_stabilizing_set()
-        self.recover_theta_t()
+        with self.profiler.phase('recover_theta_t'):
+            self.recover_theta_t()
 
     def project_to_stabilizing_set(self):
-        X = to_numpy(self.X)
-        Y = to_numpy(self.Y)
-        N11 = to_numpy(self.N11)
-        N12 = to_numpy(self.N12)
-        N21  = to_numpy(self.N21)
-        N22 = to_numpy(self.N22)
-        Lambda_c = to_numpy(self.Lambda_c)
-        N12_h = to_numpy(self.N12_h)
-        N21_h = to_numpy(self.N21_h)
-        DK1_t = to_numpy(self.DK1_t)
-        DK3_h = to_numpy(self.DK3_h)
-        DK4_h = to_numpy(self.DK4_h)
-
-        X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = self.projector.project(
-            X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h
-        )
+        with self.profiler.phase('to_numpy'):
+            X = to_numpy(self.X)
+            Y = to_numpy(self.Y)
+            N11 = to_numpy(self.N11)
+            N12 = to_numpy(self.N12)
+            N21  = to_numpy(self.N21)
+            N22 = to_numpy(self.N22)
+            Lambda_c = to_numpy(self.Lambda_c)
+            N12_h = to_numpy(self.N12_h)
+            N21_h = to_numpy(self.N21_h)
+            DK1_t = to_numpy(self.DK1_t)
+            DK3_h = to_numpy(self.DK3_h)
+            DK4_h = to_numpy(self.DK4_h)
+
+        # Includes the phases timed by the projector, or the round trip for a remote projector
+        with self.profiler.phase('project'):
+            X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = self.projector.project(
+                X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h
+            )
 
         if X is not None: # If X is None then the parameters after the gradient step already are stabilizing.
             X_cstor = X/2.0
@@ -138,37 +192,116 @@ class ThetaHatParameterization:
         X and Y must be positive definite symmetric.
         Lambda must be positive definite diagonal.
         """
+        theta_h = [self.X, self.Y, self.N11, self.N12, self.N21, self.N22, self.Lambda_c,
+            self.N12_h, self.N21_h, self.DK1_t, self.DK3_h, self.DK4_h]
+        AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t = recover_theta_t_structured(
+            theta_h, self.AG_t, self.BG2, self.CG1, self.state_size
+        )
 
-        U = self.X[:, :self.state_size]
-        V0 = self.X.inverse() - self.Y
-        V = V0[:, :self.state_size]
-
-        left = torch.vstack((torch.hstack((U, self.X @ self.BG2)),
-                            torch.hstack((torch.zeros(self.BG2.shape[1], U.shape[1]), torch.eye(self.BG2.shape[1])))))
-        mid = torch.vstack((torch.hstack((self.N11 - self.X@self.AG_t@self.Y, self.N12)),
-                            torch.hstack((self.N21, self.N22))))
-        right_T = torch.vstack((torch.hstack((V, self.Y.t() @ self.CG1.t())),
-                                torch.hstack((torch.zeros(self.CG1.shape[0], V.shape[1]), torch.eye(self.CG1.shape[0])))))
-        ABCD = left.pinverse() @ mid @ right_T.pinverse().t()
-
-        self.AK_tT  = ABCD[:self.state_size, :self.state_size].t()
-        self.BK2_tT = ABCD[:self.state_size, self.state_size:].t()
-        self.CK1_tT = ABCD[self.state_size:, :self.state_size].t()
-        self.DK2_tT = ABCD[self.state_size:, self.state_size:].t()
-
-        self.BK1_tT = (U.pinverse() @ (self.N12_h - self.X @ self.BG2 @ self.DK1_t)).t()
-        Lambda_c_inv = self.Lambda_c.inverse()
-        self.CK2_tT = V.pinverse() @ (self.N21_h - self.DK4_h @ self.CG1 @ self.Y).t() @ Lambda_c_inv
-        self.DK3_tT = torch.t(Lambda_c_inv @ self.DK3_h)
-        self.DK4_tT = torch.t(Lambda_c_inv @ self.DK4_h)
-        self.DK1_tT = torch.t(self.DK1_t)
-
-
-        # t0 = time.time()
-        if not self.satisfy_stability_condition():
+        self.AK_tT  = AK_t.t()
+        self.BK1_tT = BK1_t.t()
+        self.BK2_tT = BK2_t.t()
+        self.CK1_tT = CK1_t.t()
+        self.DK1_tT = DK1_t.t()
+        self.DK2_tT = DK2_t.t()
+        self.CK2_tT = CK2_t.t()
+        self.DK3_tT = DK3_t.t()
+        self.DK4_tT = DK4_t.t()
+
+        with self.profiler.phase('recover_check'):
+            satisfied = self.satisfy_stability_condition()
+        if not satisfied:
             print("Theta Hat: Recover Theta Tilde: Recovered parameters do not satisfy LMI")
-        # tf = time.time()
-        # print(f'Spent {tf-t0} seconds checking if recovered params satisfy LMI')
+
+    def theta_h_parameters(self):
+        """The trainable parameters which theta hat is constructed from, by name."""
+        names = ['X_cstor', 'Y_cstor', 'N11', 'N12', 'N21', 'N22', 'Lambda_c_vec',
+            'N12_h', 'N21_h', 'DK1_t', 'DK3_h', 'DK4_h']
+        if self.rnn:
+            names.remove('DK3_h')
+        return {name: getattr(self, name) for name in names}
+
+    def condition_tensor(self, theta_h_params = None):
+        """
+        LMI condition as a torch tensor, at the current parameters or at
+        parameter values given by a dict like the one from theta_h_parameters.
+        """
+        values = self.theta_h_parameters()
+        if theta_h_params is not None:
+            values.update(theta_h_params)
+        X = values['X_cstor'] + values['X_cstor'].t()
+        Y = values['Y_cstor'] + values['Y_cstor'].t()
+        Lambda_c = torch.diag(values['Lambda_c_vec'])
+        DK3_h = self.DK3_h if self.rnn else values['DK3_h']
+        variables = [X, Y, values['N11'], values['N12'], values['N21'], values['N22'], Lambda_c,
+            values['N12_h'], values['N21_h'], values['DK1_t'], DK3_h, values['DK4_h']]
+
+        if self.plant_is_nonlin:
+            return construct_condition(
+                variables, self.AG_t, self.BG2, self.CG1, self.exp_stability_rate, stacker = 'torch',
+                nonlin = True, Lambda_p = from_numpy(self.projector.Lambda_p),
+                BG1_t = self.BG1_t, CG2_t = self.CG2_t, DG3_t = self.DG3_t
+            )
+        return construct_condition(
+            variables, self.AG_t, self.BG2, self.CG1, self.exp_stability_rate, stacker = 'torch'
+        )
+
+    def log_det_barrier(self):
+        """
+        Differentiable barrier -log det(condition) of the LMI condition at the current theta hat.
+        The projection enforces condition >= lmi_eps I, so projected iterates are strictly inside the domain of the
+        barrier, which grows without bound as the condition approaches singularity.
+        Outside of the domain (the Cholesky factorization fails) the barrier is inf: the loss skips it and the
+        projection restores feasibility. Such steps are counted in barrier_infeasible.
+        """
+        condition = self.condition_tensor().double()
+        L, info = torch.linalg.cholesky_ex(condition)
+        if info.item() != 0:
+            self._barrier_infeasible += 1
+            barrier = torch.tensor(float('inf'))
+        else:
+            barrier = (-2 * torch.log(torch.diagonal(L)).sum()).float()
+        self._last_barrier = barrier.item()
+        return barrier
+
+    def largest_feasible_step(self, old_params, new_params, step_sizes):
+        """
+        Largest of the (decreasing) step_sizes s for which the parameters old + s (new - old) satisfy the LMI,
+        or None if there is none. Like satisfy_lmi, the LMI is checked with a Cholesky factorization.
+        The condition is affine in the parameters, so all step sizes are checked in one batched factorization.
+        """
+        with torch.no_grad():
+            condition_old = self.condition_tensor(old_params).double()
+            condition_new = self.condition_tensor(new_params).double()
+            steps = torch.tensor(step_sizes, dtype = torch.float64)
+            conditions = condition_old + steps[:, None, None] * (condition_new - condition_old)
+            _, info = torch.linalg.cholesky_ex(conditions)
+        feasible = torch.nonzero(info == 0)
+        if feasible.shape[0] == 0:
+            return None
+        return step_sizes[feasible[0, 0].item()]
+
+    def projection_stats(self):
+        """Statistics of the projection step, reported with the learner stats."""
+        stats = {}
+        if isinstance(self.projector, ProjectionScheduler):
+            stats.update(self.projector.stats())
+        lmi_checker = getattr(self.projector, 'lmi_checker', None)
+        if lmi_checker is not None:
+            stats.update({f'lmi_check_{path}': count for (path, count) in lmi_checker.counts.items()})
+        iterations = getattr(self.projector, 'iterations', None)
+        if iterations is not None:
+            stats.update(iterations.stats())
+        if hasattr(self.projector, 'recenter_stats'):
+            stats.update(self.projector.recenter_stats())
+        chordal_stats = getattr(self.projector, 'chordal_stats', None)
+        if chordal_stats is not None and getattr(self.projector, 'chordal', False):
+            stats.update({f'chordal_{key}': value for (key, value) in chordal_stats.items()})
+        if self._last_barrier is not None:
+            stats['log_det_barrier'] = self._last_barrier
+            stats['barrier_infeasible'] = self._barrier_infeasible
+        stats.update(self.profiler.metrics())
+        return stats
 
     def satisfy_stability_condition(self):
         AK_t = to_numpy(self.AK_tT).T
@@ -186,9 +319,9 @@ class ThetaHatParameterization:
 
 
 class RNNThetaHatParameterization(ThetaHatParameterization):
-    def __init__(self, *args):
-        super().__init__(True, *args)
+    def __init__(self, *args, **kwargs):
+        super().__init__(True, *args, **kwargs)
 
 class RENThetaHatParameterization(ThetaHatParameterization):
-    def __init__(self, *args):
-        super().__init__(False, *args)
+    def __init__(self, *args, **kwargs):
+        super().__init__(False, *args, **kwargs)
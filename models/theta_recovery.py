@@ -0,0 +1,129 @@
+"""
+Recovery of the theta tilde (controller) parameters from the theta hat parameters and the loop transformed plant.
+Only depends on numpy and torch, so that trained controllers can be rebuilt without the projectors.
+"""
+
+import numpy as np
+import torch
+
+def loop_transformed_plant(AG, BG1, BG2, CG1, CG2, DG3, C_Delta, D_Delta):
+    """
+    Loop transforms the plant's sector bounded nonlinearity Delta in [C_Delta, D_Delta] to one in [-1, 1].
+    Returns AG_t, BG1_t, BG2, CG1, CG2_t, DG3_t as numpy arrays.
+    """
+    S_Delta = (C_Delta + D_Delta)/2.0
+    L_Delta = (D_Delta - C_Delta)/2.0
+    MG3 = np.linalg.inv(np.eye(DG3.shape[0]) - S_Delta * DG3)
+    AG_t = AG + S_Delta * BG1 @ MG3 @ CG2
+    BG1_t = BG1 @ MG3 * L_Delta
+    CG2_t = CG2 + S_Delta * DG3 @ MG3 @ CG2
+    DG3_t = L_Delta * DG3 @ MG3
+    return AG_t, BG1_t, BG2, CG1, CG2_t, DG3_t
+
+def _pinv_solve(A, B, rcond = 1e-10):
+    """
+    A^+ B for A with full column rank, through a QR factorization in float64 (which, unlike the normal equations,
+    does not square the condition number). Falls back to the SVD pseudo-inverse if R is numerically singular.
+    """
+    A64, B64 = A.double(), B.double()
+    Q, R = torch.linalg.qr(A64)
+    R_diag = torch.diagonal(R).abs()
+    if R_diag.min() <= rcond * R_diag.max():
+        return (torch.linalg.pinv(A64) @ B64).to(A.dtype)
+    return torch.linalg.solve_triangular(R, Q.t() @ B64, upper = True).to(A.dtype)
+
+def recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, state_size):
+    """
+    Converts theta hat parameters to theta tilde parameters (AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t)
+    with pseudo-inverses of the full block matrices. Reference for recover_theta_t_structured.
+    """
+    X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = theta_h
+
+    U = X[:, :state_size]
+    V0 = X.inverse() - Y
+    V = V0[:, :state_size]
+
+    left = torch.vstack((torch.hstack((U, X @ BG2)),
+                        torch.hstack((torch.zeros(BG2.shape[1], U.shape[1]), torch.eye(BG2.shape[1])))))
+    mid = torch.vstack((torch.hstack((N11 - X@AG_t@Y, N12)),
+                        torch.hstack((N21, N22))))
+    right_T = torch.vstack((torch.hstack((V, Y.t() @ CG1.t())),
+                            torch.hstack((torch.zeros(CG1.shape[0], V.shape[1]), torch.eye(CG1.shape[0])))))
+    ABCD = left.pinverse() @ mid @ right_T.pinverse().t()
+
+    Lambda_c_inv = Lambda_c.inverse()
+    AK_t  = ABCD[:state_size, :state_size]
+    BK2_t = ABCD[:state_size, state_size:]
+    CK1_t = ABCD[state_size:, :state_size]
+    DK2_t = ABCD[state_size:, state_size:]
+    BK1_t = U.pinverse() @ (N12_h - X @ BG2 @ DK1_t)
+    CK2_t = (V.pinverse() @ (N21_h - DK4_h @ CG1 @ Y).t() @ Lambda_c_inv).t()
+    DK3_t = Lambda_c_inv @ DK3_h
+    DK4_t = Lambda_c_inv @ DK4_h
+    return AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t
+
+def recover_theta_t_structured(theta_h, AG_t, BG2, CG1, state_size):
+    """
+    Same as recover_theta_t_pinv, using the structure of the matrices instead of SVDs:
+    X and -V = Y - X^-1 are symmetric positive definite (Cholesky), Lambda_c is diagonal, and
+    the left and right matrices are block upper triangular with identity blocks. When the controller state size
+    equals the plant state size they are square and are inverted blockwise; otherwise their pseudo-inverses are
+    applied through QR factorizations in float64.
+    Falls back to recover_theta_t_pinv if X or -V is not numerically positive definite.
+    """
+    X, Y, N11, N12, N21, N22, Lambda_c, N12_h, N21_h, DK1_t, DK3_h, DK4_h = theta_h
+    n = X.shape[0]
+    full_state = state_size == n
+
+    L_X, info = torch.linalg.cholesky_ex(X)
+    if info.item() != 0:
+        return recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, state_size)
+    V0 = torch.cholesky_inverse(L_X) - Y
+    U = X[:, :state_size]
+    V = V0[:, :state_size]
+    XB = X @ BG2
+    YC = Y @ CG1.t()
+
+    if full_state:
+        L_negV, info = torch.linalg.cholesky_ex(-V0)
+        if info.item() != 0:
+            return recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, state_size)
+        U_solve = lambda B: torch.cholesky_solve(B, L_X)
+        V_solve = lambda B: -torch.cholesky_solve(B, L_negV)
+    else:
+        U_solve = lambda B: _pinv_solve(U, B)
+        V_solve = lambda B: _pinv_solve(V, B)
+
+    mid_top = torch.hstack((N11 - X @ AG_t @ Y, N12))
+    mid_bottom = torch.hstack((N21, N22))
+
+    # left^+ mid
+    if full_state:
+        # [[X, X BG2], [0, I]]^-1 = [[X^-1, -BG2], [0, I]]
+        T = torch.vstack((U_solve(mid_top) - BG2 @ mid_bottom, mid_bottom))
+    else:
+        left = torch.vstack((torch.hstack((U, XB)),
+                            torch.hstack((torch.zeros(BG2.shape[1], state_size), torch.eye(BG2.shape[1])))))
+        T = _pinv_solve(left, torch.vstack((mid_top, mid_bottom)))
+
+    # (right_T^+ T^T)^T
+    Z = T.t()
+    if full_state:
+        # [[V, Y CG1^T], [0, I]]^-1 = [[V^-1, -V^-1 Y CG1^T], [0, I]]
+        Z_top, Z_bottom = Z[:n], Z[n:]
+        ABCD = torch.vstack((V_solve(Z_top - YC @ Z_bottom), Z_bottom)).t()
+    else:
+        right_T = torch.vstack((torch.hstack((V, YC)),
+                                torch.hstack((torch.zeros(CG1.shape[0], state_size), torch.eye(CG1.shape[0])))))
+        ABCD = _pinv_solve(right_T, Z).t()
+
+    Lambda_c_diag = torch.diagonal(Lambda_c)
+    AK_t  = ABCD[:state_size, :state_size]
+    BK2_t = ABCD[:state_size, state_size:]
+    CK1_t = ABCD[state_size:, :state_size]
+    DK2_t = ABCD[state_size:, state_size:]
+    BK1_t = U_solve(N12_h - XB @ DK1_t)
+    CK2_t = (V_solve((N21_h - DK4_h @ CG1 @ Y).t()) / Lambda_c_diag).t()
+    DK3_t = DK3_h / Lambda_c_diag[:, None]
+    DK4_t = DK4_h / Lambda_c_diag[:, None]
+    return AK_t, BK1_t, BK2_t, CK1_t, DK1_t, DK2_t, CK2_t, DK3_t, DK4_t
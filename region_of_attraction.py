@@ -0,0 +1,128 @@
+"""
+Region of attraction estimation of a closed loop (controller model and plant env) from batched closed loop
+simulations of many initial states: a dense grid or Sobol samples of a box of initial states, refined adaptively
+near the boundary of the region. An initial state is in the region if its trajectory ends near the origin.
+The result is written to an .npz file for plotting.
+"""
+
+import numpy as np
+import torch
+
+from closed_loop import simulate
+from envs.torch_plant import TorchLurePlant
+
+def grid_samples(low, high, n_per_dim):
+    """Grid of n_per_dim points per dimension of the box [low, high], as an (n_per_dim**d, d) array."""
+    axes = [np.linspace(l, h, n_per_dim) for (l, h) in zip(low, high)]
+    return np.stack(np.meshgrid(*axes, indexing = 'ij'), axis = -1).reshape(-1, len(axes))
+
+def sobol_samples(low, high, n, seed = None):
+    """n (a power of 2) scrambled Sobol points in the box [low, high]."""
+    from scipy.stats import qmc
+    sampler = qmc.Sobol(d = len(low), scramble = True, seed = seed)
+    return qmc.scale(sampler.random(n), low, high)
+
+def classify(model, env, init_states, horizon = None, tol = 1e-2, fail_on_state_space = False, batch_size = 4096):
+    """
+    Whether the trajectory from each of the (N, nx) initial states ends within tol of the origin, and the norm of
+    the final states. The initial states are simulated batch_size at a time.
+    """
+    plant = TorchLurePlant.from_env(env)
+    converged = []
+    final_norms = []
+    with torch.no_grad():
+        for start in range(0, init_states.shape[0], batch_size):
+            x0 = init_states[start:start+batch_size].astype(np.float32)
+            states, actions, mask, success = simulate(
+                model, env, x0, horizon = horizon, fail_on_state_space = fail_on_state_space,
+                success_tol = tol, plant = plant
+            )
+            final = plant.step(states[:, -1], plant.clip(actions[:, -1]))
+            converged.append(success.numpy())
+            final_norms.append(torch.linalg.norm(final, dim = 1).numpy())
+    return np.concatenate(converged), np.concatenate(final_norms)
+
+def boundary_samples(points, converged, scale, n_neighbors = 8, n_new = 4, max_points = None, rng = None):
+    """
+    New initial states near the boundary of the region: for each point with one of its n_neighbors nearest
+    neighbors (in coordinates divided by scale) classified differently, n_new points drawn uniformly in the box
+    around the midpoint of the pair, of half-width half their distance.
+    At most max_points points are returned.
+    """
+    from scipy.spatial import cKDTree
+    rng = np.random.default_rng() if rng is None else rng
+    normed = points / scale
+    _, neighbors = cKDTree(normed).query(normed, k = n_neighbors + 1)
+    neighbors = neighbors[:, 1:]
+    differs = converged[neighbors] != converged[:, np.newaxis]
+    first = np.argmax(differs, axis = 1)
+    on_boundary = np.any(differs, axis = 1)
+
+    idx = np.flatnonzero(on_boundary)
+    other = neighbors[idx, first[idx]]
+    centers = (normed[idx] + normed[other]) / 2
+    radii = np.linalg.norm(normed[idx] - normed[other], axis = 1, keepdims = True) / 2
+    centers = np.repeat(centers, n_new, axis = 0)
+    radii = np.repeat(radii, n_new, axis = 0)
+    new = centers + radii * rng.uniform(-1, 1, size = centers.shape)
+    if max_points is not None and new.shape[0] > max_points:
+        new = new[rng.choice(new.shape[0], max_points, replace = False)]
+    return new * scale
+
+def estimate_region(
+    model, env, low, high, sampling = 'grid', n = 256, refine_levels = 2, refine_points = 65536,
+    horizon = None, tol = 1e-2, fail_on_state_space = False, seed = None
+):
+    """
+    Region of attraction in the box of initial states [low, high].
+    sampling: 'grid' for n points per dimension, or 'sobol' for n Sobol points.
+    refine_levels: number of rounds of boundary refinement, each adding at most refine_points initial states.
+    Returns a dict of the initial states ('points'), their classification ('converged'), the norm of their final
+    states ('final_norm') and the refinement level at which they were added ('level'), plus 'low' and 'high'.
+    For grid sampling, the first n**d points are the grid, in row-major order.
+    """
+    low = np.asarray(low, dtype = np.float64)
+    high = np.asarray(high, dtype = np.float64)
+    if sampling == 'grid':
+        points = grid_samples(low, high, n)
+    elif sampling == 'sobol':
+        points = sobol_samples(low, high, n, seed = seed)
+    else:
+        raise ValueError(f'Unknown sampling {sampling}')
+    converged, final_norm = classify(model, env, points, horizon, tol, fail_on_state_space)
+    level = np.zeros(points.shape[0], dtype = np.int8)
+
+    rng = np.random.default_rng(seed)
+    scale = high - low
+    for i in range(refine_levels):
+        new = boundary_samples(points, converged, scale, max_points = refine_points, rng = rng)
+        new = np.clip(new, low, high)
+        if new.shape[0] == 0:
+            break
+        new_converged, new_final_norm = classify(model, env, new, horizon, tol, fail_on_state_space)
+        points = np.concatenate((points, new))
+        converged = np.concatenate((converged, new_converged))
+        final_norm = np.concatenate((final_norm, new_final_norm))
+        level = np.concatenate((level, np.full(new.shape[0], i + 1, dtype = np.int8)))
+        print(f'Region of attraction: refinement {i + 1}: {new.shape[0]} points, '
+            f'{new_converged.mean():.2f} converged')
+
+    return {
+        'low': low, 'high': high,
+        'points': points.astype(np.float32), 'converged': converged,
+        'final_norm': final_norm.astype(np.float32), 'level': level
+    }
+
+def save_region(path, region):
+    np.savez_compressed(path, **region)
+
+if __name__ == '__main__':
+    from models.checkpoint import load_controller
+
+    agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-26_20-02-35'
+    controller, env = load_controller(agent_dir, checkpoint_path=agent_dir + "/checkpoint_001667/checkpoint-1667")
+
+    state_max = env.state_space.high/0.8
+    region = estimate_region(controller, env, -state_max, state_max, sampling = 'grid', n = 256)
+    save_region('region_of_attraction.npz', region)
+    print(f'Region of attraction: {region["converged"][:256**2].mean():.3f} of the grid converged')
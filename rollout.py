@@ -4,7 +4,6 @@ Reconstructing policies from checkpoints to create plots with rollouts.
 
 import numpy as np
 import json
-import matplotlib.pyplot as plt
 import torch
 
 from envs import CartpoleEnv, InvertedPendulumEnv, LinearizedInvertedPendulumEnv, PendubotEnv, VehicleLateralEnv, PowergridEnv
@@ -12,6 +11,7 @@ from models import ProjRENModel, ProjRNNModel, ProjRNNOldModel
 from activations import LeakyReLU, Tanh
 from deq_lib.solvers import broyden, anderson
 from trainers import ProjectedPGTrainer, ProjectedPPOTrainer
+from closed_loop import simulate
 
 env_map = {
     "<class 'envs.inverted_pendulum.InvertedPendulumEnv'>": InvertedPendulumEnv,
@@ -61,138 +61,142 @@ def load_agent(directory, checkpoint_path = None):
 
     return agent, env
 
-def compute_rollout(agent, env, init_obs):
-    obs = init_obs
-    policy_state = agent.get_policy().get_initial_state()
-    prev_rew = 0
-    prev_act = np.zeros_like(env.action_space.sample())
-    rewards = []
-    actions = []
-    states = []
-    done = False
-    n_steps = 0
-    while not done:
-        states.append(env.state)
-        action, policy_state, _ = agent.compute_single_action(
-            obs, state = policy_state, prev_reward = prev_rew, prev_action = prev_act, explore = False
+def compute_rollouts(agent, env, init_states, horizon = None):
+    """
+    Rollouts of the agent's deterministic policy from the (B, nx) initial states, all B in one batched
+    closed loop simulation. The trajectories run for horizon steps (default: the env's episode length).
+    Returns the states (B, T, nx) and actions (B, T, nu) as numpy arrays.
+    """
+    with torch.no_grad():
+        states, actions, _, _ = simulate(
+            agent.get_policy().model, env, init_states, horizon = horizon, fail_on_state_space = False
         )
-        obs, rew, done, info = env.step(action, fail_on_state_space = False)
-        actions.append(action)
-        rewards.append(rew)
-        prev_rew = rew
-        n_steps += 1
-    if n_steps < env.time_max+1:
+    return states.numpy(), actions.numpy()
+
+def compute_rollout(agent, env, fail_on_state_space = False):
+    """
+    Rollout from the env's current state for the rest of its episode, stopping at the first step which
+    terminates the episode (leaving the state space, if fail_on_state_space).
+    The actions are those of the policy's model on the raw observations: RLlib's preprocessors and
+    observation filters (compute_single_action) are bypassed.
+    Returns the states (nx, T) and actions (nu, T) of the (possibly truncated) trajectory and whether it failed,
+    i.e. terminated before the end of the episode.
+    """
+    horizon = env.time_max + 1 - env.time
+    with torch.no_grad():
+        states, actions, mask, _ = simulate(
+            agent.get_policy().model, env, env.state[np.newaxis], horizon = horizon,
+            fail_on_state_space = fail_on_state_space
+        )
+    n_steps = int(mask[0].sum())
+    failed = n_steps < horizon
+    if failed:
         print('failure')
-
-    states = np.stack(states).T
-    actions = np.stack(actions).T
-
-    return states, actions
+    return states[0, :n_steps].numpy().T, actions[0, :n_steps].numpy().T, failed
 
 # Phase portraits
 
 def phase_portrait(agent_dir, N_PER_DIM, ROLLOUT_LEN):
     agent, env = load_agent(agent_dir, checkpoint_path=agent_dir + "/checkpoint_001667/checkpoint-1667")
 
-    rollouts = torch.zeros(N_PER_DIM, N_PER_DIM, ROLLOUT_LEN, env.state_size)
     state_max = env.state_space.high/0.8
-    theta_points = torch.linspace(-state_max[0], state_max[0], N_PER_DIM)
-    thetadot_points = torch.linspace(-state_max[1], state_max[1], N_PER_DIM)
-    for i in range(N_PER_DIM):
-        for j in range(N_PER_DIM):
-            print(f'{i}, {j}')
-            init_obs = env.reset(np.array([theta_points[i], thetadot_points[j]]))
-            states, actions = compute_rollout(agent, env, init_obs)
-            rollouts[i, j] = torch.from_numpy(states.T)
+    theta_points = np.linspace(-state_max[0], state_max[0], N_PER_DIM)
+    thetadot_points = np.linspace(-state_max[1], state_max[1], N_PER_DIM)
+    init_states = np.stack(np.meshgrid(theta_points, thetadot_points, indexing = 'ij'), axis = -1).reshape(-1, 2)
+    states, actions = compute_rollouts(agent, env, init_states.astype(np.float32), horizon = ROLLOUT_LEN)
+    rollouts = torch.from_numpy(states).reshape(N_PER_DIM, N_PER_DIM, ROLLOUT_LEN, env.state_size)
     return rollouts, env
 
-N_PER_DIM = 7
-ROLLOUT_LEN = 200 + 1
-
-# true_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden16_1_hidden_size=16_2022-03-25_15-29-16'
-# learned_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-25_15-42-07'
-
-# Learned B2 as well
-learned_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-26_20-00-50'
-true_agent_dir    = '../ray_results/StableRwd_PPO/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-26_20-02-35'
-
-true_pp, _ = phase_portrait(true_agent_dir, N_PER_DIM, ROLLOUT_LEN)
-learned_pp, env = phase_portrait(learned_agent_dir, N_PER_DIM, ROLLOUT_LEN)
-
-plt.figure()
-plt.subplot(121, title = 'True Plant Model', xlim=[-np.pi, np.pi], ylim=[-8, 8])
-for i in range(N_PER_DIM):
-    for j in range(N_PER_DIM):
-        # print(f'{i}, {j}')
-        rollout = true_pp[i, j]
-        if torch.allclose(torch.zeros(env.state_size), rollout[-1]):
-            color = 'C2' # green
-        else:
-            color = 'C3' # red
-        plt.plot(rollout[:, 0], rollout[:, 1], color = color)
-plt.xlabel('x1 (radians)')
-plt.ylabel('x2 (radians/second)')
-
-plt.subplot(122, title = 'Learned Plant Model', xlim=[-np.pi, np.pi], ylim=[-8, 8])
-for i in range(N_PER_DIM):
-    for j in range(N_PER_DIM):
-        # print(f'{i}, {j}')
-        rollout = learned_pp[i, j]
-        if torch.allclose(torch.zeros(env.state_size), rollout[-1]):
-            color = 'C2' # green
-        else:
-            color = 'C3' # red
-        plt.plot(rollout[:, 0], rollout[:, 1], color = color)
-plt.xlabel('x1 (radians)')
-plt.show()
-
-# Plotting rollouts of agents against each other from the same initial conditions.
-
-# ren_dir = "../ray_results/Learned_InvPend/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden4_0_2022-03-25_10-08-38"
-# rnn_dir = "../ray_results/Learned_InvPend/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden4_0_2022-03-25_10-08-52"
-
-# ren_agent, _ = load_agent(ren_dir, checkpoint_path=ren_dir + "/checkpoint_000084/checkpoint-84")
-# rnn_agent, env = load_agent(rnn_dir, checkpoint_path=rnn_dir + "/checkpoint_000084/checkpoint-84")#, checkpoint_path=rnn_dir + '/checkpoint_000010/checkpoint-10')
-
-# # x vs t
-
-# N_iters = 10
-# ren_states = []
-# ren_actions = []
-# rnn_states = []
-# rnn_actions = []
-
-# for _ in range(N_iters):
-#     obs = env.reset()
-#     env_copy = copy.deepcopy(env)
-
-#     ren_state, ren_action = compute_rollout(ren_agent, env, obs)
-#     # assert ren_state.shape[1] == env.time_max + 1, 'fail long'
-#     ren_states.append(ren_state)
-#     ren_actions.append(ren_action)
-
-#     rnn_state, rnn_action = compute_rollout(rnn_agent, env_copy, obs)
-#     rnn_states.append(rnn_state)
-#     rnn_actions.append(rnn_action)
-
-# plt.figure()
-
-# plt.subplot(311)
-# for i in range(N_iters):
-#     plt.plot(ren_states[i][0])
-#     # plt.plot(rnn_states[i][0])
-# plt.title("theta")
-
-# plt.subplot(312)
-# for i in range(N_iters):
-#     plt.plot(ren_states[i][1])
-#     # plt.plot(rnn_states[i][1])
-# plt.title("theta dot")
-
-# plt.subplot(313)
-# for i in range(N_iters):
-#     plt.plot(ren_actions[i][0]) #, 'tab:orange')
-#     # plt.plot(rnn_actions[i][0], 'tab:blue')
-# plt.title("u")
-
-# plt.show()
\ No newline at end of file
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    N_PER_DIM = 7
+    ROLLOUT_LEN = 200 + 1
+
+    # true_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden16_1_hidden_size=16_2022-03-25_15-29-16'
+    # learned_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-25_15-42-07'
+
+    # Learned B2 as well
+    learned_agent_dir = '../ray_results/StableRwd_PPO/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-26_20-00-50'
+    true_agent_dir    = '../ray_results/StableRwd_PPO/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden16_0_2022-03-26_20-02-35'
+
+    true_pp, _ = phase_portrait(true_agent_dir, N_PER_DIM, ROLLOUT_LEN)
+    learned_pp, env = phase_portrait(learned_agent_dir, N_PER_DIM, ROLLOUT_LEN)
+
+    plt.figure()
+    plt.subplot(121, title = 'True Plant Model', xlim=[-np.pi, np.pi], ylim=[-8, 8])
+    for i in range(N_PER_DIM):
+        for j in range(N_PER_DIM):
+            # print(f'{i}, {j}')
+            rollout = true_pp[i, j]
+            if torch.allclose(torch.zeros(env.state_size), rollout[-1]):
+                color = 'C2' # green
+            else:
+                color = 'C3' # red
+            plt.plot(rollout[:, 0], rollout[:, 1], color = color)
+    plt.xlabel('x1 (radians)')
+    plt.ylabel('x2 (radians/second)')
+
+    plt.subplot(122, title = 'Learned Plant Model', xlim=[-np.pi, np.pi], ylim=[-8, 8])
+    for i in range(N_PER_DIM):
+        for j in range(N_PER_DIM):
+            # print(f'{i}, {j}')
+            rollout = learned_pp[i, j]
+            if torch.allclose(torch.zeros(env.state_size), rollout[-1]):
+                color = 'C2' # green
+            else:
+                color = 'C3' # red
+            plt.plot(rollout[:, 0], rollout[:, 1], color = color)
+    plt.xlabel('x1 (radians)')
+    plt.show()
+
+    # Plotting rollouts of agents against each other from the same initial conditions.
+
+    # ren_dir = "../ray_results/Learned_InvPend/ProjRENModel_LearnedInvertedPendulumEnv_phiTanh_state2_hidden4_0_2022-03-25_10-08-38"
+    # rnn_dir = "../ray_results/Learned_InvPend/ProjRENModel_InvertedPendulumEnv_phiTanh_state2_hidden4_0_2022-03-25_10-08-52"
+
+    # ren_agent, _ = load_agent(ren_dir, checkpoint_path=ren_dir + "/checkpoint_000084/checkpoint-84")
+    # rnn_agent, env = load_agent(rnn_dir, checkpoint_path=rnn_dir + "/checkpoint_000084/checkpoint-84")#, checkpoint_path=rnn_dir + '/checkpoint_000010/checkpoint-10')
+
+    # # x vs t
+
+    # N_iters = 10
+    # ren_states = []
+    # ren_actions = []
+    # rnn_states = []
+    # rnn_actions = []
+
+    # for _ in range(N_iters):
+    #     obs = env.reset()
+    #     env_copy = copy.deepcopy(env)
+
+    #     ren_state, ren_action, _ = compute_rollout(ren_agent, env)
+    #     # assert ren_state.shape[1] == env.time_max + 1, 'fail long'
+    #     ren_states.append(ren_state)
+    #     ren_actions.append(ren_action)
+
+    #     rnn_state, rnn_action, _ = compute_rollout(rnn_agent, env_copy)
+    #     rnn_states.append(rnn_state)
+    #     rnn_actions.append(rnn_action)
+
+    # plt.figure()
+
+    # plt.subplot(311)
+    # for i in range(N_iters):
+    #     plt.plot(ren_states[i][0])
+    #     # plt.plot(rnn_states[i][0])
+    # plt.title("theta")
+
+    # plt.subplot(312)
+    # for i in range(N_iters):
+    #     plt.plot(ren_states[i][1])
+    #     # plt.plot(rnn_states[i][1])
+    # plt.title("theta dot")
+
+    # plt.subplot(313)
+    # for i in range(N_iters):
+    #     plt.plot(ren_actions[i][0]) #, 'tab:orange')
+    #     # plt.plot(rnn_actions[i][0], 'tab:blue')
+    # plt.title("u")
+
+    # plt.show()
\ No newline at end of file
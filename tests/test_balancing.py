@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('torch')
+
+from models.ren_projection import balancing_scaling, construct_condition, scale_theta_h
+
+def random_theta_h(n, nu, ny, hidden_size, rng):
+    X = rng.standard_normal((n, n))
+    Y = rng.standard_normal((n, n))
+    return [X @ X.T + np.eye(n), Y @ Y.T + np.eye(n), rng.standard_normal((n, n)), rng.standard_normal((n, ny)),
+        rng.standard_normal((nu, n)), rng.standard_normal((nu, ny)), np.diag(rng.uniform(0.5, 2, hidden_size)),
+        rng.standard_normal((n, hidden_size)), rng.standard_normal((hidden_size, n)),
+        rng.standard_normal((nu, hidden_size)), 0.1 * rng.standard_normal((hidden_size, hidden_size)),
+        rng.standard_normal((hidden_size, ny))]
+
+def inertia(condition):
+    eigvals = np.linalg.eigvalsh((condition + condition.T) / 2)
+    return int(np.sum(eigvals > 0)), int(np.sum(eigvals < 0))
+
+def _total_norm(A, B, C):
+    """Sum of the 1-norms of the off-diagonal of A (rows and columns) and of B and C, which balancing decreases."""
+    off_diagonal = np.abs(A) - np.diag(np.abs(np.diag(A)))
+    return 2 * off_diagonal.sum() + np.abs(B).sum() + np.abs(C).sum()
+
+def test_scaling_is_exact_and_balances():
+    rng = np.random.default_rng(0)
+    n = 4
+    scales = 2.0 ** rng.integers(-8, 8, size = n)
+    A = rng.standard_normal((n, n)) * scales[:, None] / scales[None, :]
+    B = rng.standard_normal((n, 1)) * scales[:, None]
+    C = rng.standard_normal((2, n)) / scales[None, :]
+    d = balancing_scaling(A, B, C)
+    assert np.all(np.log2(d) == np.round(np.log2(d)))
+    A_s, B_s, C_s = A * d[None, :] / d[:, None], B / d[:, None], C * d[None, :]
+    assert np.allclose(np.sort(np.linalg.eigvals(A_s)), np.sort(np.linalg.eigvals(A)))
+    assert _total_norm(A_s, B_s, C_s) < _total_norm(A, B, C)
+
+def test_scaled_condition_is_congruent():
+    rng = np.random.default_rng(1)
+    n, nu, ny, hidden_size = 3, 1, 2, 4
+    AG, BG, CG = rng.standard_normal((n, n)), rng.standard_normal((n, nu)), rng.standard_normal((ny, n))
+    d = 2.0 ** rng.integers(-4, 4, size = n)
+    AG_s, BG_s, CG_s = AG * d[None, :] / d[:, None], BG / d[:, None], CG * d[None, :]
+    for _ in range(10):
+        theta_h = random_theta_h(n, nu, ny, hidden_size, rng)
+        condition = np.asarray(construct_condition(theta_h, AG, BG, CG, 0.9, stacker = 'numpy'))
+        scaled = np.asarray(construct_condition(scale_theta_h(theta_h, d), AG_s, BG_s, CG_s, 0.9, stacker = 'numpy'))
+        assert inertia(condition) == inertia(scaled)
+        for (a, b) in zip(scale_theta_h(scale_theta_h(theta_h, d), 1 / d), theta_h):
+            assert np.allclose(a, b)
@@ -0,0 +1,64 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+def _stub(condition):
+    return SimpleNamespace(condition_tensor = lambda: condition, _barrier_infeasible = 0, _last_barrier = None)
+
+def test_barrier_finite_at_projected_point():
+    pytest.importorskip('cvxpy')
+    from models.theta_hat_parameterization import ThetaHatParameterization
+    eps = 1e-5
+    # The projection leaves condition >= eps I, the closest it gets to the boundary
+    condition = (eps * torch.eye(4)).requires_grad_()
+    stub = _stub(condition)
+    barrier = ThetaHatParameterization.log_det_barrier(stub)
+    assert torch.isfinite(barrier)
+    assert barrier.item() == pytest.approx(-4 * math.log(eps), rel = 1e-5)
+    barrier.backward()
+    assert torch.all(torch.isfinite(condition.grad))
+    assert stub._barrier_infeasible == 0
+
+def test_barrier_infinite_outside_domain():
+    pytest.importorskip('cvxpy')
+    from models.theta_hat_parameterization import ThetaHatParameterization
+    stub = _stub(torch.diag(torch.tensor([1.0, -1.0])))
+    barrier = ThetaHatParameterization.log_det_barrier(stub)
+    assert math.isinf(barrier.item())
+    assert stub._barrier_infeasible == 1
+
+def test_barrier_in_loss_and_stats():
+    pytest.importorskip('ray')
+    from trainers import with_barrier, ProjectionStatsMixin
+
+    barrier = torch.tensor(3.0)
+    model = SimpleNamespace(barrier_weight = 0.5, log_det_barrier = lambda: barrier)
+    policy = SimpleNamespace()
+    loss_fn = with_barrier(lambda policy, model, dist_class, train_batch: torch.tensor(1.0))
+    loss = loss_fn(policy, model, None, None)
+    assert loss.item() == pytest.approx(2.5)
+
+    class Base:
+        def extra_grad_info(self, train_batch):
+            return {}
+
+    class Policy(ProjectionStatsMixin, Base):
+        pass
+
+    stats_policy = Policy()
+    stats_policy.model = SimpleNamespace()
+    stats_policy._barrier_loss = policy._barrier_loss
+    assert stats_policy.extra_grad_info(None)['barrier_loss'] == pytest.approx(1.5)
+
+def test_infinite_barrier_left_out_of_loss():
+    pytest.importorskip('ray')
+    from trainers import with_barrier
+
+    model = SimpleNamespace(barrier_weight = 0.5, log_det_barrier = lambda: torch.tensor(float('inf')))
+    policy = SimpleNamespace()
+    loss = with_barrier(lambda policy, model, dist_class, train_batch: torch.tensor(1.0))(policy, model, None, None)
+    assert loss.item() == pytest.approx(1.0)
+    assert math.isnan(policy._barrier_loss)
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from models import cache
+from models.cache import memoize_array, Uncached
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('REN_CACHE_DIR', str(tmp_path))
+    cache.clear_memory_cache()
+    yield tmp_path
+    cache.clear_memory_cache()
+
+def _entries(directory, name):
+    path = os.path.join(directory, name)
+    return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+def test_memoized_result_matches_and_is_reused(cache_dir):
+    calls = []
+
+    @memoize_array('square')
+    def square(a, power = 2):
+        calls.append(1)
+        return a**power
+
+    a = np.arange(4.0)
+    assert np.array_equal(square(a), a**2)
+    assert np.array_equal(square(a, power = 2), a**2)
+    assert len(calls) == 1
+    cache.clear_memory_cache()
+    assert np.array_equal(square(a), a**2)
+    assert len(calls) == 1
+    assert len(_entries(cache_dir, 'square')) == 1
+
+def test_changed_source_or_version_is_not_served_stale(cache_dir):
+    a = np.arange(3.0)
+
+    @memoize_array('f')
+    def f(a):
+        return a + 1
+
+    @memoize_array('f')
+    def g(a):
+        return a + 2
+
+    @memoize_array('f', version = 2)
+    def h(a):
+        return a + 1
+
+    assert np.array_equal(f(a), a + 1)
+    assert np.array_equal(g(a), a + 2)
+    assert np.array_equal(h(a), a + 1)
+    assert len(_entries(cache_dir, 'f')) == 3
+
+def test_uncached_results_are_not_stored(cache_dir):
+    calls = []
+
+    @memoize_array('inaccurate')
+    def inaccurate(a):
+        calls.append(1)
+        return Uncached(a * 2)
+
+    a = np.arange(3.0)
+    assert np.array_equal(inaccurate(a), a * 2)
+    assert np.array_equal(inaccurate(a), a * 2)
+    assert len(calls) == 2
+    assert _entries(cache_dir, 'inaccurate') == []
+
+class LinearEnv:
+    """Env stand-in with the attributes used by dataset.generate_transitions."""
+    def __init__(self, config):
+        self.state_space = self.action_space = type('Box', (), {'high': np.ones(2, dtype = np.float32)})
+
+    def batch_step(self, states, actions):
+        return 0.5 * states + actions, None
+
+class ShiftedLinearEnv(LinearEnv):
+    def batch_step(self, states, actions):
+        return 0.5 * states + actions + 1, None
+
+def test_dataset_key_covers_dynamics_source(cache_dir, monkeypatch):
+    import dataset
+    assert dataset.dynamics_hash(LinearEnv({})) != dataset.dynamics_hash(ShiftedLinearEnv({}))
+
+    first = dataset.generate_transitions(LinearEnv, {}, 10, seed = 0)
+    assert len(os.listdir(os.path.join(cache_dir, 'transitions'))) == 1
+    again = dataset.generate_transitions(LinearEnv, {}, 10, seed = 0)
+    assert all(np.array_equal(a, b) for (a, b) in zip(first, again))
+
+    # Changed dynamics (same env name and config) regenerate the dataset instead of loading the stale one
+    monkeypatch.setattr(dataset, 'dynamics_hash', lambda env: 'changed')
+    dataset.generate_transitions(LinearEnv, {}, 10, seed = 0)
+    assert len(os.listdir(os.path.join(cache_dir, 'transitions'))) == 2
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('gym')
+
+from activations import Tanh
+from closed_loop import simulate
+from envs import InvertedPendulumEnv
+from models.controller import RecurrentController
+
+env_config = {'observation': 'partial', 'normed': True, 'factor': 1}
+
+def random_rnn_controller(seed, gain = 0.5):
+    rng = np.random.default_rng(seed)
+    state_size, hidden_size, ob_dim, ac_dim = 2, 4, 1, 1
+    shapes = [(state_size, state_size), (state_size, hidden_size), (state_size, ob_dim), (ac_dim, state_size),
+        (ac_dim, hidden_size), (ac_dim, ob_dim), (hidden_size, state_size)]
+    theta_t = [gain * rng.standard_normal(shape) for shape in shapes]
+    theta_t += [None, gain * rng.standard_normal((hidden_size, ob_dim))]
+    return RecurrentController(theta_t, Tanh())
+
+def env_rollout(controller, env, x0, horizon, fail_on_state_space):
+    """Reference: the controller stepped with env.step, stopping at termination."""
+    obs = env.reset(x0)
+    xi = torch.zeros(1, controller.state_size)
+    states = []
+    for _ in range(horizon):
+        states.append(env.state.copy())
+        u, xi = controller(torch.as_tensor(obs, dtype = torch.float32).unsqueeze(0), xi)
+        obs, _, done, _ = env.step(u[0].numpy(), fail_on_state_space = fail_on_state_space)
+        if done:
+            break
+    return np.stack(states)
+
+@pytest.mark.parametrize('fail_on_state_space', [False, True])
+def test_simulate_matches_env_step(fail_on_state_space):
+    env = InvertedPendulumEnv(env_config)
+    controller = random_rnn_controller(0, gain = 3.0 if fail_on_state_space else 0.5)
+    x0 = env.batch_reset(8)
+    horizon = env.time_max + 1
+    with torch.no_grad():
+        states, _, mask, _ = simulate(controller, env, x0, horizon = horizon, fail_on_state_space = fail_on_state_space)
+
+    for i in range(x0.shape[0]):
+        reference = env_rollout(controller, env, x0[i], horizon, fail_on_state_space)
+        n_steps = int(mask[i].sum())
+        assert n_steps == reference.shape[0]
+        assert np.allclose(states[i, :n_steps].numpy(), reference, atol = 1e-4)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+
+from envs import InvertedPendulumEnv, OtherInvertedPendulumEnv
+
+env_config = {'observation': 'partial', 'normed': True, 'factor': 1}
+
+@pytest.mark.parametrize('env_cstor', [InvertedPendulumEnv, OtherInvertedPendulumEnv])
+def test_kept_states_are_not_overwritten(env_cstor):
+    env = env_cstor(env_config)
+    env.reset(np.array([0.1, -0.2], dtype = np.float32))
+    kept = [env.state]
+    values = [env.state.copy()]
+    for _ in range(5):
+        env.step(np.array([0.3]), fail_on_state_space = False)
+        kept.append(env.state)
+        values.append(env.state.copy())
+    env.reset()
+    for (state, value) in zip(kept, values):
+        assert np.array_equal(state, value)
+
+@pytest.mark.parametrize('env_cstor', [InvertedPendulumEnv, OtherInvertedPendulumEnv])
+def test_step_matches_batch_step(env_cstor):
+    env = env_cstor(env_config)
+    x0 = env.batch_reset(16)
+    u = np.random.default_rng(0).uniform(-1, 1, size = (16, env.nu)).astype(np.float32)
+    next_states, rewards = env.batch_step(x0, u)
+    for i in range(x0.shape[0]):
+        env.reset(x0[i])
+        _, reward, _, _ = env.step(u[i], fail_on_state_space = False)
+        assert np.allclose(env.state, next_states[i], atol = 1e-5)
+        assert reward == pytest.approx(rewards[i], abs = 1e-4)
+        assert np.array_equal(env.recent_states()[-1], x0[i])
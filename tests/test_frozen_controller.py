@@ -0,0 +1,97 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+torch = pytest.importorskip('torch')
+
+from activations import Tanh
+from models.controller import RecurrentController
+from models.frozen import FrozenController, contraction_factor, fixed_iterations
+
+state_size, hidden_size, ob_dim, ac_dim = 2, 8, 2, 1
+
+def random_theta_t(seed, implicit):
+    """Random controller, with a DK3_t of row-sum norm 0.5 if implicit and DK3_t None otherwise."""
+    rng = np.random.default_rng(seed)
+    shapes = [(state_size, state_size), (state_size, hidden_size), (state_size, ob_dim), (ac_dim, state_size),
+        (ac_dim, hidden_size), (ac_dim, ob_dim), (hidden_size, state_size), (hidden_size, hidden_size),
+        (hidden_size, ob_dim)]
+    theta_t = [rng.standard_normal(shape) / np.sqrt(shape[1]) for shape in shapes]
+    theta_t[0] *= 0.9 / np.max(np.abs(np.linalg.eigvals(theta_t[0])))
+    if implicit:
+        theta_t[7] *= 0.5 / np.max(np.sum(np.abs(theta_t[7]), axis = 1))
+    else:
+        theta_t[7] = None
+    return theta_t
+
+def weighted_norm(z, p):
+    return np.max(np.abs(z) / p)
+
+@pytest.mark.parametrize('implicit', [False, True])
+def test_step_matches_recurrent_controller(implicit):
+    theta_t = random_theta_t(0, implicit)
+    phi = Tanh()
+    controller = RecurrentController([None if M is None else torch.as_tensor(M) for M in theta_t], phi,
+        f_thresh = 100)
+    frozen = FrozenController(theta_t, phi)
+    rng = np.random.default_rng(1)
+    xi = torch.zeros(1, state_size)
+    for _ in range(20):
+        y = rng.standard_normal(ob_dim)
+        u_ref, xi = controller(torch.as_tensor(y, dtype = torch.float32).unsqueeze(0), xi)
+        u = frozen.step(y)
+        assert np.allclose(u, u_ref.numpy()[0], atol = 1e-4)
+        assert np.allclose(frozen.state, xi.numpy()[0], atol = 1e-4)
+
+@pytest.mark.parametrize('implicit', [False, True])
+def test_batch_step_and_torch_match_step(implicit):
+    theta_t = random_theta_t(2, implicit)
+    phi = Tanh()
+    batch_size, n_steps = 5, 10
+    Y = np.random.default_rng(3).standard_normal((n_steps, batch_size, ob_dim))
+
+    frozens = [FrozenController(theta_t, phi) for _ in range(batch_size)]
+    frozen = FrozenController(theta_t, phi)
+    frozen.reset(batch_size)
+    torch_frozen = frozen.to_torch()
+    xi = torch.zeros(batch_size, state_size)
+    for k in range(n_steps):
+        U_ref = np.stack([f.step(y) for (f, y) in zip(frozens, Y[k])])
+        assert np.allclose(frozen.batch_step(Y[k]), U_ref, atol = 1e-12)
+        with torch.no_grad():
+            U_torch, xi = torch_frozen(torch.as_tensor(Y[k], dtype = torch.float32), xi)
+        assert np.allclose(U_torch.numpy(), U_ref, atol = 1e-4)
+
+def test_contraction_factor_bounds_the_contraction():
+    theta_t = random_theta_t(4, True)
+    DK3 = theta_t[7]
+    c, p = contraction_factor(DK3)
+    assert c <= 0.5 + 1e-6
+    frozen = FrozenController(theta_t, Tanh())
+    rng = np.random.default_rng(5)
+    v = rng.standard_normal(hidden_size)
+    for _ in range(20):
+        z1, z2 = rng.standard_normal((2, hidden_size))
+        f1, f2, tmp = np.empty(hidden_size), np.empty(hidden_size), np.empty(hidden_size)
+        frozen._phi_t(v + DK3 @ z1, f1, tmp)
+        frozen._phi_t(v + DK3 @ z2, f2, tmp)
+        assert weighted_norm(f1 - f2, p) <= c * weighted_norm(z1 - z2, p) * (1 + 1e-9)
+
+def test_fixed_iterations_reach_tolerance():
+    theta_t = random_theta_t(6, True)
+    tol = 1e-3
+    frozen = FrozenController(theta_t, Tanh(), tol = tol)
+    assert frozen.n_iters == fixed_iterations(frozen.contraction, tol)
+    y = np.random.default_rng(7).standard_normal(ob_dim)
+    frozen.step(y)
+    z = frozen.w[frozen._z_slice].copy()
+
+    # Converged equilibrium and first iterate of z -> phi_t(v0 + DK3 z) from the same (zero) state
+    v0 = frozen.G @ np.concatenate((np.zeros(state_size), y))
+    tmp = np.empty(hidden_size)
+    z1 = np.empty(hidden_size)
+    frozen._phi_t(v0, z1, tmp)
+    z_star = z1.copy()
+    for _ in range(1000):
+        frozen._phi_t(v0 + frozen.DK3 @ z_star, z_star, tmp)
+    p = frozen.weights
+    assert weighted_norm(z - z_star, p) <= tol * weighted_norm(z1, p)
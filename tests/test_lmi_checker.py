@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cvxpy')
+pytest.importorskip('torch')
+
+from models.ren_projection import IncrementalLMIChecker
+
+def is_pd(condition):
+    return np.linalg.eigvalsh(condition)[0] > 0
+
+def random_pd(n, rng, min_eig = 1.0):
+    M = rng.standard_normal((n, n))
+    return M @ M.T + min_eig * np.eye(n)
+
+def perturbations(n, rng):
+    """Small, low rank and dense perturbations, each scaled to land clearly on either side of the boundary."""
+    yield 1e-3 * np.eye(n)
+    for _ in range(20):
+        yield 0.1 * rng.standard_normal() * np.eye(n)
+        rows = rng.choice(n, size = 2, replace = False)
+        delta = np.zeros((n, n))
+        block = rng.standard_normal((2, 2))
+        delta[np.ix_(rows, rows)] = rng.uniform(0.5, 20) * (block + block.T)
+        yield delta
+        dense = rng.standard_normal((n, n))
+        yield rng.uniform(0.1, 5) * (dense + dense.T)
+
+def test_matches_full_eigendecomposition():
+    rng = np.random.default_rng(0)
+    n = 12
+    checker = IncrementalLMIChecker()
+    base = random_pd(n, rng)
+    assert checker.check(base)
+    for delta in perturbations(n, rng):
+        condition = base + delta
+        min_eig = np.linalg.eigvalsh(condition)[0]
+        if abs(min_eig) < 1e-6:
+            continue
+        assert checker.check(condition) == (min_eig > 0)
+        if checker.base is not None:
+            assert is_pd(checker.base)
+    # Every path was exercised
+    assert all(count > 0 for count in checker.counts.values())
+
+def test_low_rank_path_with_dense_small_changes():
+    """After an optimizer step every entry moves a little: the low-rank test must still fire, and stay exact."""
+    rng = np.random.default_rng(1)
+    n = 12
+    checker = IncrementalLMIChecker()
+    base = random_pd(n, rng)
+    assert checker.check(base)
+    for _ in range(10):
+        noise = 1e-7 * rng.standard_normal((n, n))
+        rows = rng.choice(n, size = 2, replace = False)
+        block = rng.standard_normal((2, 2))
+        delta = noise + noise.T
+        delta[np.ix_(rows, rows)] += 10 * (block @ block.T + np.eye(2))
+        low_rank = checker.counts['low_rank']
+        assert checker.check(base + delta)
+        assert checker.counts['low_rank'] == low_rank + 1
+
+    # Large indefinite changes on few rows are decided exactly, by the low-rank test or by refactoring
+    for _ in range(20):
+        noise = 1e-7 * rng.standard_normal((n, n))
+        rows = rng.choice(n, size = 2, replace = False)
+        block = rng.standard_normal((2, 2))
+        delta = noise + noise.T
+        delta[np.ix_(rows, rows)] += rng.uniform(0.5, 20) * (block + block.T)
+        condition = checker.base + delta
+        min_eig = np.linalg.eigvalsh(condition)[0]
+        if abs(min_eig) < 1e-6:
+            continue
+        assert checker.check(condition) == (min_eig > 0)
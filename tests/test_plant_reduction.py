@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+from models.plant_reduction import minimal_realization, reduce_plant
+
+def markov_parameters(A, B, C, n):
+    params = []
+    M = B
+    for _ in range(n):
+        params.append(C @ M)
+        M = A @ M
+    return np.stack(params)
+
+def nonminimal_plant(rng):
+    """4 states: 2 controllable and observable, one uncontrollable (0.3), one unobservable (-0.2), mixed."""
+    A = np.diag([0.9, 0.5, 0.3, -0.2])
+    A[0, 1] = 0.4
+    B = np.vstack((rng.standard_normal((2, 2)), np.zeros((1, 2)), rng.standard_normal((1, 2))))
+    C = np.hstack((rng.standard_normal((3, 3)), np.zeros((3, 1))))
+    T = rng.standard_normal((4, 4)) + 4 * np.eye(4)
+    T_inv = np.linalg.inv(T)
+    return T_inv @ A @ T, T_inv @ B, C @ T
+
+def test_minimal_realization_keeps_input_output_map():
+    rng = np.random.default_rng(0)
+    A, B, C = nonminimal_plant(rng)
+    A_r, B_r, C_r, dropped = minimal_realization(A, B, C)
+    assert A_r.shape == (2, 2) and B_r.shape == (2, 2) and C_r.shape == (3, 2)
+    assert np.allclose(np.sort(np.real(dropped)), [-0.2, 0.3])
+    assert np.allclose(markov_parameters(A_r, B_r, C_r, 10), markov_parameters(A, B, C, 10))
+
+def test_minimal_realization_of_minimal_plant_is_unchanged():
+    rng = np.random.default_rng(1)
+    A = 0.3 * rng.standard_normal((3, 3))
+    B = rng.standard_normal((3, 1))
+    C = rng.standard_normal((1, 3))
+    A_r, B_r, C_r, dropped = minimal_realization(A, B, C)
+    assert A_r.shape == (3, 3) and dropped.size == 0
+
+def test_reduce_plant_checks_decay_of_dropped_modes():
+    rng = np.random.default_rng(0)
+    params, info = reduce_plant(list(nonminimal_plant(rng)), False, decay_factor = 0.5)
+    assert info['original_size'] == 4 and info['reduced_size'] == 2
+    assert info['max_dropped_mode'] == pytest.approx(0.3)
+    with pytest.raises(ValueError):
+        reduce_plant(list(nonminimal_plant(rng)), False, decay_factor = 0.25)
+
+def test_reduce_plant_rejects_approximate_methods():
+    rng = np.random.default_rng(0)
+    with pytest.raises(ValueError):
+        reduce_plant(list(nonminimal_plant(rng)), False, decay_factor = 0.5, method = 'balanced')
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip('ray')
+
+from models.projection_service import ProjectionServer
+
+class CountingProjector:
+    """Projector stand-in whose per trial state counts the projections of each trial."""
+    def __init__(self):
+        self.recenter_counts = {'recentered': 0, 'skipped': 0}
+        self.projections_since_recenter = 0
+
+    def project(self, *theta_h):
+        self.recenter_counts['recentered'] += 1
+        self.projections_since_recenter += 1
+        return theta_h
+
+def test_trial_state_is_not_shared():
+    server = ProjectionServer(CountingProjector, (), {})
+    state_a = server.get_initial_state()
+    state_b = server.get_initial_state()
+    for _ in range(3):
+        _, state_a = server.project(state_a, 1)
+    _, state_b = server.project(state_b, 2)
+
+    assert state_a['recenter_counts']['recentered'] == 3
+    assert state_a['projections_since_recenter'] == 3
+    assert state_b['recenter_counts']['recentered'] == 1
+    assert state_b['projections_since_recenter'] == 1
+    assert server.get_initial_state()['recenter_counts']['recentered'] == 0
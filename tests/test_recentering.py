@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('cvxpy')
+
+from models.ren_projection import NonlinProjector
+
+def _should_recenter(margin, threshold = None, every = None, since = 0):
+    projector = SimpleNamespace(recenter_threshold = threshold, recenter_every = every, projections_since_recenter = since)
+    return NonlinProjector.should_recenter(projector, margin)
+
+def test_default_always_recenters_without_a_margin():
+    assert _should_recenter(None)
+
+def test_threshold_and_period():
+    assert _should_recenter(1e-4, threshold = 1e-3)
+    assert not _should_recenter(1e-2, threshold = 1e-3)
+    assert not _should_recenter(None, every = 5, since = 4)
+    assert _should_recenter(None, every = 5, since = 5)
+    assert _should_recenter(1e-2, threshold = 1e-3, every = 5, since = 5)
+
+def test_recenter_stats_are_running_statistics():
+    projector = SimpleNamespace(recenter_counts = {'recentered': 2, 'skipped': 1},
+        recenter_gain_count = 2, recenter_gain_sum = 3.0, recenter_gain_last = 2.0)
+    stats = NonlinProjector.recenter_stats(projector)
+    assert stats == {'recenter_recentered': 2, 'recenter_skipped': 1, 'recenter_gain_mean': 1.5, 'recenter_gain_last': 2.0}
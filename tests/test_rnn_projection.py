@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+cp = pytest.importorskip('cvxpy')
+if cp.MOSEK not in cp.installed_solvers():
+    pytest.skip('MOSEK is not installed', allow_module_level = True)
+
+from models.cache import clear_memory_cache
+from models.rnn_projection import RNNProjector
+
+AG = np.array([[1.0, 0.05], [0.0, 1.0]])
+BG = np.array([[0.0], [0.05]])
+CG = np.eye(2)
+state_size, hidden_size = 2, 3
+
+def random_targets(rng):
+    shapes = [(state_size, state_size), (state_size, hidden_size), (state_size, 2), (1, state_size),
+        (1, hidden_size), (1, 2), (hidden_size, state_size), (hidden_size, 2)]
+    return [rng.standard_normal(shape) for shape in shapes]
+
+def test_projection_of_feasible_targets_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv('REN_CACHE_DIR', str(tmp_path))
+    clear_memory_cache()
+    projector = RNNProjector(AG, BG, CG, state_size, hidden_size, eps = 1e-5, decay_factor = 0.98)
+    rng = np.random.default_rng(0)
+    projected = projector.project(*random_targets(rng), None, np.eye(hidden_size))
+    assert projector.counts['solved'] == 1
+
+    # The zero controller is feasible with a certificate that is strictly inside the LMI
+    zero = [np.zeros_like(M) for M in projected[:8]]
+    first = projector.project(*zero, None, np.eye(hidden_size))
+    again = projector.project(*first)
+    for (a, b) in zip(first, again):
+        assert np.allclose(a, b, atol = 1e-4)
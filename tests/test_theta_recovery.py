@@ -0,0 +1,58 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from models.theta_recovery import recover_theta_t_pinv, recover_theta_t_structured
+
+def spd(n, generator, cond = 10.0, dtype = torch.float64):
+    Q, _ = torch.linalg.qr(torch.randn(n, n, generator = generator, dtype = dtype))
+    eigvals = torch.logspace(0, float(torch.log10(torch.tensor(cond))), n, dtype = dtype)
+    return (Q * eigvals) @ Q.t()
+
+def random_problem(n, state_size, hidden_size = 4, nu = 1, ny = 2, cond = 10.0, seed = 0, dtype = torch.float64):
+    g = torch.Generator().manual_seed(seed)
+    randn = lambda *shape: torch.randn(*shape, generator = g, dtype = dtype)
+    X = spd(n, g, cond, dtype)
+    Y = torch.linalg.inv(X) + spd(n, g, 10.0, dtype)
+    theta_h = [
+        X, Y, randn(n, n), randn(n, ny), randn(nu, n), randn(nu, ny),
+        torch.diag(torch.rand(hidden_size, generator = g, dtype = dtype) + 0.5),
+        randn(n, hidden_size), randn(hidden_size, n), randn(nu, hidden_size),
+        randn(hidden_size, hidden_size), randn(hidden_size, ny)
+    ]
+    AG_t, BG2, CG1 = randn(n, n), randn(n, nu), randn(ny, n)
+    return theta_h, AG_t, BG2, CG1
+
+def max_rel_error(result, reference):
+    return max(float(torch.linalg.norm(a.double() - b) / (torch.linalg.norm(b) + 1e-12))
+        for (a, b) in zip(result, reference))
+
+@pytest.mark.parametrize('n, state_size', [(3, 3), (3, 2), (4, 1)])
+def test_structured_matches_pinv(n, state_size):
+    theta_h, AG_t, BG2, CG1 = random_problem(n, state_size)
+    reference = recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, state_size)
+    result = recover_theta_t_structured(theta_h, AG_t, BG2, CG1, state_size)
+    assert max_rel_error(result, reference) < 1e-8
+
+def test_ill_conditioned_reduced_state_in_float32():
+    n, state_size = 4, 2
+    theta_h, AG_t, BG2, CG1 = random_problem(n, state_size, cond = 1e5, seed = 1)
+    reference = recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, state_size)
+
+    as_float = lambda Ms: [M.float() for M in Ms]
+    theta_h32, (AG_t32, BG2_32, CG1_32) = as_float(theta_h), as_float([AG_t, BG2, CG1])
+    result = recover_theta_t_structured(theta_h32, AG_t32, BG2_32, CG1_32, state_size)
+    pinv_result = recover_theta_t_pinv(theta_h32, AG_t32, BG2_32, CG1_32, state_size)
+
+    assert all(torch.all(torch.isfinite(M)) for M in result)
+    # No worse than the SVD pseudo-inverses at the same (float32) precision
+    assert max_rel_error(result, reference) <= 10 * max_rel_error(pinv_result, reference) + 1e-4
+
+def test_falls_back_to_pinv_when_V_is_not_definite():
+    n = 3
+    theta_h, AG_t, BG2, CG1 = random_problem(n, n)
+    theta_h[1] = torch.linalg.inv(theta_h[0]) - 0.1 * torch.eye(n, dtype = torch.float64) # -V = -0.1 I
+    reference = recover_theta_t_pinv(theta_h, AG_t, BG2, CG1, n)
+    result = recover_theta_t_structured(theta_h, AG_t, BG2, CG1, n)
+    for (a, b) in zip(result, reference):
+        assert torch.allclose(a, b, equal_nan = True)
@@ -14,6 +14,7 @@ from models import ProjRENModel, ProjRNNModel, ProjRNNOldModel
 from activations import LeakyReLU, Tanh
 from deq_lib.solvers import broyden, anderson # Fixed-point solvers
 from trainers import ProjectedPGTrainer, ProjectedPPOTrainer
+from models.projection_service import shutdown_projection_services
 
 
 N_CPUS = 8 # laptop
@@ -47,6 +48,16 @@ config = {
             "exp_stability_rate": 0.9,
             "plant_cstor": env,
             "plant_config": env_config,
+            # "projector_config": {"incremental_check": True, "drop_redundant_cones": True}, # Cheaper LMI checks, fewer small cones
+            # "projector_config": {"chordal": True}, # Split the LMI over the cliques of its sparsity pattern (large plants)
+            # "projector_config": {"balance": True}, # Solve the projection in balanced plant coordinates
+            # "projector_config": {"recenter_threshold": 1e-3, "recenter_every": 20}, # Nonlinear plants: recenter Lambda_p only when needed
+            # "projection_service": {"num_solvers": 2}, # Share projectors between trials of the same config
+            # "projection_schedule": {"check_every": 10}, # Skip projections certified by a perturbation bound
+            # "barrier_weight": 1e-3, # Log-det barrier in the loss keeps iterates inside the stabilizing set
+            # "feasible_step": {"shrink": 0.5, "min_step": 1e-2}, # Backtrack steps until the LMI holds
+            # "profile": {"trace_path": "projection_trace.jsonl"}, # Time each phase of the projection step
+            # "plant_reduction": {"method": "minimal"}, # Build the projector on a minimal realization of the plant
             # REN parameters
             "solver": broyden,
             "f_thresh": 30,
@@ -54,6 +65,7 @@ config = {
         }
     },
     "num_workers": n_workers_per_task,
+    # "env": InvertedPendulumVectorEnv, # from envs.vector_env: steps env_config["num_envs"] plants per worker at once
     "framework": "torch",
     "num_gpus": 0,
     "evaluation_num_workers": 1,
@@ -89,16 +101,20 @@ def name_creator(trial):
     return name
 
 ray.init()
-results = tune.run(
-    ProjectedPPOTrainer,
-    config = config,
-    stop = {
-        'agent_timesteps_total': 1e3,
-    },
-    verbose = 1,
-    trial_name_creator = name_creator,
-    name = 'scratch',
-    local_dir = '../ray_results',
-    checkpoint_at_end = True,
-    checkpoint_freq = 200,
-)
+try:
+    results = tune.run(
+        ProjectedPPOTrainer,
+        config = config,
+        stop = {
+            'agent_timesteps_total': 1e3,
+        },
+        verbose = 1,
+        trial_name_creator = name_creator,
+        name = 'scratch',
+        local_dir = '../ray_results',
+        checkpoint_at_end = True,
+        checkpoint_freq = 200,
+    )
+finally:
+    # Projection actors are detached, so they would otherwise outlive this run
+    shutdown_projection_services()
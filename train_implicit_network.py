@@ -8,6 +8,7 @@ import matplotlib.pyplot as plt
 from models.implicit_model import ImplicitModel
 from activations import Tanh, LeakyReLU
 from envs import InvertedPendulumEnv
+from dataset import generate_transitions
 
 device = 'cpu'
 # device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -88,26 +89,12 @@ loss_fn = torch.nn.MSELoss()
 
 # Setup datasets
 
-def create_dataset(size):
-    init_states = torch.rand(size, true_model.state_size)
-    init_states = 2*init_states - 1
-    init_states = init_states * torch.from_numpy(true_model.state_space.high)
+def create_dataset(size, seed):
+    states, actions, next_states = generate_transitions(env, env_config, size, seed = seed)
+    return torch.cat((torch.from_numpy(states), torch.from_numpy(actions)), 1), torch.from_numpy(next_states)
 
-    actions = torch.rand(size, true_model.nu)
-    actions = 2*actions - 1
-    actions = actions * torch.from_numpy(true_model.action_space.high)
-
-    # Set up next states 
-    next_states = torch.zeros_like(init_states)
-    for i in range(init_states.shape[0]):
-        true_model.reset(init_states[i].numpy())
-        true_model.step(actions[i].numpy())
-        next_states[i] = torch.from_numpy(true_model.state)
-
-    return torch.cat((init_states, actions), 1), next_states
-
-train_dataset = TensorDataset(*create_dataset(N_train))
-test_dataset  = TensorDataset(*create_dataset(N_test))
+train_dataset = TensorDataset(*create_dataset(N_train, seed = 0))
+test_dataset  = TensorDataset(*create_dataset(N_test, seed = 1))
 
 train_dataloader = DataLoader(train_dataset, batch_size)
 test_dataloader  = DataLoader(test_dataset,  batch_size)
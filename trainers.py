@@ -2,16 +2,118 @@
 RLLib trainers modified to include a projection step after updating model parameters.
 """
 
+import math
+import torch
 from ray.rllib.agents import ppo, pg
 from ray.rllib.utils.annotations import override
 
-class ProjectedPGPolicy(pg.pg_torch_policy.PGTorchPolicy):
+class FeasibleStepOptimizer:
+    """
+    Wraps a torch optimizer. After each update, the theta hat part of the update is scaled back along its
+    direction by step sizes 1, shrink, shrink**2, ... down to min_step until the LMI holds.
+    If no step size down to min_step satisfies the LMI, the full update is kept and left to the projection.
+    Everything other than `step` is forwarded to the wrapped optimizer.
+    """
+    def __init__(self, optimizer, model, shrink = 0.5, min_step = 1e-2):
+        self.optimizer = optimizer
+        self.model = model
+        n_steps = int(math.floor(math.log(min_step) / math.log(shrink))) + 1
+        self.step_sizes = [shrink**i for i in range(n_steps)]
+        self.counts = {'full': 0, 'shrunk': 0, 'fallback': 0}
+
+    def __getattr__(self, name):
+        if name == 'optimizer':
+            raise AttributeError(name)
+        return getattr(self.optimizer, name)
+
+    def step(self, closure = None):
+        params = self.model.theta_h_parameters()
+        old_params = {name: param.detach().clone() for (name, param) in params.items()}
+        loss = self.optimizer.step(closure)
+        new_params = {name: param.detach().clone() for (name, param) in params.items()}
+
+        step_size = self.model.largest_feasible_step(old_params, new_params, self.step_sizes)
+        if step_size is None:
+            self.counts['fallback'] += 1
+        elif step_size == 1:
+            self.counts['full'] += 1
+        else:
+            self.counts['shrunk'] += 1
+            with torch.no_grad():
+                for (name, param) in params.items():
+                    param.copy_(old_params[name] + step_size * (new_params[name] - old_params[name]))
+        return loss
+
+    def stats(self):
+        return {f'feasible_step_{path}': count for (path, count) in self.counts.items()}
+
+class FeasibleStepMixin:
+    """Wraps the policy's optimizer in a FeasibleStepOptimizer if the model is configured with feasible_step."""
+    def optimizer(self):
+        optimizers = super().optimizer()
+        feasible_step = getattr(self.model, 'feasible_step', None)
+        if feasible_step is None:
+            return optimizers
+        if isinstance(optimizers, list):
+            return [FeasibleStepOptimizer(optimizers[0], self.model, **feasible_step)] + optimizers[1:]
+        return FeasibleStepOptimizer(optimizers, self.model, **feasible_step)
+
+class ProjectionStatsMixin:
+    """Adds the model's projection statistics (if any) to the learner stats."""
+    def extra_grad_info(self, train_batch):
+        info = super().extra_grad_info(train_batch)
+        if hasattr(self.model, 'projection_stats'):
+            info.update(self.model.projection_stats())
+        if getattr(self, '_barrier_loss', None) is not None:
+            info['barrier_loss'] = self._barrier_loss
+        for optimizer in getattr(self, '_optimizers', []):
+            if isinstance(optimizer, FeasibleStepOptimizer):
+                info.update(optimizer.stats())
+        return info
+
+def with_barrier(loss_fn):
+    """
+    Loss function loss_fn(policy, model, dist_class, train_batch) plus the model's weighted log-det barrier,
+    if the model is configured with barrier_weight > 0. The weighted barrier is reported as barrier_loss in the
+    learner stats. An infinite barrier (infeasible parameters) is left out of the loss and to the projection.
+    """
+    def loss_with_barrier(policy, model, dist_class, train_batch):
+        loss = loss_fn(policy, model, dist_class, train_batch)
+        barrier_weight = getattr(model, 'barrier_weight', 0.0)
+        if barrier_weight > 0:
+            barrier = model.log_det_barrier()
+            if torch.isfinite(barrier):
+                barrier_loss = barrier_weight * barrier
+                loss = loss + barrier_loss
+                policy._barrier_loss = barrier_loss.item()
+            else:
+                policy._barrier_loss = float('nan')
+        return loss
+    return loss_with_barrier
+
+def with_barrier_loss(policy_cls, loss_fn):
+    """
+    policy_cls with its loss function loss_fn wrapped by with_barrier. Policies made with build_policy_class keep
+    the loss function on the instance, so it is replaced with with_updates. Class based policies get a loss method.
+    """
+    if hasattr(policy_cls, 'with_updates'):
+        return policy_cls.with_updates(loss_fn = with_barrier(loss_fn))
+    return type(policy_cls.__name__, (policy_cls,), {'loss': with_barrier(loss_fn)})
+
+_pg_module = pg.pg_torch_policy
+_ppo_module = ppo.ppo_torch_policy
+PGBarrierPolicy = with_barrier_loss(_pg_module.PGTorchPolicy,
+    _pg_module.pg_torch_loss if hasattr(_pg_module, 'pg_torch_loss') else _pg_module.PGTorchPolicy.loss)
+PPOBarrierPolicy = with_barrier_loss(_ppo_module.PPOTorchPolicy,
+    _ppo_module.ppo_surrogate_loss if hasattr(_ppo_module, 'ppo_surrogate_loss') else _ppo_module.PPOTorchPolicy.loss)
+
+class ProjectedPGPolicy(ProjectionStatsMixin, FeasibleStepMixin, PGBarrierPolicy):
     @override(pg.pg_torch_policy.PGTorchPolicy)
     def apply_gradients(self, gradients):
         super().apply_gradients(gradients)
         self.model.project()
 
-class ProjectedPPOPolicy(ppo.ppo_torch_policy.PPOTorchPolicy):
+class ProjectedPPOPolicy(ProjectionStatsMixin, FeasibleStepMixin, PPOBarrierPolicy):
     @override(ppo.ppo_torch_policy.PPOTorchPolicy)
     def apply_gradients(self, gradients):
         super().apply_gradients(gradients)